@@ -11,3 +11,11 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     verbose_name = "Core"
+
+    def ready(self) -> None:
+        """Time the queries of every database connection."""
+        from django.db.backends.signals import connection_created
+
+        from .metrics import install_query_timer
+
+        connection_created.connect(install_query_timer)
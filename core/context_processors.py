@@ -17,7 +17,7 @@ def navigation(request: HttpRequest) -> Dict[str, object]:
         apps.append(
             {
                 "name": str(_("Initiative Tracker")),
-                "url": reverse("initiative_tracker:tracker"),
+                "url": reverse("initiative_tracker:encounter_list"),
             }
         )
     except NoReverseMatch:
@@ -30,12 +30,16 @@ def navigation(request: HttpRequest) -> Dict[str, object]:
             current_app = app
             break
 
-    theme = request.session.get("theme", "light")
-    if theme not in {"light", "dark"}:
-        theme = "light"
-
     return {
         "nav_apps": apps,
         "current_app": current_app,
-        "current_theme": theme,
+        "current_theme": get_theme(request),
     }
+
+
+def get_theme(request: HttpRequest) -> str:
+    """Return the theme stored in the session, falling back to light."""
+    theme = request.session.get("theme", "light")
+    if theme not in {"light", "dark"}:
+        theme = "light"
+    return theme
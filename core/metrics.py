@@ -0,0 +1,219 @@
+"""Per-request timings and the histograms they are aggregated into."""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.http import HttpRequest
+from django.template.backends.django import DjangoTemplates, Template
+
+# Prometheus' default latency buckets, in seconds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestTimings:
+    """
+    Time spent in the database and the template engine by one request.
+
+    Nested template renders (crispy forms, ``render_to_string`` inside a
+    template tag) are only counted once, by the outermost render.
+    """
+
+    def __init__(self) -> None:
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.view_started: float | None = None
+        self._rendering = 0
+
+    @contextmanager
+    def rendering(self) -> Iterator[None]:
+        """Add the time spent in the block to the template time."""
+        self._rendering += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._rendering -= 1
+            if not self._rendering:
+                self.template += time.perf_counter() - start
+
+
+# The timings of the request being handled. Async ORM calls run in another
+# thread but with a copy of this context, so they add to the same object.
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def time_query(
+    execute: Callable[..., Any],
+    sql: str,
+    params: Any,
+    many: bool,
+    context: Dict[str, Any],
+) -> Any:
+    """Execute wrapper adding each query to the current request's timings."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.queries += 1
+
+
+def install_query_timer(
+    sender: Any, connection: BaseDatabaseWrapper, **kwargs: Any
+) -> None:
+    """Wrap the queries of every new database connection with ``time_query``."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def request_labels(request: HttpRequest) -> Dict[str, str]:
+    """
+    Label ``request`` with its view, action and method.
+
+    Views defining a ``request_action(request)`` classmethod, such as
+    ``TrackerView``, name the action; other requests get an empty one.
+    """
+    method = request.method or ""
+    match = request.resolver_match
+    if match is None:
+        return {"view": "unresolved", "action": "", "method": method}
+    view_class = getattr(match.func, "view_class", None)
+    request_action = getattr(view_class, "request_action", None)
+    return {
+        "view": match.view_name,
+        "action": request_action(request) if request_action else "",
+        "method": method,
+    }
+
+
+class TimedTemplate(Template):
+    """Django template adding its rendering time to the current request's."""
+
+    def render(self, context: Any = None, request: Any = None) -> str:
+        """Render the template, timing it when a request is being measured."""
+        timings = current_timings.get()
+        if timings is None:
+            return super().render(context, request)
+        with timings.rendering():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with its renders timed per request."""
+
+    def from_string(self, template_code: str) -> TimedTemplate:
+        """Compile ``template_code`` into a timed template."""
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name: str) -> TimedTemplate:
+        """Load ``template_name`` as a timed template."""
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class Histogram:
+    """Cumulative Prometheus histogram, one series per label set."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # labels -> (count per bucket, +Inf last; sum)
+        self.series: Dict[Tuple[Tuple[str, str], ...], Tuple[List[int], float]] = {}
+
+    def observe(self, labels: Dict[str, str], value: float) -> None:
+        """Record ``value`` in the series of ``labels``."""
+        key = tuple(sorted(labels.items()))
+        counts, total = self.series.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+        counts[bisect_left(self.buckets, value)] += 1
+        self.series[key] = (counts, total + value)
+
+    def expose(self) -> Iterator[str]:
+        """Yield the histogram in the Prometheus text format."""
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (counts, total) in sorted(self.series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{{{labels}}} {total}"
+            yield f"{self.name}_count{{{labels}}} {cumulative}"
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """
+    Request histograms of this process, labelled by view and action.
+
+    Every server process keeps its own registry; scrape each of them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.histograms = {
+            "total": Histogram(
+                "tabletop_request_seconds",
+                "Time spent handling the request, middleware included.",
+                SECONDS_BUCKETS,
+            ),
+            "view": Histogram(
+                "tabletop_view_seconds",
+                "Time spent in the view.",
+                SECONDS_BUCKETS,
+            ),
+            "db": Histogram(
+                "tabletop_db_seconds",
+                "Time spent running database queries.",
+                SECONDS_BUCKETS,
+            ),
+            "template": Histogram(
+                "tabletop_template_seconds",
+                "Time spent rendering templates.",
+                SECONDS_BUCKETS,
+            ),
+            "queries": Histogram(
+                "tabletop_db_queries",
+                "Database queries run by the request.",
+                QUERY_BUCKETS,
+            ),
+        }
+
+    def observe(self, labels: Dict[str, str], values: Dict[str, float]) -> None:
+        """Record one request's measurements under ``labels``."""
+        with self._lock:
+            for name, value in values.items():
+                self.histograms[name].observe(labels, value)
+
+    def expose(self) -> str:
+        """Return every histogram in the Prometheus text format."""
+        with self._lock:
+            lines = [line for h in self.histograms.values() for line in h.expose()]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Forget every recorded request."""
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.series.clear()
+
+
+registry = Registry()
@@ -0,0 +1,182 @@
+"""Middleware of the Core app."""
+
+from __future__ import annotations
+
+import cProfile
+import time
+from typing import Any, Awaitable, Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import HttpRequest, HttpResponse
+
+from .metrics import RequestTimings, current_timings, registry, request_labels
+from .profiling import (
+    capture_lock,
+    profile_dir,
+    profile_name,
+    profile_requested,
+    profiling_allowed,
+)
+
+
+class ServerTimingMiddleware:
+    """
+    Measure where each request spends its time.
+
+    The time spent in database queries (and their number), in template
+    rendering, in the view and in the whole request is sent back in a
+    ``Server-Timing`` header and recorded in the histograms served by the
+    metrics endpoint. Place it first in ``MIDDLEWARE`` so the total covers the
+    rest of the stack.
+
+    Requests are labelled by ``request_labels``: with the resolved view and,
+    for ``TrackerView``, the action the request performs.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(
+        self,
+        get_response: Callable[[HttpRequest], HttpResponse | Awaitable[HttpResponse]],
+    ) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        """Time the request and report the measurements on its response."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self._report(request, response, timings, start)  # type: ignore[arg-type]
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Time the request on the async stack."""
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)  # type: ignore[misc]
+        finally:
+            current_timings.reset(token)
+        return self._report(request, response, timings, start)
+
+    def process_view(
+        self,
+        request: HttpRequest,
+        view_func: Callable[..., Any],
+        view_args: Any,
+        view_kwargs: Any,
+    ) -> None:
+        """Start the view's clock once every middleware has seen the request."""
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def _report(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        timings: RequestTimings,
+        start: float,
+    ) -> HttpResponse:
+        """Add the Server-Timing header and record the request's histograms."""
+        end = time.perf_counter()
+        values = {
+            "db": timings.db,
+            "template": timings.template,
+            "view": end - timings.view_started if timings.view_started else 0.0,
+            "total": end - start,
+        }
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={values["db"] * 1000:.2f};desc="{timings.queries} queries"',
+                f"template;dur={values['template'] * 1000:.2f}",
+                f"view;dur={values['view'] * 1000:.2f}",
+                f"total;dur={values['total'] * 1000:.2f}",
+            ]
+        )
+        registry.observe(
+            request_labels(request), {**values, "queries": float(timings.queries)}
+        )
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Run single requests under cProfile on demand.
+
+    A request carrying an ``X-Profile`` header or a ``profile`` query parameter
+    is profiled when ``PROFILING_ENABLED`` is set or the user is staff. The
+    report is saved to ``PROFILE_DIR`` and named in the ``X-Profile-Name``
+    response header; the profiles page lists the captures. Other requests only
+    pay for the header and parameter lookup.
+
+    Place it after ``AuthenticationMiddleware``. Under ASGI, requests served
+    concurrently on the same event loop show up in the capture too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(
+        self,
+        get_response: Callable[[HttpRequest], HttpResponse | Awaitable[HttpResponse]],
+    ) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        """Profile the request if asked to, otherwise just pass it on."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._should_profile(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            response = profiler.runcall(self.get_response, request)
+        finally:
+            capture_lock.release()
+        return self._save(request, response, profiler)  # type: ignore[arg-type]
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Profile the request on the async stack if asked to."""
+        if not profile_requested(request) or not await sync_to_async(
+            self._should_profile
+        )(request):
+            return await self.get_response(request)  # type: ignore[misc]
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)  # type: ignore[misc]
+        finally:
+            profiler.disable()
+            capture_lock.release()
+        return self._save(request, response, profiler)
+
+    def _should_profile(self, request: HttpRequest) -> bool:
+        """Return whether to profile ``request``, taking the capture lock if so."""
+        return (
+            profile_requested(request)
+            and profiling_allowed(request)
+            and capture_lock.acquire(blocking=False)
+        )
+
+    def _save(
+        self, request: HttpRequest, response: HttpResponse, profiler: cProfile.Profile
+    ) -> HttpResponse:
+        """Write the profile to ``PROFILE_DIR`` and name it on the response."""
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        name = profile_name(request)
+        profiler.dump_stats(directory / name)
+        response["X-Profile-Name"] = name
+        return response
@@ -0,0 +1,94 @@
+"""Opt-in capture of single requests under cProfile."""
+
+from __future__ import annotations
+
+import io
+import pstats
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, NamedTuple
+
+from django.conf import settings
+from django.http import HttpRequest
+
+from .metrics import request_labels
+
+# Only one request is profiled at a time: the profiler hooks are global, and
+# concurrent captures would fail or mix their calls together.
+capture_lock = threading.Lock()
+
+SORT_KEYS = ("cumulative", "tottime", "calls")
+
+
+class CapturedProfile(NamedTuple):
+    """A saved profile file."""
+
+    name: str
+    size: int
+    modified: datetime
+
+
+def profile_requested(request: HttpRequest) -> bool:
+    """Return whether the client asked for ``request`` to be profiled."""
+    return "HTTP_X_PROFILE" in request.META or "profile" in request.GET
+
+
+def profiling_allowed(request: HttpRequest) -> bool:
+    """Return whether ``request`` may capture and browse profiles."""
+    if settings.PROFILING_ENABLED:
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_staff)
+
+
+def profile_dir() -> Path:
+    """Return the directory profiles are saved to."""
+    return Path(settings.PROFILE_DIR)
+
+
+def profile_name(request: HttpRequest) -> str:
+    """Name a capture after its time, method, view and action."""
+    labels = request_labels(request)
+    parts = [
+        datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f"),
+        labels["method"],
+        labels["view"],
+        labels["action"],
+    ]
+    name = "-".join(part for part in parts if part)
+    return re.sub(r"[^\w.-]+", "_", name) + ".prof"
+
+
+def list_profiles() -> List[CapturedProfile]:
+    """Return the saved profiles, newest first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in directory.glob("*.prof"):
+        stat = path.stat()
+        profiles.append(
+            CapturedProfile(
+                path.name,
+                stat.st_size,
+                datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            )
+        )
+    return sorted(profiles, key=lambda p: p.name, reverse=True)
+
+
+def profile_path(name: str) -> Path | None:
+    """Return the path of the saved profile ``name``, if it exists."""
+    if name not in {p.name for p in list_profiles()}:
+        return None
+    return profile_dir() / name
+
+
+def format_profile(path: Path, sort: str = "cumulative", limit: int = 60) -> str:
+    """Return the report of a saved profile, its ``limit`` top functions."""
+    stream = io.StringIO()
+    stats = pstats.Stats(str(path), stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
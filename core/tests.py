@@ -2,11 +2,19 @@
 
 from __future__ import annotations
 
+import tempfile
+from pathlib import Path
+
 from django.conf import settings
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import translation
 
+from .metrics import registry
+
 
 class CoreViewTests(TestCase):
     """Test cases for Core app views."""
@@ -115,3 +123,125 @@ class ThemeToggleViewTests(TestCase):
         )
         self.assertEqual(response.status_code, 204)
         self.assertEqual(response["HX-Redirect"], "/tracker/")
+
+
+class SQLiteProfileTests(TestCase):
+    """Tests for the opt-in production SQLite profile."""
+
+    def test_production_options_apply_pragmas(self):
+        """A connection opened with the profile runs in WAL mode."""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(
+                {
+                    **connection.settings_dict,
+                    "NAME": str(Path(directory) / "profile.sqlite3"),
+                    "OPTIONS": settings.SQLITE_PRODUCTION_OPTIONS,
+                },
+                alias="profile",
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA synchronous")
+                    self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                    cursor.execute("PRAGMA busy_timeout")
+                    self.assertEqual(cursor.fetchone()[0], 5000)
+                mode = wrapper.transaction_mode  # type: ignore[attr-defined]
+                self.assertEqual(mode, "IMMEDIATE")
+            finally:
+                wrapper.close()
+
+
+class ServerTimingTests(TestCase):
+    """Tests for the per-request timings and the metrics endpoint."""
+
+    def setUp(self) -> None:
+        """Start every test from empty histograms."""
+        registry.reset()
+
+    def test_response_reports_server_timing(self):
+        """Each response carries the time spent per phase."""
+        response = self.client.get(reverse("core:index"))
+        header = response["Server-Timing"]
+        for metric in ("db;dur=", "template;dur=", "view;dur=", "total;dur="):
+            self.assertIn(metric, header)
+        self.assertIn(' queries"', header)
+
+    def test_metrics_endpoint_exposes_histograms(self):
+        """Requests are aggregated into Prometheus histograms per view."""
+        self.client.get(reverse("core:index"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn("# TYPE tabletop_request_seconds histogram", body)
+        self.assertIn(
+            'tabletop_template_seconds_count{action="",method="GET",'
+            'view="core:index"} 1',
+            body,
+        )
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_metrics_endpoint_is_local_only(self):
+        """Clients outside INTERNAL_IPS get a 404."""
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 404)
+
+
+class ProfilerTests(TestCase):
+    """Tests for the on-demand request profiler."""
+
+    def setUp(self) -> None:
+        """Save captures to a throwaway directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.profile_dir = Path(directory.name)
+        override = override_settings(PROFILE_DIR=self.profile_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_untriggered_requests_are_not_profiled(self):
+        """Requests without the header or parameter are left alone."""
+        response = self.client.get(reverse("core:index"))
+        self.assertNotIn("X-Profile-Name", response)
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_anonymous_users_cannot_trigger_profiles(self):
+        """Without PROFILING_ENABLED only staff may capture profiles."""
+        response = self.client.get(reverse("core:index"), {"profile": "1"})
+        self.assertNotIn("X-Profile-Name", response)
+        self.assertEqual(self.client.get(reverse("core:profile_list")).status_code, 404)
+
+    def test_staff_capture_and_browse_profiles(self):
+        """A staff request with X-Profile is saved and listed."""
+        staff = User.objects.create_user("gm", is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get(reverse("core:index"), HTTP_X_PROFILE="1")
+        name = response["X-Profile-Name"]
+        self.assertIn("GET-core_index", name)
+        self.assertTrue((self.profile_dir / name).is_file())
+
+        listing = self.client.get(reverse("core:profile_list"))
+        self.assertContains(listing, name)
+        detail = self.client.get(
+            reverse("core:profile_detail", args=[name]), {"sort": "tottime"}
+        )
+        self.assertContains(detail, "function calls")
+        download = self.client.get(
+            reverse("core:profile_detail", args=[name]), {"download": "1"}
+        )
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(
+            self.client.get(
+                reverse("core:profile_detail", args=["missing.prof"])
+            ).status_code,
+            404,
+        )
+
+    @override_settings(PROFILING_ENABLED=True)
+    async def test_setting_allows_profiling_on_the_async_stack(self):
+        """With PROFILING_ENABLED anyone may capture, also under ASGI."""
+        response = await self.async_client.get(reverse("core:index"), {"profile": "1"})
+        self.assertTrue((self.profile_dir / response["X-Profile-Name"]).is_file())
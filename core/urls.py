@@ -17,4 +17,11 @@ urlpatterns = [
         name="set_language",
     ),
     path("toggle-theme/", views.ThemeToggleView.as_view(), name="toggle_theme"),
+    # Request profiles captured on demand
+    path("profiles/", views.ProfileListView.as_view(), name="profile_list"),
+    path(
+        "profiles/<str:name>/",
+        views.ProfileDetailView.as_view(),
+        name="profile_detail",
+    ),
 ]
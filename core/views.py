@@ -5,10 +5,27 @@ from __future__ import annotations
 from typing import Any, Dict
 
 from django.conf import settings
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+    HttpResponseRedirect,
+)
+from django.shortcuts import render
 from django.utils import translation
 from django.views.generic import TemplateView, View
 
+from .metrics import registry
+from .profiling import (
+    SORT_KEYS,
+    format_profile,
+    list_profiles,
+    profile_path,
+    profiling_allowed,
+)
+
 
 class IndexView(TemplateView):
     """
@@ -114,3 +131,55 @@ class ThemeToggleView(View):
             return response
 
         return HttpResponseRedirect(next_url)
+
+
+class MetricsView(View):
+    """
+    Serve the request histograms in the Prometheus text format.
+
+    Only answers clients listed in ``INTERNAL_IPS``, so the endpoint can be
+    scraped locally without being exposed to players.
+    """
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        """Return the histograms recorded by this process."""
+        if request.META.get("REMOTE_ADDR") not in settings.INTERNAL_IPS:
+            raise Http404
+        return HttpResponse(
+            registry.expose(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+class ProfileListView(View):
+    """List the request profiles captured by ``ProfilerMiddleware``."""
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        """Display the saved profiles, newest first."""
+        if not profiling_allowed(request):
+            raise Http404
+        context = {"profiles": list_profiles(), "page_title": "Profiles"}
+        return render(request, "core/profile_list.html", context)
+
+
+class ProfileDetailView(View):
+    """Show or download one captured request profile."""
+
+    def get(self, request: HttpRequest, name: str) -> HttpResponseBase:
+        """Display the profile's report, or send the raw file with ``download``."""
+        path = profile_path(name) if profiling_allowed(request) else None
+        if path is None:
+            raise Http404
+        if "download" in request.GET:
+            return FileResponse(path.open("rb"), as_attachment=True, filename=name)
+
+        sort = request.GET.get("sort", SORT_KEYS[0])
+        if sort not in SORT_KEYS:
+            sort = SORT_KEYS[0]
+        context = {
+            "name": name,
+            "report": format_profile(path, sort),
+            "sort": sort,
+            "sort_keys": SORT_KEYS,
+            "page_title": "Profiles",
+        }
+        return render(request, "core/profile_detail.html", context)
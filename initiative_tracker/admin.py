@@ -2,17 +2,267 @@
 
 from __future__ import annotations
 
+from typing import Any, Dict, Tuple
+
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.db import connection, models
+from django.http import HttpRequest
+from django.utils.translation import gettext_lazy as _
+from django.utils.translation import ngettext
+
+from .fragments import invalidate_tracker
+from .history import compact, reroll
+from .library import matching_stat_blocks
+from .live import tracker_changed
+from .models import Character, Encounter, EncounterQuerySet, StatBlock
+
+# Query parameter carrying the last row of the previous page
+CURSOR_VAR = "cursor"
+
+# Filtered changelists count at most this many rows; beyond that the admin
+# shows "1000+" rather than scanning every match.
+COUNT_LIMIT = 1000
+
+
+@admin.register(Encounter)
+class EncounterAdmin(admin.ModelAdmin):
+    """Admin configuration for Encounter model, with set-based bulk actions."""
+
+    list_display = ("name", "created_at")
+    search_fields = ("name",)
+    actions = ("compact_positions", "reroll_initiative", "delete_with_characters")
+
+    def get_actions(self, request: HttpRequest, *args: Any) -> Dict[str, Any]:
+        """Replace ``delete_selected``, which loads every character it deletes."""
+        actions = super().get_actions(request, *args)
+        actions.pop("delete_selected", None)
+        return actions
+
+    @admin.action(
+        description=_("Compact positions of selected encounters"),
+        permissions=["change"],
+    )
+    def compact_positions(
+        self, request: HttpRequest, queryset: EncounterQuerySet
+    ) -> None:
+        """Space the characters' positions evenly again, keeping turn order."""
+        changed = compact(queryset)
+        _announce(Encounter.objects.filter(pk__in=list(changed)))
+        moved = sum(changed.values())
+        self.message_user(
+            request,
+            ngettext(
+                "Compacted the positions of %(count)d character.",
+                "Compacted the positions of %(count)d characters.",
+                moved,
+            )
+            % {"count": moved},
+        )
 
-from .models import Character
+    @admin.action(
+        description=_("Reroll initiative of selected encounters"),
+        permissions=["change"],
+    )
+    def reroll_initiative(
+        self, request: HttpRequest, queryset: EncounterQuerySet
+    ) -> None:
+        """Roll initiative for every character and restart the encounters."""
+        rolled = reroll(queryset)
+        _announce(queryset)
+        self.message_user(
+            request,
+            ngettext(
+                "Rolled initiative for %(count)d character.",
+                "Rolled initiative for %(count)d characters.",
+                rolled,
+            )
+            % {"count": rolled},
+        )
+
+    @admin.action(
+        description=_("Delete selected encounters and their characters"),
+        permissions=["delete"],
+    )
+    def delete_with_characters(
+        self, request: HttpRequest, queryset: EncounterQuerySet
+    ) -> None:
+        """Delete finished encounters with a few set-based statements."""
+        pks = list(queryset.values_list("pk", flat=True))
+        deleted = Encounter.objects.filter(pk__in=pks).delete_with_characters()
+        for pk in pks:
+            invalidate_tracker(pk)
+        self.message_user(
+            request,
+            ngettext(
+                "Deleted %(count)d encounter.",
+                "Deleted %(count)d encounters.",
+                deleted,
+            )
+            % {"count": deleted},
+        )
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist paginated by the last row shown instead of by page number.
+
+    Every page is an index seek of ``list_per_page + 1`` rows in turn order,
+    wherever it lies, where ``OFFSET`` would step over all earlier rows. The
+    total is an estimate and counts of filtered lists stop at
+    ``COUNT_LIMIT``, so no page scans the whole table.
+    """
+
+    def get_filters_params(self, params: Any = None) -> Dict[str, Any]:
+        """Keep the cursor out of the lookups applied to the queryset."""
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request: HttpRequest) -> None:
+        """Fetch the page after the cursor and estimate the count."""
+        cursor = self.params.get(CURSOR_VAR)
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(_after_row(_cursor_key(cursor)))
+        # A sliced queryset rather than a list, so list_editable can build its
+        # formset from the page; evaluating it here caches the rows for both
+        self.result_list = queryset[: self.list_per_page]
+        rows = list(self.result_list)
+        self.has_next = (
+            len(rows) == self.list_per_page
+            and queryset.filter(_after_row(_row_key(rows[-1]))).exists()
+        )
+        self.next_url = (
+            self.get_query_string({CURSOR_VAR: _cursor(rows[-1])})
+            if self.has_next
+            else None
+        )
+        self.first_url = self.get_query_string(remove=[CURSOR_VAR]) if cursor else None
+
+        self.count_estimated = not (self.query or self.get_filters_params())
+        if self.count_estimated:
+            self.count_capped = False
+            self.result_count = estimated_count(self.model)
+        else:
+            count = self.queryset.order_by()[: COUNT_LIMIT + 1].count()
+            self.count_capped = count > COUNT_LIMIT
+            self.result_count = min(count, COUNT_LIMIT)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = self.model_admin.get_paginator(
+            request, self.result_list, self.list_per_page
+        )
 
 
 @admin.register(Character)
 class CharacterAdmin(admin.ModelAdmin):
-    """Admin configuration for Character model."""
+    """
+    Admin configuration for Character model, built for millions of rows.
 
-    list_display = ("name", "initiative", "position", "created_at")
+    The list is fixed in the order of the turn order index and paginated
+    with a keyset cursor. Names are searched by prefix, which the
+    case-insensitive name index answers, and an encounter's characters are
+    listed with ``?encounter=<id>``, where the turn order index checks the
+    prefix. Initiative and position stay editable inline on every page.
+    """
+
+    change_list_template = "admin/initiative_tracker/character/change_list.html"
+    list_display = ("name", "encounter", "initiative", "position", "created_at")
     list_editable = ("initiative", "position")
     list_filter = ("created_at",)
-    search_fields = ("name",)
-    ordering = ("position", "-initiative")
+    list_select_related = ("encounter",)
+    raw_id_fields = ("encounter",)
+    search_fields = ("^name",)
+    ordering = ("encounter_id", "position", "-initiative", "pk")
+    sortable_by = ()
+    show_full_result_count = False
+
+    def get_changelist(self, request: HttpRequest, **kwargs: Any) -> type:
+        """Return the keyset-paginated changelist."""
+        return KeysetChangeList
+
+
+@admin.register(StatBlock)
+class StatBlockAdmin(admin.ModelAdmin):
+    """Admin configuration for StatBlock model, searched through its FTS index."""
+
+    list_display = ("name", "initiative_modifier", "roll_mode", "hit_points", "tags")
+    list_filter = ("roll_mode",)
+    search_fields = ("name", "tags")
+    ordering = ("name",)
+
+    def get_search_results(
+        self, request: HttpRequest, queryset: models.QuerySet[Any], search_term: str
+    ) -> Tuple[models.QuerySet[Any], bool]:
+        """Look the search term up in the full-text index instead of ``LIKE``."""
+        if not search_term:
+            return queryset, False
+        return queryset & matching_stat_blocks(search_term), False
+
+
+def estimated_count(model: type[models.Model]) -> int:
+    """
+    Return roughly how many rows ``model`` has, without counting them.
+
+    PostgreSQL keeps an estimate in its catalog; on SQLite the largest id is
+    read from the end of the primary key. Other databases count.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [table],
+            )
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return int(row[0])
+        elif connection.vendor == "sqlite":
+            cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+            return int(cursor.fetchone()[0] or 0)
+    return model._default_manager.count()
+
+
+def _announce(encounters: EncounterQuerySet) -> None:
+    """Refresh the trackers of ``encounters`` after a bulk change."""
+    for encounter in encounters.iterator():
+        tracker_changed(encounter)
+
+
+def _cursor(character: Character) -> str:
+    """Return the cursor of the page after ``character``."""
+    return "_".join(str(part) for part in _row_key(character))
+
+
+def _row_key(character: Character) -> Tuple[int, int, int, int]:
+    """Return the place of ``character`` in the changelist's order."""
+    return (
+        character.encounter_id,
+        character.position,
+        character.initiative,
+        character.pk,
+    )
+
+
+def _cursor_key(value: str) -> Tuple[int, int, int, int]:
+    """Parse a cursor; a malformed one is reported as a bad lookup."""
+    try:
+        encounter, position, initiative, pk = (int(part) for part in value.split("_"))
+    except ValueError:
+        raise IncorrectLookupParameters(value)
+    return encounter, position, initiative, pk
+
+
+def _after_row(key: Tuple[int, int, int, int]) -> models.Q:
+    """Return the filter for characters listed after the row at ``key``."""
+    encounter, position, initiative, pk = key
+    return models.Q(encounter__gt=encounter) | models.Q(encounter=encounter) & (
+        models.Q(position__gt=position)
+        | models.Q(position=position, initiative__lt=initiative)
+        | models.Q(position=position, initiative=initiative, pk__gt=pk)
+    )
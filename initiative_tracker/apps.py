@@ -11,3 +11,7 @@ class InitiativeTrackerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "initiative_tracker"
     verbose_name = "Initiative Tracker"
+
+    def ready(self) -> None:
+        """Connect the signal handlers of the app."""
+        from . import signals  # noqa: F401
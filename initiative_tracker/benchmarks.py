@@ -0,0 +1,244 @@
+"""Benchmarks of every TrackerView action across encounter sizes."""
+
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+
+import django
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .fragments import bump_tracker_version
+from .models import RANK_GAP, Character, Encounter
+
+DEFAULT_SIZES = (10, 1_000, 100_000)
+
+# The timed callable of a case: one request through the test client, which
+# returns its own response type rather than an ``HttpResponse``.
+Request = Callable[[], Any]
+
+# A case prepares one request against an encounter (outside the timing) and
+# returns the callable that is timed.
+Case = Callable[[Client, Encounter], Request]
+
+
+class BenchmarkResult(NamedTuple):
+    """Measurements of one case at one encounter size."""
+
+    case: str
+    size: int
+    queries: int
+    wall_ms_median: float
+    wall_ms_min: float
+    peak_kib: float
+    repeat: int
+
+
+def _url(name: str, encounter: Encounter, *args: Any) -> str:
+    """Return the URL of a tracker route of ``encounter``."""
+    return reverse(f"initiative_tracker:{name}", args=[encounter.pk, *args])
+
+
+def _get_full(client: Client, encounter: Encounter) -> Request:
+    """Render the full page after a mutation (cold render cache)."""
+    bump_tracker_version(encounter.pk)
+    return lambda: client.get(_url("tracker", encounter))
+
+
+def _get_htmx(client: Client, encounter: Encounter) -> Request:
+    """Render the HTMX partial after a mutation (cold render cache)."""
+    bump_tracker_version(encounter.pk)
+    return lambda: client.get(_url("tracker", encounter), HTTP_HX_REQUEST="true")
+
+
+def _get_htmx_cached(client: Client, encounter: Encounter) -> Request:
+    """Serve the HTMX partial between mutations (warm render cache)."""
+    client.get(_url("tracker", encounter), HTTP_HX_REQUEST="true")
+    return lambda: client.get(_url("tracker", encounter), HTTP_HX_REQUEST="true")
+
+
+def _add(client: Client, encounter: Encounter) -> Request:
+    """Add one character through the HTMX form."""
+    return lambda: client.post(
+        _url("add_character", encounter),
+        {"action": "add", "name": "Benchmark", "initiative": 10, "position": 0},
+        HTTP_HX_REQUEST="true",
+    )
+
+
+def _delete(client: Client, encounter: Encounter) -> Request:
+    """Delete one character through HTMX."""
+    victim = Character.objects.create(encounter=encounter, name="Victim")
+    return lambda: client.post(
+        _url("delete_character", encounter, victim.pk), HTTP_HX_REQUEST="true"
+    )
+
+
+def _next_turn(client: Client, encounter: Encounter) -> Request:
+    """Advance the turn cursor through HTMX."""
+    return lambda: client.post(
+        _url("next_turn", encounter), {"action": "next_turn"}, HTTP_HX_REQUEST="true"
+    )
+
+
+def _reorder(client: Client, encounter: Encounter) -> Request:
+    """Nudge a character's position through HTMX."""
+    character = encounter.turn_order().only("pk").first()
+    assert character is not None
+    return lambda: client.post(
+        _url("reorder", encounter),
+        {"action": "reorder_increase", "pk": character.pk},
+        HTTP_HX_REQUEST="true",
+    )
+
+
+CASES: Dict[str, Case] = {
+    "get_full": _get_full,
+    "get_htmx": _get_htmx,
+    "get_htmx_cached": _get_htmx_cached,
+    "add": _add,
+    "delete": _delete,
+    "next_turn": _next_turn,
+    "reorder": _reorder,
+}
+
+
+def seed_encounter(size: int) -> Encounter:
+    """Create an encounter with ``size`` characters in gapped positions."""
+    encounter = Encounter.objects.create(name=f"Benchmark {size}")
+    Character.objects.bulk_create(
+        (
+            Character(
+                encounter=encounter,
+                name=f"Goblin {i}",
+                initiative=i % 20,
+                position=(i + 1) * RANK_GAP,
+            )
+            for i in range(size)
+        ),
+        batch_size=500,
+    )
+    return encounter
+
+
+def measure(
+    name: str, case: Case, encounter: Encounter, size: int, repeat: int
+) -> BenchmarkResult:
+    """
+    Time ``case`` ``repeat`` times and measure its queries and peak memory.
+
+    Memory is traced in one extra run, as tracing slows down the timed ones.
+    """
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        action = case(Client(), encounter)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = action()
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} failed with {response.status_code}")
+        queries = len(captured)
+
+    action = case(Client(), encounter)
+    tracemalloc.start()
+    try:
+        action()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        case=name,
+        size=size,
+        queries=queries,
+        wall_ms_median=round(statistics.median(timings), 3),
+        wall_ms_min=round(min(timings), 3),
+        peak_kib=round(peak / 1024, 1),
+        repeat=repeat,
+    )
+
+
+def run_benchmarks(
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    repeat: int = 5,
+    cases: Iterable[str] | None = None,
+) -> List[BenchmarkResult]:
+    """Seed one encounter per size and measure every case against it."""
+    names = list(cases) if cases is not None else list(CASES)
+    results = []
+    for size in sizes:
+        encounter = seed_encounter(size)
+        for name in names:
+            results.append(measure(name, CASES[name], encounter, size, repeat))
+        encounter.delete()
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """Describe where the results were measured, to compare runs later."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "machine": platform.machine(),
+    }
+
+
+def to_json(results: Iterable[BenchmarkResult]) -> str:
+    """Serialize results together with their environment."""
+    return json.dumps(
+        {"environment": environment(), "results": [r._asdict() for r in results]},
+        indent=2,
+    )
+
+
+def compare(
+    results: Iterable[BenchmarkResult],
+    baseline: Dict[str, Any],
+    threshold: float = 1.25,
+) -> List[str]:
+    """
+    Return the regressions of ``results`` against a previous JSON report.
+
+    A case regresses when it runs more queries than before, or when its
+    median wall time grew by more than ``threshold`` times.
+    """
+    previous = {(r["case"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result.case, result.size))
+        if before is None:
+            continue
+        label = f"{result.case} @ {result.size}"
+        if result.queries > before["queries"]:
+            regressions.append(
+                f"{label}: {before['queries']} -> {result.queries} queries"
+            )
+        if result.wall_ms_median > before["wall_ms_median"] * threshold:
+            regressions.append(
+                f"{label}: {before['wall_ms_median']:.2f} -> "
+                f"{result.wall_ms_median:.2f} ms"
+            )
+    return regressions
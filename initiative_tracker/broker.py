@@ -0,0 +1,129 @@
+"""Fan-out of live tracker updates to every connected viewer."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from collections import defaultdict
+from typing import Any, AsyncGenerator, DefaultDict, NamedTuple, Set, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = "initiative_tracker.broker.InProcessBroker"
+
+
+class Message(NamedTuple):
+    """A single event pushed to the subscribers of a channel."""
+
+    event: str
+    data: str
+
+
+class Broker:
+    """
+    Interface of a publish/subscribe channel for tracker updates.
+
+    ``publish`` is called from regular (synchronous) views once per mutation;
+    ``subscribe`` is consumed by the asynchronous streaming view, once per
+    connected viewer. Implementations backed by an external service (e.g.
+    Redis pub/sub) can be plugged in through the ``TRACKER_BROKER`` setting.
+    """
+
+    def publish(self, channel: str, message: Message) -> None:
+        """Deliver ``message`` to every current subscriber of ``channel``."""
+        raise NotImplementedError
+
+    def subscribe(
+        self, channel: str, keepalive: float | None = None
+    ) -> AsyncGenerator[Message | None, None]:
+        """
+        Yield the messages published to ``channel`` from now on.
+
+        When ``keepalive`` is given, ``None`` is yielded after that many
+        seconds without a message so the caller can keep the connection open.
+        """
+        raise NotImplementedError
+
+    def has_subscribers(self, channel: str) -> bool:
+        """Return whether publishing to ``channel`` would reach anyone."""
+        return True
+
+
+class InProcessBroker(Broker):
+    """
+    Broker delivering messages to subscribers within the same process.
+
+    Every subscriber owns a small bounded queue on its own event loop. When a
+    slow viewer falls behind, its oldest message is dropped: each message is a
+    complete snapshot of the tracker, so only the newest one matters.
+    """
+
+    max_backlog = 8
+
+    def __init__(self) -> None:
+        """Initialize the subscriber registry."""
+        self._lock = threading.Lock()
+        self._subscribers: DefaultDict[
+            str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue[Message]]]
+        ] = defaultdict(set)
+
+    def publish(self, channel: str, message: Message) -> None:
+        """Hand ``message`` to each subscriber's event loop."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # The subscriber's loop has been closed; it unsubscribes itself.
+                continue
+
+    async def subscribe(
+        self, channel: str, keepalive: float | None = None
+    ) -> AsyncGenerator[Message | None, None]:
+        """Register a queue on the running loop and drain it."""
+        queue: asyncio.Queue[Message] = asyncio.Queue(maxsize=self.max_backlog)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(entry)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def has_subscribers(self, channel: str) -> bool:
+        """Return whether anyone in this process listens on ``channel``."""
+        with self._lock:
+            return bool(self._subscribers.get(channel))
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue[Message], message: Message) -> None:
+        """Enqueue ``message``, dropping the oldest one when the queue is full."""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+
+@functools.cache
+def get_broker() -> Broker:
+    """Return the broker configured by the ``TRACKER_BROKER`` setting."""
+    broker_class = import_string(getattr(settings, "TRACKER_BROKER", DEFAULT_BROKER))
+    return broker_class()
+
+
+@receiver(setting_changed)
+def _reset_broker(*, setting: str, **kwargs: Any) -> None:
+    """Drop the cached broker when tests override ``TRACKER_BROKER``."""
+    if setting == "TRACKER_BROKER":
+        get_broker.cache_clear()
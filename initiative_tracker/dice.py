@@ -0,0 +1,39 @@
+"""Server-side dice for rolling initiative."""
+
+from __future__ import annotations
+
+import random
+from typing import List, Sequence
+
+D20 = range(1, 21)
+
+ADVANTAGE = "advantage"
+DISADVANTAGE = "disadvantage"
+
+
+def roll_d20s(
+    modes: Sequence[str], modifiers: Sequence[int], rng: random.Random
+) -> List[int]:
+    """
+    Roll one modified d20 per creature, for all of them in one batch.
+
+    Two dice are drawn for every creature whatever its mode, so the same seed
+    gives a creature the same dice even after advantage is switched on. With
+    advantage the higher die is kept, with disadvantage the lower one.
+    """
+    dice = rng.choices(D20, k=2 * len(modes))
+    return [
+        _keep(mode, first, second) + modifier
+        for mode, modifier, first, second in zip(
+            modes, modifiers, dice[0::2], dice[1::2]
+        )
+    ]
+
+
+def _keep(mode: str, first: int, second: int) -> int:
+    """Return the die kept for ``mode`` out of two rolled dice."""
+    if mode == ADVANTAGE:
+        return max(first, second)
+    if mode == DISADVANTAGE:
+        return min(first, second)
+    return first
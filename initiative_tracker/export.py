@@ -0,0 +1,151 @@
+"""Streaming exports of encounters, characters and combat logs."""
+
+from __future__ import annotations
+
+import csv
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from .models import TURN_ORDER, Character, CombatEvent, Encounter
+
+# Rows fetched from the database cursor at a time, and sent per chunk of the
+# response: large enough to keep the overhead per row low, small enough to
+# keep memory flat and the first bytes going out right away.
+EXPORT_CHUNK_SIZE = 2000
+
+# Columns of each export, in order
+EXPORTS: Dict[str, Tuple[str, ...]] = {
+    "encounters": ("id", "name", "round_number", "turn_index", "created_at"),
+    "characters": (
+        "id",
+        "encounter_id",
+        "name",
+        "initiative",
+        "position",
+        "initiative_modifier",
+        "roll_mode",
+        "created_at",
+    ),
+    "events": (
+        "encounter_id",
+        "sequence",
+        "action",
+        "round_number",
+        "turn_index",
+        "rows",
+        "removed",
+        "created_at",
+    ),
+}
+
+# Content type of each export format
+EXPORT_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+class _Echo:
+    """File-like object handing back what the CSV writer writes."""
+
+    def write(self, value: str) -> str:
+        """Return ``value`` instead of storing it."""
+        return value
+
+
+_csv_writer = csv.writer(_Echo())
+
+
+def export_rows(kind: str, encounter_pk: int | None = None) -> models.QuerySet[Any]:
+    """
+    Return the rows of the ``kind`` export as tuples of its columns.
+
+    Rows come in index order, so no sort is needed: encounters by id,
+    characters in turn order per encounter, events by sequence. With
+    ``encounter_pk`` only that encounter's rows are exported.
+    """
+    queryset: models.QuerySet[Any]
+    if kind == "encounters":
+        queryset = Encounter.objects.order_by("pk")
+        lookup = "pk"
+    elif kind == "characters":
+        queryset = Character.objects.order_by("encounter_id", *TURN_ORDER)
+        lookup = "encounter_id"
+    else:
+        queryset = CombatEvent.objects.order_by("encounter_id", "sequence")
+        lookup = "encounter_id"
+    if encounter_pk is not None:
+        queryset = queryset.filter(**{lookup: encounter_pk})
+    return queryset.values_list(*EXPORTS[kind])
+
+
+def export_filename(kind: str, fmt: str, encounter_pk: int | None = None) -> str:
+    """Return the file name an export is downloaded as."""
+    prefix = f"encounter-{encounter_pk}-" if encounter_pk is not None else ""
+    return f"{prefix}{kind}.{fmt}"
+
+
+def export_lines(kind: str, fmt: str, encounter_pk: int | None = None) -> Iterator[str]:
+    """
+    Yield the ``kind`` export in format ``fmt``, ``EXPORT_CHUNK_SIZE`` rows a time.
+
+    The rows are read through a database cursor and never held all at once,
+    so the memory used does not depend on the size of the export. CSV starts
+    with a header line; JSON Lines has one object per row.
+    """
+    columns = EXPORTS[kind]
+    if fmt == "csv":
+        yield _csv_line(columns)
+    lines: List[str] = []
+    rows = export_rows(kind, encounter_pk).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        lines.append(_format_row(fmt, columns, row))
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+async def aexport_lines(
+    kind: str, fmt: str, encounter_pk: int | None = None
+) -> AsyncIterator[str]:
+    """
+    Async version of ``export_lines()``.
+
+    Every chunk is produced in the thread of the synchronous ORM, where the
+    cursor lives. ``aiterator()`` would run the query of a ``values_list()``
+    queryset on the event loop, which Django refuses.
+    """
+    chunks = export_lines(kind, fmt, encounter_pk)
+    next_chunk = sync_to_async(_next_chunk)
+    while (chunk := await next_chunk(chunks)) is not None:
+        yield chunk
+
+
+def _next_chunk(chunks: Iterator[str]) -> str | None:
+    """Return the next chunk of an export, or ``None`` at its end."""
+    return next(chunks, None)
+
+
+def _format_row(fmt: str, columns: Sequence[str], row: Sequence[Any]) -> str:
+    """Return ``row`` as one line of format ``fmt``."""
+    if fmt == "csv":
+        return _csv_line([_csv_value(value) for value in row])
+    return json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def _csv_line(values: Sequence[Any]) -> str:
+    """Return ``values`` as one CSV line."""
+    return _csv_writer.writerow(values)
+
+
+def _csv_value(value: Any) -> Any:
+    """Spell out values CSV has no notation for."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
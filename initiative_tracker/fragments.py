@@ -0,0 +1,90 @@
+"""Versioned cache of the rendered tracker fragment."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.safestring import SafeString, mark_safe
+
+TRACKER_TEMPLATE = "initiative_tracker/tracker_partial.html"
+
+# Stand-in for the CSRF token inside cached HTML. It is swapped for the
+# requesting user's token on every response, so one rendering serves everyone.
+CSRF_PLACEHOLDER = "__tracker_csrf_token__"
+
+# Fragments of old versions are never read again; let the cache expire them.
+FRAGMENT_TIMEOUT = 60 * 60
+
+
+def _version_key(encounter_pk: int) -> str:
+    """Return the cache key holding the encounter's render version."""
+    return f"initiative_tracker:version:{encounter_pk}"
+
+
+def _fragment_key(encounter_pk: int, version: int, language: str) -> str:
+    """Return the cache key of one rendering of the encounter's tracker."""
+    return f"initiative_tracker:tracker:{encounter_pk}:{version}:{language}"
+
+
+async def atracker_version(encounter_pk: int) -> int:
+    """
+    Return the encounter's current render version.
+
+    A missing version (never rendered, or evicted) starts from the clock, so it
+    can never collide with a version that older fragments were stored under.
+    """
+    key = _version_key(encounter_pk)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def bump_tracker_version(encounter_pk: int) -> None:
+    """
+    Orphan every cached rendering of the encounter's tracker.
+
+    The new version is the current time in nanoseconds, so it doubles as the
+    tracker's modification time for conditional requests.
+    """
+    cache.set(_version_key(encounter_pk), time.time_ns(), None)
+
+
+def invalidate_tracker(encounter_pk: int) -> None:
+    """
+    Bump the encounter's render version now and once the transaction commits.
+
+    The immediate bump keeps the writer's own response fresh; the second one
+    drops anything a concurrent reader rendered from the uncommitted state.
+    """
+    bump_tracker_version(encounter_pk)
+    transaction.on_commit(lambda: bump_tracker_version(encounter_pk))
+
+
+async def acached_tracker(encounter_pk: int, version: int) -> Tuple[str, str | None]:
+    """Return the fragment's cache key for ``version`` and its HTML, if any."""
+    key = _fragment_key(encounter_pk, version, translation.get_language())
+    return key, await cache.aget(key)
+
+
+async def arender_tracker(key: str, context: Dict[str, Any]) -> str:
+    """Render the tracker fragment once for everyone and store it at ``key``."""
+    html = render_to_string(
+        TRACKER_TEMPLATE, {**context, "csrf_token": CSRF_PLACEHOLDER}
+    )
+    await cache.aset(key, html, FRAGMENT_TIMEOUT)
+    return html
+
+
+def with_csrf_token(request: HttpRequest, html: str) -> SafeString:
+    """Fill the requesting user's CSRF token into a cached fragment."""
+    return mark_safe(html.replace(CSRF_PLACEHOLDER, get_token(request)))
@@ -0,0 +1,282 @@
+"""Combat log of an encounter: recorded actions, snapshots, undo and redo."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F, Max
+
+from .models import (
+    HISTORY_FIELDS,
+    Character,
+    CombatEvent,
+    CombatSnapshot,
+    Encounter,
+    EncounterQuerySet,
+)
+
+# Events between two snapshots. Restoring any point of the log replays at most
+# this many events, however long the fight has been going.
+SNAPSHOT_INTERVAL = 50
+
+# A character's recorded columns keyed by name, plus its ``pk``.
+Row = Dict[str, Any]
+
+
+def history_row(character: Character, *fields: str) -> Row:
+    """Return the recorded ``fields`` of ``character`` (default: all of them)."""
+    return {
+        "pk": character.pk,
+        **{f: getattr(character, f) for f in fields or HISTORY_FIELDS},
+    }
+
+
+def checkpoint(encounter: Encounter) -> None:
+    """
+    Snapshot the encounter before the first action it records.
+
+    The snapshot is the state that undoing every recorded action returns to,
+    including characters that existed before the log did. Once an action is
+    recorded this costs nothing.
+    """
+    if encounter.history_size == 0:
+        _snapshot(encounter, 0)
+
+
+async def acheckpoint(encounter: Encounter) -> None:
+    """Async version of ``checkpoint()``."""
+    if encounter.history_size == 0:
+        await sync_to_async(_snapshot)(encounter, 0)
+
+
+def record(
+    encounter: Encounter,
+    action: str,
+    rows: Iterable[Mapping[str, Any]] = (),
+    removed: Iterable[int] = (),
+) -> CombatEvent:
+    """
+    Append ``action`` to the encounter's combat log.
+
+    ``rows`` hold the new values of the columns the action changed, each with
+    the character's ``pk``; added characters carry all their columns.
+    ``removed`` lists the ids of deleted characters, and the turn cursor is
+    taken from ``encounter``. Recording after an undo drops the undone events,
+    which can then no longer be redone. Every ``SNAPSHOT_INTERVAL`` events the
+    whole state is snapshotted.
+    """
+    sequence = _claim_sequence(encounter)
+    event = CombatEvent.objects.create(
+        encounter=encounter,
+        sequence=sequence,
+        action=action,
+        rows=list(rows),
+        removed=list(removed),
+        turn_index=encounter.turn_index,
+        round_number=encounter.round_number,
+    )
+    if sequence % SNAPSHOT_INTERVAL == 0:
+        _snapshot(encounter, sequence)
+    return event
+
+
+async def arecord(
+    encounter: Encounter,
+    action: str,
+    rows: Iterable[Mapping[str, Any]] = (),
+    removed: Iterable[int] = (),
+) -> CombatEvent:
+    """Async version of ``record()``."""
+    return await sync_to_async(record)(encounter, action, list(rows), list(removed))
+
+
+def compact(encounters: EncounterQuerySet) -> Dict[int, int]:
+    """
+    Compact the positions of ``encounters`` and log it in their combat logs.
+
+    Events recorded afterwards carry the new positions, so undo and redo have
+    to replay them on top of the compacted ones. Encounters without a log are
+    not recorded: their first snapshot will hold the new positions. Returns
+    the number of characters moved per encounter that changed.
+    """
+    with transaction.atomic():
+        changed = encounters.compact_positions()
+        logged = Encounter.objects.filter(pk__in=list(changed), history_size__gt=0)
+        for encounter in logged.iterator():
+            record(
+                encounter,
+                "compact",
+                encounter.characters.order_by().values("pk", "position"),
+            )
+    return changed
+
+
+def reroll(encounters: EncounterQuerySet) -> int:
+    """
+    Reroll initiative of ``encounters`` and log it in their combat logs.
+
+    Like ``compact()`` the change is recorded in the same transaction, so an
+    undo replays later events on top of the new rolls instead of writing the
+    old positions back under them. Encounters without a log are not
+    recorded. Returns the characters rolled for.
+    """
+    with transaction.atomic():
+        rolled = encounters.reroll_initiative()
+        logged = Encounter.objects.filter(
+            pk__in=encounters.values("pk"), history_size__gt=0
+        )
+        for encounter in logged.iterator():
+            record(
+                encounter,
+                "roll_initiative",
+                encounter.characters.order_by().values("pk", "initiative", "position"),
+            )
+    return rolled
+
+
+def restore(encounter: Encounter, sequence: int) -> bool:
+    """
+    Bring the encounter back to its state right after event ``sequence``.
+
+    The nearest snapshot at or before ``sequence`` is loaded and the events
+    since replayed in memory, so the cost does not grow with the length of
+    the log. Only characters that differ from the result are written, in one
+    transaction. The events themselves are kept for redo. Returns ``False``
+    when the log does not cover ``sequence``.
+    """
+    if not 0 <= sequence <= encounter.history_size:
+        return False
+    with transaction.atomic():
+        snapshot = (
+            encounter.snapshots.filter(sequence__lte=sequence)
+            .order_by("-sequence")
+            .first()
+        )
+        if snapshot is None:
+            return False
+        events = encounter.events.filter(
+            sequence__gt=snapshot.sequence, sequence__lte=sequence
+        )
+        characters, turn_index, round_number = _replay(snapshot, events)
+        _write_characters(encounter, characters)
+        Encounter.objects.filter(pk=encounter.pk).update(
+            turn_index=turn_index,
+            round_number=round_number,
+            history_head=sequence,
+            turn_version=F("turn_version") + 1,
+        )
+    encounter.turn_index = turn_index
+    encounter.round_number = round_number
+    encounter.history_head = sequence
+    encounter.turn_version += 1
+    return True
+
+
+async def arestore(encounter: Encounter, sequence: int) -> bool:
+    """Async version of ``restore()``."""
+    return await sync_to_async(restore)(encounter, sequence)
+
+
+def rewind_point(encounter: Encounter, round_number: int) -> int | None:
+    """
+    Return the sequence of the event that started round ``round_number``.
+
+    Looks at the most recent stretch of the log spent in that round, up to the
+    current head. Returns ``None`` when the log never reached the round.
+    """
+    events = encounter.events.filter(sequence__lte=encounter.history_head)
+    last = events.filter(round_number=round_number).aggregate(last=Max("sequence"))
+    if last["last"] is None:
+        return None
+    before = (
+        events.filter(sequence__lt=last["last"])
+        .exclude(round_number=round_number)
+        .aggregate(before=Max("sequence"))
+    )
+    return (before["before"] or 0) + 1
+
+
+async def arewind_point(encounter: Encounter, round_number: int) -> int | None:
+    """Async version of ``rewind_point()``."""
+    return await sync_to_async(rewind_point)(encounter, round_number)
+
+
+def _claim_sequence(encounter: Encounter) -> int:
+    """
+    Reserve the next sequence of the encounter's log and return it.
+
+    Undone events past the head are dropped first. The head moves with a
+    conditional UPDATE, so of two concurrent recordings the later one retries
+    behind the earlier instead of taking the same sequence.
+    """
+    while True:
+        head = encounter.history_head
+        if encounter.history_size > head:
+            encounter.events.filter(sequence__gt=head).delete()
+            encounter.snapshots.filter(sequence__gt=head).delete()
+        claimed = Encounter.objects.filter(pk=encounter.pk, history_head=head).update(
+            history_head=head + 1, history_size=head + 1
+        )
+        if claimed:
+            encounter.history_head = encounter.history_size = head + 1
+            return head + 1
+        encounter.refresh_from_db(fields=["history_head", "history_size"])
+
+
+def _snapshot(encounter: Encounter, sequence: int) -> None:
+    """Store the encounter's current state as of event ``sequence``."""
+    characters = list(encounter.characters.order_by("pk").values("pk", *HISTORY_FIELDS))
+    CombatSnapshot.objects.bulk_create(
+        [
+            CombatSnapshot(
+                encounter=encounter,
+                sequence=sequence,
+                characters=characters,
+                turn_index=encounter.turn_index,
+                round_number=encounter.round_number,
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=["encounter", "sequence"],
+        update_fields=["characters", "turn_index", "round_number"],
+    )
+
+
+def _replay(
+    snapshot: CombatSnapshot, events: Iterable[CombatEvent]
+) -> Tuple[Dict[int, Row], int, int]:
+    """Apply ``events`` to ``snapshot``; return the characters and the cursor."""
+    characters = {row["pk"]: row for row in snapshot.characters}
+    turn_index, round_number = snapshot.turn_index, snapshot.round_number
+    for event in events:
+        for row in event.rows:
+            current = characters.get(row["pk"])
+            if current is not None:
+                current.update(row)
+            elif set(HISTORY_FIELDS) <= row.keys():
+                characters[row["pk"]] = row
+        for pk in event.removed:
+            characters.pop(pk, None)
+        turn_index, round_number = event.turn_index, event.round_number
+    return characters, turn_index, round_number
+
+
+def _write_characters(encounter: Encounter, characters: Dict[int, Row]) -> None:
+    """Make the encounter's characters match ``characters``, touching only diffs."""
+    current = {
+        row["pk"]: row for row in encounter.characters.values("pk", *HISTORY_FIELDS)
+    }
+    stale = current.keys() - characters.keys()
+    if stale:
+        encounter.characters.filter(pk__in=stale).delete()
+    missing: List[Character] = []
+    changed: List[Character] = []
+    for pk, row in characters.items():
+        if pk not in current:
+            missing.append(Character(encounter=encounter, **row))
+        elif row != current[pk]:
+            changed.append(Character(encounter=encounter, **row))
+    Character.objects.bulk_create(missing)
+    Character.objects.bulk_update(changed, HISTORY_FIELDS)
@@ -0,0 +1,142 @@
+"""Stat-block library: full-text search and adding creatures to encounters."""
+
+from __future__ import annotations
+
+import random
+import re
+from typing import List
+
+from asgiref.sync import sync_to_async
+from django.db import connection, models
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .dice import roll_d20s
+from .models import Character, Encounter, StatBlock
+
+# Stat blocks returned per search
+LIBRARY_RESULTS = 20
+
+# FTS5 index over the name and tags of the stat blocks, kept in sync by
+# triggers (see migration 0010). External content: the index stores no copy
+# of the text, only the tokens pointing at ``StatBlock`` rows.
+SEARCH_TABLE = "initiative_tracker_statblock_fts"
+
+# Shorter words are left out of a search: a one-letter prefix matches a good
+# part of any library, which only slows the lookup down while typing.
+MIN_TERM_LENGTH = 2
+
+_TERM_RE = re.compile(r"\w+")
+
+
+def search_terms(query: str) -> List[str]:
+    """Return the words of ``query`` worth searching for."""
+    return [t for t in _TERM_RE.findall(query) if len(t) >= MIN_TERM_LENGTH]
+
+
+def match_expression(query: str) -> str:
+    """
+    Return the FTS5 query finding stat blocks as ``query`` is typed.
+
+    Every word becomes a quoted prefix term, so "gob arch" finds "Goblin
+    Archer" and operators typed by the user are matched as plain text.
+    """
+    return " ".join(f'"{term}"*' for term in search_terms(query))
+
+
+def search_stat_blocks(query: str, limit: int = LIBRARY_RESULTS) -> List[StatBlock]:
+    """
+    Return the stat blocks whose name or tags start with the words of ``query``.
+
+    On SQLite the FTS5 index answers from its prefix index, best matches
+    first, so a lookup stays in the low milliseconds however large the
+    library. Other databases fall back to a scan for the same word prefixes,
+    ordered by name.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    if connection.vendor != "sqlite":
+        return list(matching_stat_blocks(query)[:limit])
+    table = StatBlock._meta.db_table
+    return list(
+        StatBlock.objects.raw(
+            f"SELECT s.* FROM {SEARCH_TABLE} f "
+            f"JOIN {table} s ON s.id = f.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH %s ORDER BY f.rank, s.name LIMIT %s",
+            [match_expression(query), limit],
+        )
+    )
+
+
+def matching_stat_blocks(query: str) -> models.QuerySet[StatBlock]:
+    """
+    Return all stat blocks matching ``query``, as a queryset to refine further.
+
+    Used where results are filtered, sorted and paginated elsewhere, such as
+    the admin. ``search_stat_blocks()`` is faster for a handful of results.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return StatBlock.objects.none()
+    if connection.vendor != "sqlite":
+        blocks = StatBlock.objects.all()
+        for term in terms:
+            blocks = blocks.filter(_word_prefix(term))
+        return blocks
+    return StatBlock.objects.filter(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+            [match_expression(query)],
+        )
+    )
+
+
+def _word_prefix(term: str) -> Q:
+    """
+    Match stat blocks with a word of the name or tags starting with ``term``.
+
+    What the FTS5 prefix query matches, so results do not depend on the
+    database. Terms are made of word characters only and need no escaping.
+    """
+    pattern = rf"(^|\W){term}"
+    return Q(name__iregex=pattern) | Q(tags__iregex=pattern)
+
+
+async def asearch_stat_blocks(
+    query: str, limit: int = LIBRARY_RESULTS
+) -> List[StatBlock]:
+    """Async version of ``search_stat_blocks()``."""
+    return await sync_to_async(search_stat_blocks)(query, limit)
+
+
+def stat_block_characters(
+    stat_block: StatBlock,
+    encounter: Encounter,
+    copies: int,
+    position: int,
+    seed: int | None = None,
+) -> List[Character]:
+    """
+    Return ``copies`` unsaved characters of ``stat_block`` for ``encounter``.
+
+    Every copy rolls its own initiative with the creature's modifier and
+    advantage, from one batch of dice. The copies share ``position``, so
+    their rolls decide their order; several copies are numbered.
+    """
+    rolls = roll_d20s(
+        [stat_block.roll_mode] * copies,
+        [stat_block.initiative_modifier] * copies,
+        random.Random(seed),
+    )
+    return [
+        Character(
+            encounter=encounter,
+            name=f"{stat_block.name} {number}" if copies > 1 else stat_block.name,
+            initiative=roll,
+            position=position,
+            initiative_modifier=stat_block.initiative_modifier,
+            roll_mode=stat_block.roll_mode,
+        )
+        for number, roll in enumerate(rolls, start=1)
+    ]
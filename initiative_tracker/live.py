@@ -0,0 +1,77 @@
+"""Live updates of an encounter's tracker for connected viewers."""
+
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import translation
+
+from .broker import Message, get_broker
+from .fragments import invalidate_tracker
+from .models import Encounter
+
+
+def tracker_channel(encounter_pk: int, language: str) -> str:
+    """Return the broker channel of an encounter's tracker in ``language``."""
+    return f"tracker.{encounter_pk}.{language}"
+
+
+def render_live_tracker(encounter: Encounter) -> str:
+    """Render the read-only tracker fragment shown to spectators."""
+    characters, current_turn = encounter.tracker_rows()
+    return render_to_string(
+        "initiative_tracker/_live_tracker.html",
+        {
+            "encounter": encounter,
+            "characters": characters,
+            "current_turn": current_turn,
+        },
+    )
+
+
+def publish_tracker(encounter: Encounter) -> None:
+    """
+    Push the encounter's current tracker to everyone watching it.
+
+    The fragment is rendered once per language that has listeners, no matter
+    how many viewers share that language, and contains no per-user data such
+    as CSRF tokens so every subscriber can use the same bytes.
+    """
+    broker = get_broker()
+    for language, _name in settings.LANGUAGES:
+        channel = tracker_channel(encounter.pk, language)
+        if not broker.has_subscribers(channel):
+            continue
+        with translation.override(language):
+            html = render_live_tracker(encounter)
+        broker.publish(channel, Message("tracker", html))
+
+
+def tracker_changed(encounter: Encounter) -> None:
+    """
+    Record a mutation of ``encounter``.
+
+    The cached tracker fragment is invalidated and the new state is pushed to
+    live viewers once the transaction commits.
+    """
+    invalidate_tracker(encounter.pk)
+    transaction.on_commit(lambda: publish_tracker(encounter))
+
+
+async def atracker_changed(encounter: Encounter) -> None:
+    """
+    Async version of ``tracker_changed()``.
+
+    Runs in the thread of the synchronous ORM, whose connection owns the
+    transaction that the announcement waits for.
+    """
+    await sync_to_async(tracker_changed)(encounter)
+
+
+def format_event(message: Message) -> str:
+    """Serialize ``message`` in the Server-Sent Events wire format."""
+    lines = message.data.splitlines() or [""]
+    data = "".join(f"data: {line}\n" for line in lines)
+    return f"event: {message.event}\n{data}\n"
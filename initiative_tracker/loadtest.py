@@ -0,0 +1,325 @@
+"""Soak test running many virtual tables concurrently against a live server."""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from typing import Any, Dict, Iterable, List, NamedTuple, Set
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin, urlsplit
+from urllib.request import HTTPCookieProcessor, OpenerDirector, Request, build_opener
+
+from django.urls import resolve, reverse
+from django.utils import translation
+
+# Rough shape of a game night: the GM mostly clicks "Next turn", now and then
+# a combatant joins, dies or swaps places, and someone reloads the page.
+DEFAULT_MIX: Dict[str, int] = {
+    "next_turn": 60,
+    "add": 12,
+    "reorder": 12,
+    "delete": 8,
+    "refresh": 8,
+}
+
+ROW_ID = re.compile(r'id="character-(\d+)"')
+REMOVED_ROW_ID = re.compile(r'id="character-(\d+)" hx-swap-oob="delete"')
+LOCKED = b"database is locked"
+
+
+class Sample(NamedTuple):
+    """Outcome of one request made by a virtual table."""
+
+    action: str
+    latency_ms: float
+    status: int
+    locked: bool
+
+
+class Stats(NamedTuple):
+    """Aggregated samples of one action, or of all of them."""
+
+    action: str
+    requests: int
+    errors: int
+    locked: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    throughput: float
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, round(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def mix_from_string(value: str) -> Dict[str, int]:
+    """Parse ``"next_turn=60,add=10"`` into a mix, rejecting unknown actions."""
+    mix = {}
+    for part in value.split(","):
+        action, _, weight = part.partition("=")
+        action = action.strip()
+        if action not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action {action!r}")
+        mix[action] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one positive weight")
+    return mix
+
+
+class LockCounter:
+    """
+    Count database lock errors raised inside an in-process server.
+
+    A remote server only shows its lock errors in DEBUG tracebacks; next to an
+    in-process one the harness can listen to ``got_request_exception``.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sender: Any, request: Any = None, **kwargs: Any) -> None:
+        """Record the request's exception if it is a lock error."""
+        error = sys.exc_info()[1]
+        if error is not None and "locked" in str(error):
+            with self._lock:
+                self.count += 1
+
+
+class VirtualTable:
+    """
+    One GM session driving its own encounter through the HTMX endpoints.
+
+    Keeps its cookies (session, CSRF, messages) like a browser, and learns
+    the characters it can reorder or delete from the rows the server sends.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        number: int,
+        mix: Dict[str, int],
+        seed_characters: int,
+        think_time: float,
+        language: str,
+        rng: random.Random,
+    ) -> None:
+        self.base_url = base_url
+        self.number = number
+        self.actions = list(mix)
+        self.weights = list(mix.values())
+        self.seed_characters = seed_characters
+        self.think_time = think_time
+        self.language = language
+        self.rng = rng
+        self.cookies = CookieJar()
+        self.opener: OpenerDirector = build_opener(HTTPCookieProcessor(self.cookies))
+        self.encounter_pk: int | None = None
+        self.characters: Set[int] = set()
+        self.samples: List[Sample] = []
+
+    def _url(self, name: str, *args: Any) -> str:
+        """Return the absolute URL of a tracker route."""
+        with translation.override(self.language):
+            path = reverse(f"initiative_tracker:{name}", args=args)
+        return urljoin(self.base_url, path)
+
+    def _csrf_token(self) -> str:
+        """Return the CSRF cookie the server handed out, if any."""
+        for cookie in self.cookies:
+            if cookie.name == "csrftoken" and cookie.value:
+                return cookie.value
+        return ""
+
+    def _request(
+        self,
+        action: str,
+        url: str,
+        data: Dict[str, Any] | None = None,
+        htmx: bool = True,
+    ) -> str:
+        """Send one request, record its sample and return the final URL."""
+        headers = {"HX-Request": "true"} if htmx else {}
+        body = None
+        if data is not None:
+            body = urlencode(data).encode()
+            headers["X-CSRFToken"] = self._csrf_token()
+            headers["Referer"] = url
+        request = Request(url, data=body, headers=headers)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                content = response.read()
+                status = response.status
+                final_url = response.geturl()
+        except HTTPError as error:
+            content = error.read()
+            status = error.code
+            final_url = url
+        except (URLError, OSError):
+            content = b""
+            status = 0
+            final_url = url
+        latency = (time.perf_counter() - start) * 1000
+        self.samples.append(Sample(action, latency, status, LOCKED in content))
+        text = content.decode(errors="replace")
+        self.characters.update(int(pk) for pk in ROW_ID.findall(text))
+        self.characters.difference_update(
+            int(pk) for pk in REMOVED_ROW_ID.findall(text)
+        )
+        return final_url
+
+    def setup(self) -> None:
+        """Open a new encounter, following the redirect to its tracker."""
+        list_url = self._url("encounter_list")
+        self._request("setup", list_url, htmx=False)
+        tracker_url = self._request(
+            "setup", list_url, {"name": f"Load table {self.number}"}, htmx=False
+        )
+        with translation.override(self.language):
+            match = resolve(urlsplit(tracker_url).path)
+        if match.url_name != "tracker":
+            raise RuntimeError(f"Table {self.number} could not open an encounter")
+        self.encounter_pk = match.kwargs["encounter_pk"]
+        for _ in range(self.seed_characters):
+            self.add()
+
+    def add(self) -> None:
+        """Add a combatant with a random initiative."""
+        self._request(
+            "add",
+            self._url("add_character", self.encounter_pk),
+            {
+                "action": "add",
+                "name": f"Goblin {self.rng.randrange(1000)}",
+                "initiative": self.rng.randint(1, 20),
+                "position": 0,
+            },
+        )
+
+    def next_turn(self) -> None:
+        """Advance the turn."""
+        self._request(
+            "next_turn",
+            self._url("next_turn", self.encounter_pk),
+            {"action": "next_turn"},
+        )
+
+    def reorder(self) -> None:
+        """Nudge a random combatant up or down."""
+        if not self.characters:
+            return self.add()
+        direction = self.rng.choice(("reorder_increase", "reorder_decrease"))
+        self._request(
+            "reorder",
+            self._url("reorder", self.encounter_pk),
+            {"action": direction, "pk": self.rng.choice(sorted(self.characters))},
+        )
+
+    def delete(self) -> None:
+        """Remove a random combatant, keeping at least one at the table."""
+        if len(self.characters) < 2:
+            return self.add()
+        pk = self.rng.choice(sorted(self.characters))
+        self.characters.discard(pk)
+        self._request(
+            "delete", self._url("delete_character", self.encounter_pk, pk), {}
+        )
+
+    def refresh(self) -> None:
+        """Reload the tracker the way the HTMX page does."""
+        self._request("refresh", self._url("tracker", self.encounter_pk))
+
+    def run(self, deadline: float, actions: int | None) -> List[Sample]:
+        """Replay the mix until the deadline or the action budget runs out."""
+        self.setup()
+        done = 0
+        while time.monotonic() < deadline and (actions is None or done < actions):
+            action = self.rng.choices(self.actions, self.weights)[0]
+            getattr(self, action)()
+            done += 1
+            if self.think_time:
+                time.sleep(self.rng.expovariate(1 / self.think_time))
+        return self.samples
+
+
+def run_load(
+    base_url: str,
+    tables: int = 50,
+    duration: float = 30.0,
+    actions: int | None = None,
+    mix: Dict[str, int] | None = None,
+    seed_characters: int = 8,
+    think_time: float = 0.5,
+    language: str = "en",
+    seed: int | None = None,
+) -> List[Sample]:
+    """
+    Drive ``tables`` virtual tables concurrently, one thread each.
+
+    Every table stops after ``duration`` seconds, or after ``actions``
+    requests when that comes first. Returns the samples of all tables.
+    """
+    rng = random.Random(seed)
+    deadline = time.monotonic() + duration
+    virtual_tables = [
+        VirtualTable(
+            base_url,
+            number,
+            mix or DEFAULT_MIX,
+            seed_characters,
+            think_time,
+            language,
+            random.Random(rng.random()),
+        )
+        for number in range(1, tables + 1)
+    ]
+    with ThreadPoolExecutor(max_workers=tables) as executor:
+        futures = [executor.submit(t.run, deadline, actions) for t in virtual_tables]
+        return [sample for future in futures for sample in future.result()]
+
+
+def summarize(samples: Iterable[Sample], elapsed: float) -> List[Stats]:
+    """Aggregate samples per action, followed by a line for all of them."""
+    groups: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        groups[sample.action].append(sample)
+        groups["all"].append(sample)
+
+    stats = []
+    for action in sorted(groups, key=lambda a: (a == "all", a)):
+        group = groups[action]
+        latencies = sorted(s.latency_ms for s in group)
+        stats.append(
+            Stats(
+                action=action,
+                requests=len(group),
+                errors=sum(1 for s in group if not 200 <= s.status < 400),
+                locked=sum(1 for s in group if s.locked),
+                p50_ms=round(statistics.median(latencies), 2),
+                p95_ms=round(percentile(latencies, 0.95), 2),
+                p99_ms=round(percentile(latencies, 0.99), 2),
+                throughput=round(len(group) / elapsed, 2) if elapsed else 0.0,
+            )
+        )
+    return stats
+
+
+def to_json(stats: Iterable[Stats], settings: Dict[str, Any]) -> str:
+    """Serialize a run's statistics together with the settings it used."""
+    return json.dumps(
+        {"settings": settings, "results": [s._asdict() for s in stats]}, indent=2
+    )
@@ -0,0 +1,102 @@
+"""Benchmark every TrackerView action against a throwaway database."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from initiative_tracker.benchmarks import (
+    CASES,
+    DEFAULT_SIZES,
+    compare,
+    run_benchmarks,
+    to_json,
+)
+
+
+class Command(BaseCommand):
+    """
+    Time the tracker's read and write paths at several encounter sizes.
+
+    Runs against a freshly created test database, so the real data is never
+    touched, and reports query count, wall time and peak memory per case.
+    """
+
+    help = "Benchmark TrackerView actions at several encounter sizes."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register the command's options."""
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=list(DEFAULT_SIZES),
+            help="Encounter sizes to seed (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per case (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--case",
+            dest="cases",
+            action="append",
+            choices=sorted(CASES),
+            help="Only run the given case; may be repeated.",
+        )
+        parser.add_argument(
+            "--output", type=Path, help="Write the results as JSON to this file."
+        )
+        parser.add_argument(
+            "--compare",
+            type=Path,
+            help="Fail on regressions against a previous JSON report.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.25,
+            help="Allowed growth of the median wall time (default: %(default)s).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Run the benchmarks and report the results."""
+        baseline = None
+        if options["compare"]:
+            baseline = json.loads(options["compare"].read_text())
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = run_benchmarks(
+                options["sizes"], options["repeat"], options["cases"]
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{'case':<16} {'size':>8} {'queries':>8} {'median ms':>10} "
+            f"{'min ms':>9} {'peak KiB':>9}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r.case:<16} {r.size:>8} {r.queries:>8} {r.wall_ms_median:>10.2f} "
+                f"{r.wall_ms_min:>9.2f} {r.peak_kib:>9.1f}"
+            )
+        if options["output"]:
+            options["output"].write_text(to_json(results) + "\n")
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options["threshold"])
+            if regressions:
+                raise CommandError("Regressions found:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions."))
@@ -0,0 +1,49 @@
+"""Compact the positions of encounters' characters."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from initiative_tracker.history import compact
+from initiative_tracker.live import tracker_changed
+from initiative_tracker.models import Encounter
+
+
+class Command(BaseCommand):
+    """
+    Spread positions evenly again, keeping every encounter's turn order.
+
+    One UPDATE covers all encounters, so it is cheap to run periodically, and
+    safe while encounters are being played.
+    """
+
+    help = "Compact the positions of encounters' characters."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register the command's options."""
+        parser.add_argument(
+            "encounters",
+            nargs="*",
+            type=int,
+            help="Primary keys of the encounters (default: all of them).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Compact the encounters and report how many characters moved."""
+        encounters = Encounter.objects.all()
+        if options["encounters"]:
+            encounters = encounters.filter(pk__in=options["encounters"])
+            missing = set(options["encounters"]) - set(
+                encounters.values_list("pk", flat=True)
+            )
+            if missing:
+                raise CommandError(f"Encounter {min(missing)} does not exist.")
+        changed = compact(encounters)
+        for encounter in Encounter.objects.filter(pk__in=list(changed)).iterator():
+            tracker_changed(encounter)
+        self.stdout.write(
+            f"Compacted {sum(changed.values())} characters "
+            f"in {len(changed)} encounters."
+        )
@@ -0,0 +1,57 @@
+"""Export encounters, characters or combat logs as CSV or JSON Lines."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from initiative_tracker.export import EXPORT_FORMATS, EXPORTS, export_lines
+from initiative_tracker.models import Encounter
+
+
+class Command(BaseCommand):
+    """
+    Stream an export to a file or standard output.
+
+    Rows are read through a database cursor and written as they arrive, so
+    archiving millions of rows runs in constant memory.
+    """
+
+    help = "Export encounters, characters or combat logs as CSV or JSON Lines."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register the command's options."""
+        parser.add_argument("kind", choices=sorted(EXPORTS), help="What to export.")
+        parser.add_argument(
+            "--format",
+            dest="fmt",
+            choices=sorted(EXPORT_FORMATS),
+            default="csv",
+            help="Output format (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--encounter", type=int, help="Only export this encounter's rows."
+        )
+        parser.add_argument(
+            "--output", type=Path, help="Write to this file instead of stdout."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Write the export."""
+        encounter_pk = options["encounter"]
+        if (
+            encounter_pk is not None
+            and not Encounter.objects.filter(pk=encounter_pk).exists()
+        ):
+            raise CommandError(f"Encounter {encounter_pk} does not exist.")
+        chunks = export_lines(options["kind"], options["fmt"], encounter_pk)
+        if options["output"] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with options["output"].open("w", encoding="utf-8", newline="") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(f"Export written to {options['output']}")
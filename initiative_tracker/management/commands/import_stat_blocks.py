@@ -0,0 +1,96 @@
+"""Import creatures into the stat-block library from CSV or JSON Lines."""
+
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from initiative_tracker.models import StatBlock
+
+# Stat blocks written per INSERT
+BATCH_SIZE = 1000
+
+# Columns read from each row; only ``name`` is required
+COLUMNS = ("name", "initiative_modifier", "roll_mode", "hit_points", "tags")
+
+
+class Command(BaseCommand):
+    """
+    Load a library of stat blocks from a file.
+
+    CSV needs a header naming the columns; JSON Lines has one object per line.
+    Rows are validated like the admin form would and inserted in batches, and
+    the full-text index is updated by its triggers as they go in.
+    """
+
+    help = "Import stat blocks from CSV or JSON Lines."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register the command's options."""
+        parser.add_argument("path", type=Path, help="File to import.")
+        parser.add_argument(
+            "--format",
+            dest="fmt",
+            choices=("csv", "jsonl"),
+            help="Input format (default: from the file extension).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Import the file."""
+        path: Path = options["path"]
+        fmt = options["fmt"] or ("jsonl" if path.suffix == ".jsonl" else "csv")
+        if not path.exists():
+            raise CommandError(f"{path} does not exist.")
+
+        count = 0
+        batch: List[StatBlock] = []
+        with path.open(encoding="utf-8", newline="") as source:
+            rows = _read_csv(source) if fmt == "csv" else _read_jsonl(source)
+            for number, row in enumerate(rows, start=1):
+                batch.append(_stat_block(number, row))
+                if len(batch) == BATCH_SIZE:
+                    count += len(StatBlock.objects.bulk_create(batch))
+                    batch = []
+        count += len(StatBlock.objects.bulk_create(batch))
+        self.stdout.write(f"Imported {count} stat blocks.")
+
+
+def _read_csv(source: Any) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of a CSV file with a header."""
+    yield from csv.DictReader(source)
+
+
+def _read_jsonl(source: Any) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of a JSON Lines file, skipping blank lines."""
+    for number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise CommandError(f"Line {number}: invalid JSON: {exc}") from exc
+        if not isinstance(row, dict):
+            raise CommandError(f"Line {number}: expected an object.")
+        yield row
+
+
+def _stat_block(number: int, row: Dict[str, Any]) -> StatBlock:
+    """Return the validated stat block of row ``number``."""
+    values = {
+        column: row[column] for column in COLUMNS if row.get(column) not in (None, "")
+    }
+    stat_block = StatBlock(**values)
+    try:
+        stat_block.full_clean(exclude=["created_at"])
+    except ValidationError as exc:
+        errors = "; ".join(
+            f"{field}: {' '.join(messages)}"
+            for field, messages in exc.message_dict.items()
+        )
+        raise CommandError(f"Row {number}: {errors}") from exc
+    return stat_block
@@ -0,0 +1,197 @@
+"""Soak the tracker with many concurrent virtual tables."""
+
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.signals import got_request_exception
+from django.db import connection
+from django.test.utils import override_settings
+
+from initiative_tracker.loadtest import (
+    DEFAULT_MIX,
+    LockCounter,
+    Sample,
+    mix_from_string,
+    run_load,
+    summarize,
+    to_json,
+)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that keeps thousands of access log lines off stdout."""
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Drop the access log line."""
+
+
+@contextmanager
+def serve_in_thread() -> Iterator[str]:
+    """Serve the project's WSGI app on a free local port and yield its URL."""
+    host = "127.0.0.1"
+    server = ThreadedWSGIServer((host, 0), QuietRequestHandler)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with override_settings(ALLOWED_HOSTS=[host]):
+            yield f"http://{host}:{server.server_port}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class Command(BaseCommand):
+    """
+    Run hundreds of virtual tables against the tracker at once.
+
+    Without ``--url`` a threaded server is started in-process on a throwaway
+    SQLite file (or test database), so lock contention looks like production
+    and the real data is never touched. With ``--url`` a locally launched
+    server, e.g. uvicorn on the ASGI app, is targeted instead.
+    """
+
+    help = "Soak test the tracker with concurrent virtual tables."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register the command's options."""
+        parser.add_argument(
+            "--url", help="Base URL of a running server (default: in-process)."
+        )
+        parser.add_argument(
+            "--tables",
+            type=int,
+            default=50,
+            help="Concurrent virtual tables (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=30.0,
+            help="Seconds each table plays (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--actions", type=int, help="Stop each table after this many actions."
+        )
+        parser.add_argument(
+            "--mix",
+            type=mix_from_string,
+            default=DEFAULT_MIX,
+            help=(
+                "Action weights, e.g. next_turn=60,add=12,reorder=12,delete=8,"
+                "refresh=8 (the default)."
+            ),
+        )
+        parser.add_argument(
+            "--seed-characters",
+            type=int,
+            default=8,
+            help="Characters each table starts with (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--think-time",
+            type=float,
+            default=0.5,
+            help="Mean pause between actions in seconds (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--language",
+            default="en",
+            help="Language prefix of the URLs (default: %(default)s).",
+        )
+        parser.add_argument("--seed", type=int, help="Seed for a repeatable run.")
+        parser.add_argument(
+            "--output", type=Path, help="Write the results as JSON to this file."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Run the virtual tables and report latency, throughput and errors."""
+        lock_counter = LockCounter()
+        start = time.monotonic()
+        if options["url"]:
+            samples = self._run(options["url"], options)
+        else:
+            got_request_exception.connect(lock_counter)
+            try:
+                samples = self._run_in_process(options)
+            finally:
+                got_request_exception.disconnect(lock_counter)
+        elapsed = time.monotonic() - start
+        if not samples:
+            raise CommandError("No requests were made.")
+
+        stats = summarize(samples, elapsed)
+        self.stdout.write(
+            f"{'action':<10} {'requests':>9} {'errors':>7} {'locked':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}"
+        )
+        for s in stats:
+            self.stdout.write(
+                f"{s.action:<10} {s.requests:>9} {s.errors:>7} {s.locked:>7} "
+                f"{s.p50_ms:>8.1f} {s.p95_ms:>8.1f} {s.p99_ms:>8.1f} "
+                f"{s.throughput:>8.1f}"
+            )
+        total = stats[-1]
+        self.stdout.write(
+            f"Error rate {total.errors / total.requests:.2%}, "
+            f"lock rate {total.locked / total.requests:.2%} over {elapsed:.1f} s"
+        )
+        if lock_counter.count:
+            self.stdout.write(f"Server-side lock errors: {lock_counter.count}")
+
+        if options["output"]:
+            settings = {
+                key: options[key]
+                for key in (
+                    "url",
+                    "tables",
+                    "duration",
+                    "actions",
+                    "mix",
+                    "seed_characters",
+                    "think_time",
+                    "seed",
+                )
+            }
+            settings["server_lock_errors"] = lock_counter.count
+            options["output"].write_text(to_json(stats, settings) + "\n")
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _run(self, base_url: str, options: Any) -> List[Sample]:
+        """Drive the virtual tables against ``base_url``."""
+        return run_load(
+            base_url,
+            tables=options["tables"],
+            duration=options["duration"],
+            actions=options["actions"],
+            mix=options["mix"],
+            seed_characters=options["seed_characters"],
+            think_time=options["think_time"],
+            language=options["language"],
+            seed=options["seed"],
+        )
+
+    def _run_in_process(self, options: Any) -> List[Sample]:
+        """Serve a throwaway database in a background thread and load it."""
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == "sqlite":
+                # A file, unlike the default in-memory test database, locks
+                # the way the real one does.
+                test_settings = connection.settings_dict.setdefault("TEST", {})
+                test_settings["NAME"] = str(Path(directory) / "loadtest.sqlite3")
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                with serve_in_thread() as base_url:
+                    return self._run(base_url, options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,90 @@
+"""Estimate an encounter's turn order by Monte Carlo simulation."""
+
+from __future__ import annotations
+
+from typing import Any, List
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from initiative_tracker.models import Character, Encounter
+from initiative_tracker.simulation import combatants_of, simulate
+
+
+class Command(BaseCommand):
+    """
+    Roll initiative for an encounter many times and report who acts when.
+
+    Prints, per character, how often it acts first and its mean turn slot,
+    and with ``--before`` how often one character acts before another.
+    """
+
+    help = "Simulate initiative rolls of an encounter."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register the command's options."""
+        parser.add_argument("encounter", type=int, help="Primary key of the encounter.")
+        parser.add_argument(
+            "--trials",
+            type=int,
+            default=100_000,
+            help="Number of simulated rolls (default: %(default)s).",
+        )
+        parser.add_argument("--seed", type=int, help="Seed for a repeatable run.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Worker processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--before",
+            nargs=2,
+            metavar=("FIRST", "SECOND"),
+            help="Report how often FIRST acts before SECOND (character names).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Run the simulation and print the results."""
+        try:
+            encounter = Encounter.objects.get(pk=options["encounter"])
+        except Encounter.DoesNotExist:
+            raise CommandError(f"Encounter {options['encounter']} does not exist.")
+        if options["trials"] < 1:
+            raise CommandError("--trials must be at least 1.")
+        characters: List[Character] = list(encounter.characters.order_by("pk"))
+        if not characters:
+            raise CommandError(f"Encounter {encounter.pk} has no characters.")
+
+        pair = None
+        if options["before"]:
+            names = [c.name for c in characters]
+            try:
+                pair = tuple(names.index(name) for name in options["before"])
+            except ValueError:
+                raise CommandError(
+                    f"--before needs two of: {', '.join(sorted(set(names)))}."
+                )
+
+        result = simulate(
+            combatants_of(characters),
+            options["trials"],
+            seed=options["seed"],
+            pair=pair,  # type: ignore[arg-type]
+            workers=options["workers"],
+        )
+
+        self.stdout.write(
+            f"{'name':<24} {'modifier':>8} {'mode':<12} {'first %':>8} "
+            f"{'mean slot':>9}"
+        )
+        for stats in result.stats:
+            c = stats.combatant
+            self.stdout.write(
+                f"{c.name[:24]:<24} {c.modifier:>8} {c.mode:<12} "
+                f"{stats.first * 100:>8.2f} {stats.mean_slot:>9.2f}"
+            )
+        if result.pair is not None and result.ahead is not None:
+            first, second = result.pair
+            self.stdout.write(
+                f"{first.name} acts before {second.name} in "
+                f"{result.ahead * 100:.2f}% of {result.trials} trials."
+            )
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.6 on 2026-10-16 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def assign_default_encounter(apps, schema_editor):
+    """Move characters created before encounters existed into one encounter."""
+    Character = apps.get_model("initiative_tracker", "Character")
+    Encounter = apps.get_model("initiative_tracker", "Encounter")
+    if Character.objects.filter(encounter__isnull=True).exists():
+        encounter = Encounter.objects.create(name="Default Encounter")
+        Character.objects.filter(encounter__isnull=True).update(encounter=encounter)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "initiative_tracker",
+            "0003_alter_character_initiative_alter_character_name_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Encounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Encounter name (e.g., 'Goblin Ambush')",
+                        max_length=100,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Encounter",
+                "verbose_name_plural": "Encounters",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="character",
+            name="encounter",
+            field=models.ForeignKey(
+                db_index=False,
+                help_text="Encounter this character takes part in",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="characters",
+                to="initiative_tracker.encounter",
+            ),
+        ),
+        migrations.RunPython(assign_default_encounter, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="character",
+            name="encounter",
+            field=models.ForeignKey(
+                db_index=False,
+                help_text="Encounter this character takes part in",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="characters",
+                to="initiative_tracker.encounter",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="character",
+            index=models.Index(
+                fields=["encounter", "position", "-initiative"],
+                name="character_turn_order_idx",
+            ),
+        ),
+    ]
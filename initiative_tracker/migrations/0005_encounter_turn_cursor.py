@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("initiative_tracker", "0004_encounter_character_encounter_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="encounter",
+            name="round_number",
+            field=models.PositiveIntegerField(
+                default=1, help_text="Current combat round"
+            ),
+        ),
+        migrations.AddField(
+            model_name="encounter",
+            name="turn_index",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Index of the acting character in turn order"
+            ),
+        ),
+    ]
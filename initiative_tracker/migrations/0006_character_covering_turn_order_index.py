@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("initiative_tracker", "0005_encounter_turn_cursor"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="character",
+            name="character_turn_order_idx",
+        ),
+        migrations.AlterField(
+            model_name="character",
+            name="initiative",
+            field=models.IntegerField(
+                default=0, help_text="Initiative roll (higher goes first)"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="character",
+            name="name",
+            field=models.CharField(
+                help_text="Character's name (e.g., 'Goblin Scout')", max_length=100
+            ),
+        ),
+        migrations.AlterField(
+            model_name="character",
+            name="position",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Order position (GM adjustable)"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="character",
+            index=models.Index(
+                fields=["encounter", "position", "-initiative", "id", "name"],
+                name="character_turn_order_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("initiative_tracker", "0006_character_covering_turn_order_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="encounter",
+            name="turn_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of turns taken, to reject stale 'Next Turn' clicks",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("initiative_tracker", "0007_encounter_turn_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="character",
+            name="initiative_modifier",
+            field=models.IntegerField(
+                default=0,
+                help_text="Added to every initiative roll (e.g., Dexterity modifier)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="character",
+            name="roll_mode",
+            field=models.CharField(
+                choices=[
+                    ("normal", "Normal"),
+                    ("advantage", "Advantage"),
+                    ("disadvantage", "Disadvantage"),
+                ],
+                default="normal",
+                help_text="Whether initiative is rolled with advantage or disadvantage",
+                max_length=12,
+            ),
+        ),
+    ]
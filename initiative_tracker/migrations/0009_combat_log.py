@@ -0,0 +1,140 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("initiative_tracker", "0008_character_initiative_modifier_and_roll_mode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="encounter",
+            name="history_head",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Sequence of the last combat event applied (lower after undo)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="encounter",
+            name="history_size",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Sequence of the last combat event recorded, for redo",
+            ),
+        ),
+        migrations.CreateModel(
+            name="CombatEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sequence",
+                    models.PositiveIntegerField(
+                        help_text="Position of the event in the encounter's log, from 1"
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(help_text="Action recorded", max_length=20),
+                ),
+                (
+                    "rows",
+                    models.JSONField(
+                        default=list,
+                        help_text="Changed columns of added or updated characters, with their pk",
+                    ),
+                ),
+                (
+                    "removed",
+                    models.JSONField(
+                        default=list, help_text="Ids of removed characters"
+                    ),
+                ),
+                ("turn_index", models.PositiveIntegerField()),
+                ("round_number", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "encounter",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="initiative_tracker.encounter",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Combat Event",
+                "verbose_name_plural": "Combat Events",
+                "ordering": ["encounter", "sequence"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("encounter", "sequence"),
+                        name="combat_event_sequence_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="CombatSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sequence",
+                    models.PositiveIntegerField(
+                        help_text="Sequence of the last event included (0: before the log)"
+                    ),
+                ),
+                (
+                    "characters",
+                    models.JSONField(
+                        default=list,
+                        help_text="Every character's recorded columns, with its pk",
+                    ),
+                ),
+                ("turn_index", models.PositiveIntegerField()),
+                ("round_number", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "encounter",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="initiative_tracker.encounter",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Combat Snapshot",
+                "verbose_name_plural": "Combat Snapshots",
+                "ordering": ["encounter", "sequence"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("encounter", "sequence"),
+                        name="combat_snapshot_sequence_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
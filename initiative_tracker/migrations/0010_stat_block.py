@@ -0,0 +1,117 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+TABLE = "initiative_tracker_statblock"
+SEARCH_TABLE = "initiative_tracker_statblock_fts"
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 index of stat block names and tags, on SQLite only."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        f"name, tags, content='{TABLE}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    # External content tables are kept in sync by triggers, so bulk inserts
+    # and queryset updates are indexed too
+    schema_editor.execute(
+        f"CREATE TRIGGER {SEARCH_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, name, tags) "
+        "VALUES (new.id, new.name, new.tags); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {SEARCH_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, tags) "
+        "VALUES ('delete', old.id, old.name, old.tags); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {SEARCH_TABLE}_update AFTER UPDATE ON {TABLE} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, tags) "
+        "VALUES ('delete', old.id, old.name, old.tags); "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, name, tags) "
+        "VALUES (new.id, new.name, new.tags); END"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    """Drop the FTS5 index and its triggers."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for trigger in ("insert", "delete", "update"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{trigger}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("initiative_tracker", "0009_combat_log"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatBlock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Creature name (e.g., 'Goblin Archer')",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "initiative_modifier",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Added to every initiative roll (e.g., Dexterity modifier)",
+                    ),
+                ),
+                (
+                    "roll_mode",
+                    models.CharField(
+                        choices=[
+                            ("normal", "Normal"),
+                            ("advantage", "Advantage"),
+                            ("disadvantage", "Disadvantage"),
+                        ],
+                        default="normal",
+                        help_text="Whether initiative is rolled with advantage or disadvantage",
+                        max_length=12,
+                    ),
+                ),
+                (
+                    "hit_points",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Average hit points"
+                    ),
+                ),
+                (
+                    "tags",
+                    models.CharField(
+                        blank=True,
+                        help_text="Space-separated tags (e.g., 'goblinoid humanoid')",
+                        max_length=200,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Stat Block",
+                "verbose_name_plural": "Stat Blocks",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:40
+
+from django.db import migrations
+
+TABLE = "initiative_tracker_character"
+INDEX = "character_name_idx"
+
+
+def create_name_index(apps, schema_editor):
+    """Index names the way each database compares a case-insensitive prefix."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        # LIKE ignores ASCII case and uses an index with the same collation
+        column = "name COLLATE NOCASE"
+    elif vendor == "postgresql":
+        # istartswith is UPPER("name"::text) LIKE UPPER(...), which needs the
+        # pattern operator class under any collation other than C
+        column = "(UPPER(name::text)) text_pattern_ops"
+    else:
+        # MySQL compares with a case-insensitive collation already
+        column = "name"
+    schema_editor.execute(f"CREATE INDEX {INDEX} ON {TABLE} ({column})")
+
+
+def drop_name_index(apps, schema_editor):
+    """Drop the name index."""
+    schema_editor.execute(
+        schema_editor.sql_delete_index
+        % {
+            "name": schema_editor.quote_name(INDEX),
+            "table": schema_editor.quote_name(TABLE),
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("initiative_tracker", "0010_stat_block"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_index, drop_name_index),
+    ]
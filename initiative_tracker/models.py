@@ -2,7 +2,964 @@
 
 from __future__ import annotations
 
-from django.db import models
+import random
+from typing import Any, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import connection, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.expressions import CombinedExpression
+from django.db.models.functions import (
+    Cast,
+    Coalesce,
+    Floor,
+    Greatest,
+    Least,
+    Random,
+)
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
+from django.urls import reverse
+
+from .dice import ADVANTAGE, DISADVANTAGE, roll_d20s
+
+# Turn order of an encounter: position first, then the higher initiative; the
+# primary key keeps ties stable so the turn cursor always points at one row.
+TURN_ORDER = ("position", "-initiative", "pk")
+
+# The turn order backwards, read from the same index scanned in reverse.
+REVERSE_TURN_ORDER = ("-position", "initiative", "-pk")
+
+# The turn order as an SQL ORDER BY, for ranking characters in the database.
+COMPACT_ORDER = "position, initiative DESC, id"
+
+# Columns the tracker templates need for each character row, plus the
+# encounter's id, which the related manager reads on every row it loads.
+TRACKER_FIELDS = ("pk", "encounter_id", "name", "initiative", "position")
+
+# Rows the tracker renders up front, starting at the acting character, and per
+# chunk loaded while scrolling. Keeps the first paint the same size however
+# large the encounter grows.
+TRACKER_WINDOW = 50
+
+# Columns needed to roll a character's initiative and re-sort it. The
+# encounter's id is loaded too: the related manager reads it on every row it
+# returns, and a deferred column would be fetched one row at a time.
+ROLL_FIELDS = (
+    "pk",
+    "encounter_id",
+    "initiative",
+    "initiative_modifier",
+    "roll_mode",
+    "position",
+)
+
+# Columns of a character recorded by the combat log, enough to recreate it.
+HISTORY_FIELDS = ("name", "initiative", "position", "initiative_modifier", "roll_mode")
+
+# Spacing between positions written by drag-and-drop, so a later move can
+# usually land between two neighbours without renumbering anyone else.
+RANK_GAP = 1024
+
+# Nudges, adds and moves leave positions unevenly spread and growing. Once a
+# write takes a position past this limit the encounter is compacted, long
+# before the column's 32-bit range runs out.
+POSITION_LIMIT = 2**30
+
+
+# A row's place in turn order: (position, initiative, pk)
+RowKey = Tuple[int, int, int]
+
+
+class TrackerWindow(NamedTuple):
+    """A slice of the tracker rows and what lies around it."""
+
+    rows: List[Dict[str, Any]]
+    current: Dict[str, Any] | None
+    earlier: bool
+    later: bool
+
+
+class EncounterQuerySet(models.QuerySet["Encounter"]):
+    """
+    Set-based maintenance of many encounters at once.
+
+    Every operation runs a fixed number of statements, however many
+    encounters and characters it touches, and never loads the characters.
+    Signals are not sent, so callers announce the changes themselves.
+    """
+
+    def compact_positions(self) -> Dict[int, int]:
+        """
+        Give the characters of these encounters gapped positions in turn order.
+
+        One UPDATE ranks the characters of each encounter with ``ROW_NUMBER()``
+        and writes only the rows whose position changes. The turn order, and
+        so every turn cursor, stays as it was. Returns the number of rows
+        written per encounter that changed.
+        """
+        return _rank_positions(self, COMPACT_ORDER)
+
+    def reroll_initiative(self) -> int:
+        """
+        Roll initiative for all characters of these encounters and restart them.
+
+        The database rolls the dice in one UPDATE (advantage keeps the higher
+        of two d20s, disadvantage the lower), a second one sorts the
+        characters into gapped positions by their new initiative as
+        ``Encounter.roll_initiative()`` does, and a third puts every cursor
+        on the first turn of round one. Returns the characters rolled for.
+        """
+        with transaction.atomic():
+            rolled = Character.objects.filter(encounter__in=self).update(
+                initiative=_rolled_initiative()
+            )
+            _rank_positions(self, "initiative DESC, initiative_modifier DESC, id")
+            self.update(
+                turn_index=0, round_number=1, turn_version=F("turn_version") + 1
+            )
+        return rolled
+
+    def delete_with_characters(self) -> int:
+        """
+        Delete these encounters along with their characters and combat logs.
+
+        ``delete()`` would load every character to send its signals; the
+        characters go in one raw DELETE instead, after which the combat log
+        cascades with one DELETE per table. Returns the encounters deleted.
+        """
+        pks = list(self.values_list("pk", flat=True))
+        if not pks:
+            return 0
+        encounters = Encounter.objects.filter(pk__in=pks)
+        subquery, params = encounters.order_by().values("pk").query.sql_with_params()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Character._meta.db_table} "
+                    f"WHERE encounter_id IN ({subquery})",
+                    params,
+                )
+            _total, deleted = encounters.delete()
+        return deleted.get(Encounter._meta.label, 0)
+
+
+class Encounter(models.Model):
+    """
+    Model representing a single combat encounter.
+
+    Each encounter owns its own initiative order so that many tables can share
+    one deployment without seeing (or paying for) each other's combatants.
+    """
+
+    name = models.CharField(
+        max_length=100,
+        help_text="Encounter name (e.g., 'Goblin Ambush')",
+    )
+    turn_index = models.PositiveIntegerField(
+        default=0,
+        help_text="Index of the acting character in turn order",
+    )
+    round_number = models.PositiveIntegerField(
+        default=1,
+        help_text="Current combat round",
+    )
+    turn_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of turns taken, to reject stale 'Next Turn' clicks",
+    )
+    history_head = models.PositiveIntegerField(
+        default=0,
+        help_text="Sequence of the last combat event applied (lower after undo)",
+    )
+    history_size = models.PositiveIntegerField(
+        default=0,
+        help_text="Sequence of the last combat event recorded, for redo",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = EncounterQuerySet.as_manager()
+
+    class Meta:
+        """Meta configuration for Encounter model."""
+
+        ordering = ["-created_at"]
+        verbose_name = "Encounter"
+        verbose_name_plural = "Encounters"
+
+    def __str__(self) -> str:
+        """Return string representation of the encounter."""
+        return self.name
+
+    def get_absolute_url(self) -> str:
+        """Return the URL of this encounter's tracker."""
+        return reverse("initiative_tracker:tracker", kwargs={"encounter_pk": self.pk})
+
+    @property
+    def can_undo(self) -> bool:
+        """Return whether a recorded action can be undone."""
+        return self.history_head > 0
+
+    @property
+    def can_redo(self) -> bool:
+        """Return whether an undone action can be redone."""
+        return self.history_head < self.history_size
+
+    @property
+    def has_started(self) -> bool:
+        """Return whether the turn cursor has moved since the encounter began."""
+        return self.round_number > 1 or self.turn_index > 0
+
+    def turn_order(self) -> models.QuerySet[Character]:
+        """Return this encounter's characters in turn order."""
+        return self.characters.order_by(*TURN_ORDER)
+
+    def tracker_rows(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any] | None]:
+        """
+        Return the rows shown by the tracker and the acting character's row.
+
+        The characters are fetched with a single SELECT and materialized, so
+        the current turn and every template loop reuse the same rows.
+        """
+        return self._with_current(list(self.turn_order().values(*TRACKER_FIELDS)))
+
+    async def atracker_rows(
+        self,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any] | None]:
+        """Async version of ``tracker_rows()``."""
+        rows = self.turn_order().values(*TRACKER_FIELDS)
+        return self._with_current([row async for row in rows])
+
+    def tracker_window(self, size: int = TRACKER_WINDOW) -> TrackerWindow:
+        """
+        Return ``size`` rows starting at the acting character's.
+
+        The slice is read from the turn order index with one SELECT of
+        ``size + 1`` rows, the extra one telling whether more rows follow, so
+        its cost does not depend on the size of the encounter. Near the end of
+        the turn order the window is filled up with the rows before the acting
+        one. The rest is fetched with ``tracker_chunk()`` as the page scrolls.
+        """
+        start = self.turn_index
+        rows = list(self._window_rows(start, size))
+        if not rows and start:
+            start = 0
+            rows = list(self._window_rows(start, size))
+        before: List[Dict[str, Any]] = []
+        if start and len(rows) < size:
+            before = list(self._chunk_rows(_row_key(rows[0]), False, size - len(rows)))
+        return _window(rows, before, start, size)
+
+    async def atracker_window(self, size: int = TRACKER_WINDOW) -> TrackerWindow:
+        """Async version of ``tracker_window()``."""
+        start = self.turn_index
+        rows = [row async for row in self._window_rows(start, size)]
+        if not rows and start:
+            start = 0
+            rows = [row async for row in self._window_rows(start, size)]
+        before: List[Dict[str, Any]] = []
+        if start and len(rows) < size:
+            before = [
+                row
+                async for row in self._chunk_rows(
+                    _row_key(rows[0]), False, size - len(rows)
+                )
+            ]
+        return _window(rows, before, start, size)
+
+    def tracker_chunk(
+        self, key: RowKey, later: bool = True, size: int = TRACKER_WINDOW
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Return up to ``size`` rows right after (or before) the row at ``key``.
+
+        Keyset pagination: the rows are found by seeking the turn order index
+        to ``key`` rather than by skipping an offset, so every chunk costs the
+        same wherever it lies. Also returns whether more rows follow in that
+        direction.
+        """
+        return _chunk(list(self._chunk_rows(key, later, size)), later, size)
+
+    async def atracker_chunk(
+        self, key: RowKey, later: bool = True, size: int = TRACKER_WINDOW
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Async version of ``tracker_chunk()``."""
+        rows = [row async for row in self._chunk_rows(key, later, size)]
+        return _chunk(rows, later, size)
+
+    def advance_turn(self, expected_version: int | None = None) -> bool:
+        """
+        Move the turn cursor to the next character.
+
+        Runs as a single UPDATE of the encounter row; the character count comes
+        from the turn order index. Past the last character the cursor wraps
+        around and a new round starts. The turn order itself is left alone.
+
+        With ``expected_version`` the UPDATE only applies if no other turn was
+        taken since the client saw ``turn_version``, so a stale click from a
+        second tab cannot advance twice. Returns whether the turn advanced.
+        """
+        advanced = self._advance_filter(expected_version).update(
+            **self._next_turn_values()
+        )
+        self.refresh_from_db(fields=["turn_index", "round_number", "turn_version"])
+        return bool(advanced)
+
+    async def aadvance_turn(self, expected_version: int | None = None) -> bool:
+        """Async version of ``advance_turn()``."""
+        advanced = await self._advance_filter(expected_version).aupdate(
+            **self._next_turn_values()
+        )
+        await self.arefresh_from_db(
+            fields=["turn_index", "round_number", "turn_version"]
+        )
+        return bool(advanced)
+
+    def nudge_character(self, character: Character, later: bool = True) -> bool:
+        """
+        Move ``character`` one place later (or earlier) in turn order.
+
+        It takes a position between the neighbour it passes and the one after
+        that, so a nudge changes the order however far apart the positions
+        are. At either end of the order it stays put. The write only applies
+        while the rows it was computed from keep their positions; when a
+        concurrent change got there first, the character is read again and
+        nudged from where it is now, so concurrent nudges add up. Returns
+        ``True`` when the encounter had to be compacted.
+        """
+        while True:
+            after, before = _nudge_neighbours(
+                list(self._neighbours(character, later)), later
+            )
+            if after is None and before is None:
+                return False
+            with transaction.atomic():
+                renumbered = self._place(character, after, before)
+            if renumbered is not None:
+                return renumbered
+            character.refresh_from_db(fields=["position", "initiative"])
+
+    async def anudge_character(self, character: Character, later: bool = True) -> bool:
+        """Async version of ``nudge_character()``."""
+        return await sync_to_async(self.nudge_character)(character, later)
+
+    def compact_positions(self) -> int:
+        """
+        Spread the positions ``RANK_GAP`` apart again, keeping the turn order.
+
+        A single UPDATE (see ``EncounterQuerySet.compact_positions()``), so it
+        is safe while the encounter is played: concurrent nudges land before
+        or after it, and the turn cursor stays on the acting character.
+        Returns the number of characters that moved.
+        """
+        changed = Encounter.objects.filter(pk=self.pk).compact_positions()
+        return changed.get(self.pk, 0)
+
+    async def acompact_positions(self) -> int:
+        """Async version of ``compact_positions()``."""
+        return await sync_to_async(self.compact_positions)()
+
+    def make_room(self, characters: Iterable[Character]) -> None:
+        """
+        Keep the cursor on the acting character before ``characters`` join.
+
+        Newcomers that sort ahead of the acting character push the cursor
+        forward by one each. Nothing moves before the first turn was taken, so
+        a faster newcomer simply acts first.
+        """
+        if not self.has_started:
+            return
+        current = self.turn_order()[self.turn_index : self.turn_index + 1].first()
+        ahead = _count_ahead(current, characters)
+        if ahead:
+            self._move_cursor(ahead)
+
+    async def amake_room(self, characters: Iterable[Character]) -> None:
+        """Async version of ``make_room()``."""
+        if not self.has_started:
+            return
+        current = await self.turn_order()[
+            self.turn_index : self.turn_index + 1
+        ].afirst()
+        ahead = _count_ahead(current, characters)
+        if ahead:
+            await self._amove_cursor(ahead)
+
+    def close_gap(self, character: Character) -> None:
+        """Keep the cursor on the acting character before ``character`` leaves."""
+        if self._ordinal(character) < self.turn_index:
+            self._move_cursor(-1)
+
+    async def aclose_gap(self, character: Character) -> None:
+        """Async version of ``close_gap()``."""
+        if await self._aordinal(character) < self.turn_index:
+            await self._amove_cursor(-1)
+
+    def move_character(
+        self,
+        character: Character,
+        after: Character | None = None,
+        before: Character | None = None,
+    ) -> bool:
+        """
+        Move ``character`` between its new neighbours ``after`` and ``before``.
+
+        The character gets a position strictly between its neighbours, so the
+        common case writes a single row. Only when the neighbours' positions
+        leave no gap is the whole encounter compacted, with the character
+        ranked right behind ``after``, in one UPDATE; ``True`` is returned in
+        that case. Like ``nudge_character()`` the write is conditional on the
+        positions it was computed from, and is retried with the rows read
+        again when one of them changed.
+        """
+        while True:
+            with transaction.atomic():
+                renumbered = self._place(character, after, before)
+            if renumbered is not None:
+                return renumbered
+            for row in (character, after, before):
+                if row is not None:
+                    row.refresh_from_db(fields=["position", "initiative"])
+
+    async def amove_character(
+        self,
+        character: Character,
+        after: Character | None = None,
+        before: Character | None = None,
+    ) -> bool:
+        """Async version of ``move_character()``."""
+        return await sync_to_async(self.move_character)(character, after, before)
+
+    def roll_initiative(self, seed: int | None = None) -> int:
+        """
+        Roll initiative for every character and start the combat over.
+
+        All dice are rolled in one batch from a ``random.Random(seed)``, so a
+        seed replays the same fight. The characters are re-sorted by their new
+        initiative into gapped positions and written with one ``bulk_update``;
+        the cursor goes back to the first turn of round one. Returns the
+        number of characters rolled for.
+        """
+        characters = list(self.characters.order_by("pk").only(*ROLL_FIELDS))
+        Character.objects.bulk_update(
+            _rolled(characters, random.Random(seed)), ["initiative", "position"]
+        )
+        Encounter.objects.filter(pk=self.pk).update(**self._restart_values())
+        self._restart()
+        return len(characters)
+
+    async def aroll_initiative(self, seed: int | None = None) -> int:
+        """Async version of ``roll_initiative()``."""
+        characters = [
+            c async for c in self.characters.order_by("pk").only(*ROLL_FIELDS)
+        ]
+        await Character.objects.abulk_update(
+            _rolled(characters, random.Random(seed)), ["initiative", "position"]
+        )
+        await Encounter.objects.filter(pk=self.pk).aupdate(**self._restart_values())
+        self._restart()
+        return len(characters)
+
+    def successor_pk(
+        self, character: Character, exclude: int | None = None
+    ) -> int | None:
+        """
+        Return the id of the character acting right after ``character``.
+
+        The character with id ``exclude`` is skipped.
+        """
+        return self._successors(character, exclude).first()
+
+    async def asuccessor_pk(
+        self, character: Character, exclude: int | None = None
+    ) -> int | None:
+        """Async version of ``successor_pk()``."""
+        return await self._successors(character, exclude).afirst()
+
+    def predecessor_pk(
+        self, character: Character, exclude: int | None = None
+    ) -> int | None:
+        """
+        Return the id of the character acting right before ``character``.
+
+        The character with id ``exclude`` is skipped.
+        """
+        return self._nearest_predecessors(character, exclude).first()
+
+    async def apredecessor_pk(
+        self, character: Character, exclude: int | None = None
+    ) -> int | None:
+        """Async version of ``predecessor_pk()``."""
+        return await self._nearest_predecessors(character, exclude).afirst()
+
+    def set_order(self, pks: Sequence[int]) -> bool:
+        """
+        Apply a complete new turn order given as a list of character ids.
+
+        Returns ``False`` without writing anything when ``pks`` is not exactly
+        this encounter's set of characters.
+        """
+        characters = list(self.turn_order().only("pk", "encounter_id", "position"))
+        plan = self._plan_order(characters, pks)
+        if plan is None:
+            return False
+        order, delta = plan
+        self._renumber(order)
+        if delta:
+            self._move_cursor(delta)
+        return True
+
+    async def aset_order(self, pks: Sequence[int]) -> bool:
+        """Async version of ``set_order()``."""
+        characters = [
+            c async for c in self.turn_order().only("pk", "encounter_id", "position")
+        ]
+        plan = self._plan_order(characters, pks)
+        if plan is None:
+            return False
+        order, delta = plan
+        await self._arenumber(order)
+        if delta:
+            await self._amove_cursor(delta)
+        return True
+
+    def _with_current(
+        self, characters: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any] | None]:
+        """Pair the tracker rows with the row the turn cursor points at."""
+        if not characters:
+            return characters, None
+        index = self.turn_index if self.turn_index < len(characters) else 0
+        return characters, characters[index]
+
+    def _advance_filter(
+        self, expected_version: int | None
+    ) -> models.QuerySet[Encounter]:
+        """Return the encounter row, if still at ``expected_version``."""
+        rows = Encounter.objects.filter(pk=self.pk)
+        if expected_version is not None:
+            rows = rows.filter(turn_version=expected_version)
+        return rows
+
+    def _restart_values(self) -> Dict[str, Any]:
+        """Return the UPDATE values putting the cursor on the first turn."""
+        return {
+            "turn_index": 0,
+            "round_number": 1,
+            "turn_version": F("turn_version") + 1,
+        }
+
+    def _restart(self) -> None:
+        """Mirror ``_restart_values()`` on this instance."""
+        self.turn_index = 0
+        self.round_number = 1
+        self.turn_version += 1
+
+    def _next_turn_values(self) -> Dict[str, Any]:
+        """Return the UPDATE expressions moving the cursor to the next turn."""
+        count = Coalesce(
+            Subquery(
+                Character.objects.filter(encounter=OuterRef("pk"))
+                .order_by()
+                .values("encounter")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+        next_index = F("turn_index") + 1
+        wraps = GreaterThanOrEqual(next_index, count)
+        return {
+            "turn_index": Case(
+                When(wraps, then=Value(0)),
+                default=next_index,
+                output_field=models.PositiveIntegerField(),
+            ),
+            "round_number": Case(
+                When(wraps & GreaterThan(count, 0), then=F("round_number") + 1),
+                default=F("round_number"),
+                output_field=models.PositiveIntegerField(),
+            ),
+            "turn_version": F("turn_version") + 1,
+        }
+
+    def _plan_order(
+        self, characters: List[Character], pks: Sequence[int]
+    ) -> Tuple[List[Character], int] | None:
+        """
+        Return the characters in the order of ``pks`` and the cursor shift.
+
+        Returns ``None`` when ``pks`` is not exactly the set of ``characters``.
+        """
+        by_pk = {c.pk: c for c in characters}
+        if len(pks) != len(by_pk) or set(pks) != set(by_pk):
+            return None
+        order = [by_pk[pk] for pk in pks]
+        if not self.has_started or self.turn_index >= len(characters):
+            return order, 0
+        return order, order.index(characters[self.turn_index]) - self.turn_index
+
+    def _window_rows(self, start: int, size: int) -> models.QuerySet[Any]:
+        """Return ``size + 1`` tracker rows from the ``start``-th on."""
+        return self.turn_order().values(*TRACKER_FIELDS)[start : start + size + 1]
+
+    def _chunk_rows(self, key: RowKey, later: bool, size: int) -> models.QuerySet[Any]:
+        """Return ``size + 1`` tracker rows next to ``key``, nearest first."""
+        if later:
+            rows = self.turn_order().filter(_after(key))
+        else:
+            rows = self.characters.filter(_before(key)).order_by(*REVERSE_TURN_ORDER)
+        return rows.values(*TRACKER_FIELDS)[: size + 1]
+
+    def _successors(
+        self, character: Character, exclude: int | None = None
+    ) -> models.QuerySet[Character, int]:
+        """Return the ids of the characters acting after ``character``."""
+        rows = self.turn_order().filter(_after(_key(character)))
+        if exclude is not None:
+            rows = rows.exclude(pk=exclude)
+        return rows.values_list("pk", flat=True)
+
+    def _nearest_predecessors(
+        self, character: Character, exclude: int | None = None
+    ) -> models.QuerySet[Character, int]:
+        """Return the ids of the characters acting before ``character``, nearest first."""
+        rows = self._predecessors(character).order_by(*REVERSE_TURN_ORDER)
+        if exclude is not None:
+            rows = rows.exclude(pk=exclude)
+        return rows.values_list("pk", flat=True)
+
+    def _place(
+        self, character: Character, after: Character | None, before: Character | None
+    ) -> bool | None:
+        """
+        Write one move of ``character`` between ``after`` and ``before``.
+
+        A conditional UPDATE claims the character while it and its neighbours
+        still hold the positions the move was computed from, and either sets
+        the new position or, when there is no gap, makes way for compacting
+        the encounter. Returns ``None`` without writing when the claim failed,
+        otherwise whether the encounter was compacted.
+        """
+        slot = _slot_between(after, before)
+        if slot is None:
+            return False
+        position, fits = slot
+        old_ordinal = self._ordinal(character) if self.has_started else 0
+        claimed = _unchanged(character, after, before).update(
+            position=position if fits else F("position")
+        )
+        if not claimed:
+            return None
+
+        if fits:
+            character.position = position
+        else:
+            self._reinsert(character, after)
+            character.refresh_from_db(fields=["position"])
+        if self.has_started:
+            self._follow_move(old_ordinal, self._ordinal(character))
+        return not fits
+
+    def _neighbours(
+        self, character: Character, later: bool
+    ) -> models.QuerySet[Character]:
+        """Return the next two characters after (or before) ``character``."""
+        key = _key(character)
+        if later:
+            rows = self.turn_order().filter(_after(key))
+        else:
+            rows = self.characters.filter(_before(key)).order_by(*REVERSE_TURN_ORDER)
+        rows = rows.exclude(pk=character.pk)
+        return rows.only("pk", "encounter_id", "position", "initiative")[:2]
+
+    def _reinsert(self, character: Character, after: Character | None) -> None:
+        """Compact the positions with ``character`` ranked right behind ``after``."""
+        order, params = _reinsert_order(character, after)
+        _rank_positions(Encounter.objects.filter(pk=self.pk), order, params)
+
+    def _renumber(self, order: Sequence[Character]) -> None:
+        """Give ``order`` gapped positions, writing only rows that changed."""
+        Character.objects.bulk_update(_renumbered(order), ["position"])
+
+    async def _arenumber(self, order: Sequence[Character]) -> None:
+        """Async version of ``_renumber()``."""
+        await Character.objects.abulk_update(_renumbered(order), ["position"])
+
+    def _ordinal(self, character: Character) -> int:
+        """Return how many characters come before ``character`` in turn order."""
+        return self._predecessors(character).count()
+
+    async def _aordinal(self, character: Character) -> int:
+        """Async version of ``_ordinal()``."""
+        return await self._predecessors(character).acount()
+
+    def _predecessors(self, character: Character) -> models.QuerySet[Character]:
+        """Return the characters acting before ``character``."""
+        return self.characters.filter(_before(_key(character)))
+
+    def _follow_move(self, old_ordinal: int, new_ordinal: int) -> None:
+        """Keep the cursor on the acting character after a row moved."""
+        delta = self._follow_delta(old_ordinal, new_ordinal)
+        if delta:
+            self._move_cursor(delta)
+
+    async def _afollow_move(self, old_ordinal: int, new_ordinal: int) -> None:
+        """Async version of ``_follow_move()``."""
+        delta = self._follow_delta(old_ordinal, new_ordinal)
+        if delta:
+            await self._amove_cursor(delta)
+
+    def _follow_delta(self, old_ordinal: int, new_ordinal: int) -> int:
+        """Return how far the cursor shifts when a row moves between ordinals."""
+        if old_ordinal == new_ordinal:
+            return 0
+        if old_ordinal == self.turn_index:
+            return new_ordinal - old_ordinal
+        turn_index = self.turn_index
+        if old_ordinal < turn_index:
+            turn_index -= 1
+        if new_ordinal <= turn_index:
+            turn_index += 1
+        return turn_index - self.turn_index
+
+    def _move_cursor(self, delta: int) -> None:
+        """Shift the turn cursor by ``delta`` without touching the round."""
+        Encounter.objects.filter(pk=self.pk).update(turn_index=F("turn_index") + delta)
+        self.turn_index += delta
+
+    async def _amove_cursor(self, delta: int) -> None:
+        """Async version of ``_move_cursor()``."""
+        await Encounter.objects.filter(pk=self.pk).aupdate(
+            turn_index=F("turn_index") + delta
+        )
+        self.turn_index += delta
+
+
+def _key(character: Character) -> RowKey:
+    """Return the place of ``character`` in turn order."""
+    return character.position, character.initiative, character.pk
+
+
+def _after(key: RowKey) -> Q:
+    """Return the filter for rows acting after the row at ``key``."""
+    position, initiative, pk = key
+    return (
+        Q(position__gt=position)
+        | Q(position=position, initiative__lt=initiative)
+        | Q(position=position, initiative=initiative, pk__gt=pk)
+    )
+
+
+def _before(key: RowKey) -> Q:
+    """Return the filter for rows acting before the row at ``key``."""
+    position, initiative, pk = key
+    return (
+        Q(position__lt=position)
+        | Q(position=position, initiative__gt=initiative)
+        | Q(position=position, initiative=initiative, pk__lt=pk)
+    )
+
+
+def _row_key(row: Dict[str, Any]) -> RowKey:
+    """Return the place of a tracker row in turn order."""
+    return row["position"], row["initiative"], row["pk"]
+
+
+def _window(
+    rows: List[Dict[str, Any]],
+    before: List[Dict[str, Any]],
+    start: int,
+    size: int,
+) -> TrackerWindow:
+    """
+    Build the window from the rows read from ``start`` and those before.
+
+    ``before`` is only read when fewer than ``size`` rows were left from
+    ``start`` on, and tops the window up to ``size`` rows.
+    """
+    later = len(rows) > size
+    rows = rows[:size]
+    current = rows[0] if rows else None
+    earlier = start > 0
+    if start and len(rows) < size:
+        before, earlier = _chunk(before, False, size - len(rows))
+        rows = before + rows
+    return TrackerWindow(rows, current, earlier, later)
+
+
+def _chunk(
+    rows: List[Dict[str, Any]], later: bool, size: int
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Trim ``size + 1`` rows read next to a key and put them in turn order."""
+    more = len(rows) > size
+    rows = rows[:size]
+    if not later:
+        rows.reverse()
+    return rows, more
+
+
+def _count_ahead(current: Character | None, characters: Iterable[Character]) -> int:
+    """Count the ``characters`` that sort ahead of the acting character."""
+    if current is None:
+        return 0
+    current_key = (current.position, -current.initiative)
+    return sum(1 for c in characters if (c.position, -c.initiative) < current_key)
+
+
+def _rolled(characters: List[Character], rng: random.Random) -> List[Character]:
+    """
+    Give ``characters`` fresh initiative rolls and positions in turn order.
+
+    Higher initiative acts first; ties go to the higher modifier, then to the
+    character added first.
+    """
+    rolls = roll_d20s(
+        [c.roll_mode for c in characters],
+        [c.initiative_modifier for c in characters],
+        rng,
+    )
+    for character, roll in zip(characters, rolls):
+        character.initiative = roll
+    order = sorted(
+        characters, key=lambda c: (-c.initiative, -c.initiative_modifier, c.pk)
+    )
+    for index, character in enumerate(order, start=1):
+        character.position = index * RANK_GAP
+    return order
+
+
+def _unchanged(
+    character: Character, *neighbours: Character | None
+) -> models.QuerySet[Character]:
+    """Return ``character`` while it and its ``neighbours`` keep their positions."""
+    guards = [
+        Exists(Character.objects.filter(pk=n.pk, position=n.position))
+        for n in neighbours
+        if n is not None
+    ]
+    return Character.objects.filter(
+        *guards, pk=character.pk, position=character.position
+    )
+
+
+def _nudge_neighbours(
+    neighbours: List[Character], later: bool
+) -> Tuple[Character | None, Character | None]:
+    """Return the new ``after`` and ``before`` of a character nudged past the first."""
+    if not neighbours:
+        return None, None
+    passed = neighbours[0]
+    beyond = neighbours[1] if len(neighbours) > 1 else None
+    return (passed, beyond) if later else (beyond, passed)
+
+
+def _slot_between(
+    after: Character | None, before: Character | None
+) -> Tuple[int, bool] | None:
+    """
+    Return a position between two neighbours and whether it fits strictly.
+
+    Returns ``None`` when there are no neighbours to move between.
+    """
+    if before is None:
+        return (after.position + RANK_GAP, True) if after else None
+    high = before.position
+    if after is None:
+        position = high - RANK_GAP if high >= RANK_GAP else high // 2
+        return position, position < high
+    low = after.position
+    position = (low + high) // 2
+    return position, low < position < high
+
+
+def _reinsert_order(
+    character: Character, after: Character | None
+) -> Tuple[str, List[int]]:
+    """
+    Return the ORDER BY ranking ``character`` right behind ``after``.
+
+    The character takes ``after``'s place in turn order and then sorts just
+    behind it; without ``after`` it goes first.
+    """
+    if after is None:
+        return f"CASE WHEN id = %s THEN 0 ELSE 1 END, {COMPACT_ORDER}", [character.pk]
+    moved = "CASE WHEN id = %s THEN %s ELSE {} END"
+    order = (
+        f"{moved.format('position')}, {moved.format('initiative')} DESC, "
+        f"{moved.format('id')}, CASE WHEN id = %s THEN 1 ELSE 0 END"
+    )
+    pk = character.pk
+    return order, [pk, after.position, pk, after.initiative, pk, after.pk, pk]
+
+
+def _renumbered(order: Sequence[Character]) -> List[Character]:
+    """Give ``order`` gapped positions and return the characters that changed."""
+    changed = []
+    for index, character in enumerate(order, start=1):
+        if character.position != index * RANK_GAP:
+            character.position = index * RANK_GAP
+            changed.append(character)
+    return changed
+
+
+def _rank_positions(
+    encounters: models.QuerySet[Encounter], order: str, order_params: Sequence[int] = ()
+) -> Dict[int, int]:
+    """
+    Renumber the characters of ``encounters`` ``RANK_GAP`` apart in ``order``.
+
+    A single ``UPDATE ... FROM`` over a ``ROW_NUMBER()`` window per encounter,
+    skipping rows already in place. Returns the number of rows written per
+    encounter, leaving out encounters that were already compact.
+    """
+    table = Character._meta.db_table
+    subquery, params = encounters.order_by().values("pk").query.sql_with_params()
+    changed: Dict[int, int] = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET position = ranked.slot * %s FROM ("
+            f"SELECT id, ROW_NUMBER() OVER ("
+            f"PARTITION BY encounter_id ORDER BY {order}) AS slot "
+            f"FROM {table} WHERE encounter_id IN ({subquery})) AS ranked "
+            f"WHERE {table}.id = ranked.id AND {table}.position <> ranked.slot * %s "
+            f"RETURNING {table}.encounter_id",
+            [RANK_GAP, *order_params, *params, RANK_GAP],
+        )
+        for (encounter_pk,) in cursor:
+            changed[encounter_pk] = changed.get(encounter_pk, 0) + 1
+    return changed
+
+
+def _rolled_initiative() -> CombinedExpression:
+    """Return the UPDATE expression rolling a character's initiative."""
+
+    def d20() -> Cast:
+        return Cast(Floor(Random() * 20) + 1, models.IntegerField())
+
+    return Case(
+        When(roll_mode=ADVANTAGE, then=Greatest(d20(), d20())),
+        When(roll_mode=DISADVANTAGE, then=Least(d20(), d20())),
+        default=d20(),
+        output_field=models.IntegerField(),
+    ) + F("initiative_modifier")
+
+
+class RollMode(models.TextChoices):
+    """How many d20s a character rolls for initiative, and which one counts."""
+
+    NORMAL = "normal", "Normal"
+    ADVANTAGE = ADVANTAGE, "Advantage"
+    DISADVANTAGE = DISADVANTAGE, "Disadvantage"
 
 
 class Character(models.Model):
@@ -13,20 +970,35 @@ class Character(models.Model):
     then by initiative roll in descending order (higher = earlier in turn order).
     """
 
+    encounter = models.ForeignKey(
+        Encounter,
+        on_delete=models.CASCADE,
+        related_name="characters",
+        help_text="Encounter this character takes part in",
+        # Covered by the leading column of the turn order index below.
+        db_index=False,
+    )
     name = models.CharField(
         max_length=100,
         help_text="Character's name (e.g., 'Goblin Scout')",
-        db_index=True,
     )
     initiative = models.IntegerField(
         default=0,
         help_text="Initiative roll (higher goes first)",
-        db_index=True,
     )
     position = models.PositiveIntegerField(
         default=0,
         help_text="Order position (GM adjustable)",
-        db_index=True,
+    )
+    initiative_modifier = models.IntegerField(
+        default=0,
+        help_text="Added to every initiative roll (e.g., Dexterity modifier)",
+    )
+    roll_mode = models.CharField(
+        max_length=12,
+        choices=RollMode.choices,
+        default=RollMode.NORMAL,
+        help_text="Whether initiative is rolled with advantage or disadvantage",
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -34,9 +1006,157 @@ class Character(models.Model):
         """Meta configuration for Character model."""
 
         ordering = ["position", "-initiative"]
+        # One index serving every tracker read: it matches the turn order
+        # (the primary key breaks ties) and carries the columns of a tracker
+        # row, so the rows are read from the index without a sort or a table
+        # lookup. Single-column indexes would only slow down writes.
+        indexes = [
+            models.Index(
+                fields=["encounter", "position", "-initiative", "id", "name"],
+                name="character_turn_order_idx",
+            ),
+            # The admin's case-insensitive name index is created per database
+            # by migration 0011, as no expression compares the same way on
+            # all of them.
+        ]
         verbose_name = "Character"
         verbose_name_plural = "Characters"
 
     def __str__(self) -> str:
         """Return string representation of the character."""
         return f"{self.name} (Init: {self.initiative})"
+
+
+class CombatEvent(models.Model):
+    """
+    One recorded action of an encounter's combat log.
+
+    Events hold what the action changed rather than the whole encounter: the
+    new values of the touched characters' columns, the ids of the removed
+    characters and the turn cursor afterwards. Replayed on top of a
+    ``CombatSnapshot`` they give the encounter's state after any action.
+    """
+
+    encounter = models.ForeignKey(
+        Encounter,
+        on_delete=models.CASCADE,
+        related_name="events",
+        # Covered by the leading column of the unique sequence constraint.
+        db_index=False,
+    )
+    sequence = models.PositiveIntegerField(
+        help_text="Position of the event in the encounter's log, from 1",
+    )
+    action = models.CharField(max_length=20, help_text="Action recorded")
+    rows = models.JSONField(
+        default=list,
+        help_text="Changed columns of added or updated characters, with their pk",
+    )
+    removed = models.JSONField(default=list, help_text="Ids of removed characters")
+    turn_index = models.PositiveIntegerField()
+    round_number = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta configuration for CombatEvent model."""
+
+        ordering = ["encounter", "sequence"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["encounter", "sequence"], name="combat_event_sequence_uniq"
+            ),
+        ]
+        verbose_name = "Combat Event"
+        verbose_name_plural = "Combat Events"
+
+    def __str__(self) -> str:
+        """Return string representation of the event."""
+        return f"#{self.sequence} {self.action} (Round {self.round_number})"
+
+
+class CombatSnapshot(models.Model):
+    """
+    The complete state of an encounter after one event of its combat log.
+
+    Taken every few events, so restoring any point of the log replays only the
+    events recorded since the nearest snapshot before it.
+    """
+
+    encounter = models.ForeignKey(
+        Encounter,
+        on_delete=models.CASCADE,
+        related_name="snapshots",
+        # Covered by the leading column of the unique sequence constraint.
+        db_index=False,
+    )
+    sequence = models.PositiveIntegerField(
+        help_text="Sequence of the last event included (0: before the log)",
+    )
+    characters = models.JSONField(
+        default=list, help_text="Every character's recorded columns, with its pk"
+    )
+    turn_index = models.PositiveIntegerField()
+    round_number = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta configuration for CombatSnapshot model."""
+
+        ordering = ["encounter", "sequence"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["encounter", "sequence"], name="combat_snapshot_sequence_uniq"
+            ),
+        ]
+        verbose_name = "Combat Snapshot"
+        verbose_name_plural = "Combat Snapshots"
+
+    def __str__(self) -> str:
+        """Return string representation of the snapshot."""
+        return f"{self.encounter} after #{self.sequence}"
+
+
+class StatBlock(models.Model):
+    """
+    A reusable creature of the stat-block library.
+
+    GMs look creatures up by name or tag and add copies of them to an
+    encounter instead of typing every combatant in by hand. Name and tags are
+    indexed for full-text search (see ``library.py``).
+    """
+
+    name = models.CharField(
+        max_length=100,
+        help_text="Creature name (e.g., 'Goblin Archer')",
+    )
+    initiative_modifier = models.IntegerField(
+        default=0,
+        help_text="Added to every initiative roll (e.g., Dexterity modifier)",
+    )
+    roll_mode = models.CharField(
+        max_length=12,
+        choices=RollMode.choices,
+        default=RollMode.NORMAL,
+        help_text="Whether initiative is rolled with advantage or disadvantage",
+    )
+    hit_points = models.PositiveIntegerField(
+        default=0,
+        help_text="Average hit points",
+    )
+    tags = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="Space-separated tags (e.g., 'goblinoid humanoid')",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta configuration for StatBlock model."""
+
+        ordering = ["name"]
+        verbose_name = "Stat Block"
+        verbose_name_plural = "Stat Blocks"
+
+    def __str__(self) -> str:
+        """Return string representation of the stat block."""
+        return self.name
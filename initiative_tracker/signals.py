@@ -0,0 +1,23 @@
+"""Signal handlers keeping the tracker render cache in sync with the models."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .fragments import invalidate_tracker
+from .models import Character, Encounter
+
+
+@receiver([post_save, post_delete], sender=Character)
+def character_changed(sender: type, instance: Character, **kwargs: Any) -> None:
+    """Invalidate the tracker of the encounter a character belongs to."""
+    invalidate_tracker(instance.encounter_id)
+
+
+@receiver([post_save, post_delete], sender=Encounter)
+def encounter_changed(sender: type, instance: Encounter, **kwargs: Any) -> None:
+    """Invalidate the encounter's tracker, e.g. after an admin edit."""
+    invalidate_tracker(instance.pk)
@@ -0,0 +1,240 @@
+"""
+Monte Carlo simulation of initiative rolls.
+
+Free of Django imports, so the worker processes it spawns start quickly.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, List, NamedTuple, Sequence, Tuple
+
+import numpy
+
+from .dice import ADVANTAGE, DISADVANTAGE
+
+# Trials per batch. Batches get their own seeds, so a seeded run gives the
+# same result however many workers share the batches.
+CHUNK_SIZE = 20_000
+
+# Below this many trials starting worker processes costs more than it saves:
+# a batch takes a few hundredths of a second, a spawned worker longer to start.
+POOL_THRESHOLD = 25 * CHUNK_SIZE
+
+# One pool of a worker per CPU, shared by every run that does not ask for its
+# own worker count, so concurrent web requests queue their batches instead of
+# each starting a full set of processes.
+_shared_pool: ProcessPoolExecutor | None = None
+_shared_pool_lock = threading.Lock()
+
+
+class Combatant(NamedTuple):
+    """What the simulator needs to know about a character."""
+
+    name: str
+    modifier: int
+    mode: str
+
+
+class Tally(NamedTuple):
+    """Counts collected over a batch of trials."""
+
+    trials: int
+    firsts: List[int]
+    slot_totals: List[int]
+    ahead: int
+
+
+class CombatantStats(NamedTuple):
+    """Outcome of the simulation for one combatant."""
+
+    combatant: Combatant
+    first: float
+    mean_slot: float
+
+
+class SimulationResult(NamedTuple):
+    """Outcome of a simulation run."""
+
+    trials: int
+    seed: int | None
+    stats: List[CombatantStats]
+    pair: Tuple[Combatant, Combatant] | None
+    ahead: float | None
+
+
+def combatants_of(characters: Iterable[Any]) -> List[Combatant]:
+    """
+    Describe ``Character`` instances (or rows) for the simulator.
+
+    Values are reduced to plain types: a ``RollMode`` member would make the
+    worker processes import the models to unpickle it.
+    """
+    return [
+        Combatant(str(c.name), int(c.initiative_modifier), str(c.roll_mode))
+        for c in characters
+    ]
+
+
+def run_trials(
+    combatants: Sequence[Combatant],
+    trials: int,
+    seed: int,
+    pair: Tuple[int, int] | None = None,
+) -> Tally:
+    """
+    Roll initiative ``trials`` times and count who acts when.
+
+    Turn order follows ``Encounter.roll_initiative()``: higher roll first,
+    then higher modifier, then the earlier combatant. ``pair`` holds the
+    indexes of two combatants; the tally counts the trials in which the first
+    one acts before the second.
+
+    The whole batch is rolled and ranked as arrays of trials by combatants.
+    Like ``roll_d20s()`` it draws two dice per combatant whatever its mode.
+    """
+    rng = numpy.random.default_rng(seed)
+    count = len(combatants)
+    modes = numpy.array([c.mode for c in combatants])
+    modifiers = numpy.array([c.modifier for c in combatants])
+    dice = rng.integers(1, 21, size=(2, trials, count), dtype=numpy.int8)
+    kept = numpy.where(
+        modes == ADVANTAGE,
+        dice.max(axis=0),
+        numpy.where(modes == DISADVANTAGE, dice.min(axis=0), dice[0]),
+    )
+    rolls = kept + modifiers
+    # Lay the columns out in tie-break order once, so a stable sort on the
+    # roll alone settles ties by modifier, then by index
+    tie_break = numpy.array(sorted(range(count), key=lambda i: (-modifiers[i], i)))
+    order = tie_break[numpy.argsort(-rolls[:, tie_break], axis=1, kind="stable")]
+    # slots[t, i] is the turn slot of combatant i in trial t
+    slots = numpy.empty_like(order)
+    numpy.put_along_axis(slots, order, numpy.arange(count), axis=1)
+    ahead = 0
+    if pair is not None:
+        ahead = int(numpy.count_nonzero(slots[:, pair[0]] < slots[:, pair[1]]))
+    return Tally(
+        trials,
+        numpy.bincount(order[:, 0], minlength=count).tolist(),
+        slots.sum(axis=0).tolist(),
+        ahead,
+    )
+
+
+def simulate(
+    combatants: Sequence[Combatant],
+    trials: int,
+    seed: int | None = None,
+    pair: Tuple[int, int] | None = None,
+    workers: int | None = None,
+    progress: Callable[[int], None] | None = None,
+) -> SimulationResult:
+    """
+    Run ``trials`` seeded initiative rolls, spread over a process pool.
+
+    The trials are cut into batches of ``CHUNK_SIZE``; large runs hand them to
+    the process-wide pool of one worker per CPU, or to a pool of their own
+    when ``workers`` is given. ``progress`` is called with the number of
+    finished trials after every batch.
+    """
+    combatants = list(combatants)
+    rng = random.Random(seed)
+    batches = [
+        (min(CHUNK_SIZE, trials - start), rng.getrandbits(64))
+        for start in range(0, trials, CHUNK_SIZE)
+    ]
+    tallies: List[Tally] = []
+    done = 0
+
+    if not combatants:
+        batches = []
+    elif trials < POOL_THRESHOLD or (workers or os.cpu_count() or 1) == 1:
+        for size, batch_seed in batches:
+            tallies.append(run_trials(combatants, size, batch_seed, pair))
+            done += size
+            if progress:
+                progress(done)
+        batches = []
+
+    if batches:
+        executor = _pool(workers) if workers else _shared()
+        futures = [
+            executor.submit(run_trials, combatants, size, batch_seed, pair)
+            for size, batch_seed in batches
+        ]
+        try:
+            for future in as_completed(futures):
+                tally = future.result()
+                tallies.append(tally)
+                done += tally.trials
+                if progress:
+                    progress(done)
+        except BrokenProcessPool:
+            _discard(executor)
+            raise
+        finally:
+            # Free the shared pool of an abandoned run's remaining batches
+            for future in futures:
+                future.cancel()
+            if workers:
+                executor.shutdown()
+
+    return _combine(combatants, trials, seed, pair, tallies)
+
+
+def _pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """Start a pool of ``workers`` processes (default: one per CPU)."""
+    # Spawned, not forked: the caller may be a threaded web server
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(workers or os.cpu_count(), mp_context=context)
+
+
+def _shared() -> ProcessPoolExecutor:
+    """Return the process-wide pool, starting it on first use."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = _pool()
+        return _shared_pool
+
+
+def _discard(executor: ProcessPoolExecutor) -> None:
+    """Forget the shared pool once a dead worker has broken it."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if executor is _shared_pool:
+            _shared_pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _combine(
+    combatants: List[Combatant],
+    trials: int,
+    seed: int | None,
+    pair: Tuple[int, int] | None,
+    tallies: List[Tally],
+) -> SimulationResult:
+    """Merge the batch tallies into probabilities and means."""
+    stats = []
+    for index, combatant in enumerate(combatants):
+        firsts = sum(t.firsts[index] for t in tallies)
+        slots = sum(t.slot_totals[index] for t in tallies)
+        stats.append(
+            CombatantStats(
+                combatant,
+                first=firsts / trials if trials else 0.0,
+                mean_slot=1 + slots / trials if trials else 0.0,
+            )
+        )
+    ahead = None
+    named_pair = None
+    if pair is not None and tallies:
+        ahead = sum(t.ahead for t in tallies) / trials
+        named_pair = (combatants[pair[0]], combatants[pair[1]])
+    return SimulationResult(trials, seed, stats, named_pair, ahead)
@@ -0,0 +1,144 @@
+/* Client behaviour of the initiative tracker.
+ *
+ * Drag-and-drop: rows of a `[data-sortable]` table body can be dragged by
+ * their handle. On drop, only the moved row and its new neighbours are posted,
+ * so the server can usually persist the move by writing a single row.
+ * Neighbours not loaded yet (beyond a sentinel row) are left for the server
+ * to look up.
+ *
+ * Windowed rows: the tracker renders a window of rows and loads the rest in
+ * chunks. A row patched in out-of-band may arrive again with its chunk; the
+ * copy loaded last replaces the other.
+ *
+ * Live updates: elements with `data-live-url` subscribe to the encounter's
+ * Server-Sent Events stream. Spectator views swap in the pushed fragment;
+ * elements marked `data-live-refresh` re-fetch their own (interactive) content
+ * through the `tracker-changed` HTMX trigger instead.
+ *
+ * Simulations: elements with `data-simulation-url` follow a simulation's
+ * stream, filling their progress bar until the result replaces them.
+ */
+(function () {
+    "use strict";
+
+    function characterRow(element) {
+        return element && element.matches("tr[data-pk]") ? element : null;
+    }
+
+    function dropDuplicates(row) {
+        Array.prototype.forEach.call(
+            document.querySelectorAll('[id="' + row.id + '"]'),
+            function (other) {
+                if (other !== row) {
+                    other.remove();
+                }
+            }
+        );
+    }
+
+    function initSortable(tbody) {
+        var dragged = null;
+        var originalNext = null;
+
+        tbody.addEventListener("dragstart", function (event) {
+            dragged = event.target.closest("tr[data-pk]");
+            if (!dragged) {
+                return;
+            }
+            originalNext = dragged.nextElementSibling;
+            event.dataTransfer.effectAllowed = "move";
+            dragged.classList.add("dragging");
+        });
+
+        tbody.addEventListener("dragover", function (event) {
+            var row = event.target.closest("tr[data-pk]");
+            if (!dragged || !row || row === dragged) {
+                return;
+            }
+            event.preventDefault();
+            var box = row.getBoundingClientRect();
+            var below = event.clientY > box.top + box.height / 2;
+            tbody.insertBefore(dragged, below ? row.nextSibling : row);
+        });
+
+        tbody.addEventListener("dragend", function () {
+            if (!dragged) {
+                return;
+            }
+            var row = dragged;
+            var after = characterRow(row.previousElementSibling);
+            var before = characterRow(row.nextElementSibling);
+            row.classList.remove("dragging");
+            dragged = null;
+            if (row.nextElementSibling === originalNext) {
+                return;
+            }
+            htmx.ajax("POST", tbody.dataset.moveUrl, {
+                target: "#tracker-content",
+                swap: "innerHTML",
+                headers: { "X-CSRFToken": tbody.dataset.csrfToken },
+                values: {
+                    action: "move",
+                    pk: row.dataset.pk,
+                    after_pk: after ? after.dataset.pk : "",
+                    before_pk: before ? before.dataset.pk : "",
+                },
+            });
+        });
+    }
+
+    function initLive(element) {
+        if (element.dataset.liveConnected) {
+            return;
+        }
+        element.dataset.liveConnected = "true";
+        var source = new EventSource(element.dataset.liveUrl);
+        source.addEventListener("tracker", function (event) {
+            if (element.hasAttribute("data-live-refresh")) {
+                htmx.trigger(element, "tracker-changed");
+            } else {
+                element.innerHTML = event.data;
+            }
+        });
+    }
+
+    function initSimulation(element) {
+        if (element.dataset.simulationConnected) {
+            return;
+        }
+        element.dataset.simulationConnected = "true";
+        var source = new EventSource(element.dataset.simulationUrl);
+        var bar = element.querySelector(".progress-bar");
+        source.addEventListener("progress", function (event) {
+            bar.style.width = event.data + "%";
+            bar.textContent = event.data + "%";
+        });
+        source.addEventListener("result", function (event) {
+            source.close();
+            element.innerHTML = event.data;
+        });
+        // A reconnect would run the whole simulation again
+        source.addEventListener("error", function () {
+            source.close();
+        });
+    }
+
+    htmx.onLoad(function (content) {
+        var bodies = content.querySelectorAll("[data-sortable]");
+        if (content.matches && content.matches("[data-sortable]")) {
+            bodies = [content];
+        }
+        Array.prototype.forEach.call(bodies, initSortable);
+        if (content.matches && content.matches("tr[data-pk]")) {
+            dropDuplicates(content);
+        }
+        Array.prototype.forEach.call(
+            content.querySelectorAll("[data-live-url]"),
+            initLive
+        );
+        Array.prototype.forEach.call(
+            content.querySelectorAll("[data-simulation-url]"),
+            initSimulation
+        );
+    });
+})();
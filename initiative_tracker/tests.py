@@ -2,10 +2,58 @@
 
 from __future__ import annotations
 
-from django.test import Client, TestCase
+import asyncio
+import csv
+import io
+import json
+import pathlib
+import random
+import re
+import tempfile
+from typing import Any
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.servers.basehttp import WSGIServer
+from django.db import DatabaseError, connection
+from django.test import Client, LiveServerTestCase, TestCase, override_settings
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import translation
+
+from core.metrics import registry
 
-from .models import Character
+from . import simulation
+from .admin import CharacterAdmin
+from .benchmarks import CASES, compare, run_benchmarks, to_json
+from .broker import Broker, InProcessBroker, Message, get_broker
+from .dice import roll_d20s
+from .export import EXPORTS, export_lines, export_rows
+from .forms import SimulationForm
+from .fragments import CSRF_PLACEHOLDER
+from .history import SNAPSHOT_INTERVAL, checkpoint, history_row, record, restore
+from .library import match_expression, search_stat_blocks
+from .live import tracker_channel
+from .loadtest import mix_from_string, percentile, run_load, summarize
+from .models import (
+    POSITION_LIMIT,
+    RANK_GAP,
+    TRACKER_FIELDS,
+    TRACKER_WINDOW,
+    TURN_ORDER,
+    Character,
+    CombatEvent,
+    CombatSnapshot,
+    Encounter,
+    RollMode,
+    StatBlock,
+)
+from .simulation import Combatant, combatants_of, simulate
+from .views import TrackerView
 
 
 class CharacterModelTest(TestCase):
@@ -13,8 +61,9 @@ class CharacterModelTest(TestCase):
 
     def setUp(self) -> None:
         """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
         self.character = Character.objects.create(
-            name="Test Goblin", initiative=15, position=0
+            encounter=self.encounter, name="Test Goblin", initiative=15, position=0
         )
 
     def test_character_creation(self) -> None:
@@ -34,15 +83,16 @@ class CharacterDeleteViewTest(TestCase):
 
     def setUp(self) -> None:
         """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
         self.client = Client()
         self.char1 = Character.objects.create(
-            name="Goblin Scout", initiative=12, position=0
+            encounter=self.encounter, name="Goblin Scout", initiative=12, position=0
         )
         self.char2 = Character.objects.create(
-            name="Orc Warrior", initiative=8, position=1
+            encounter=self.encounter, name="Orc Warrior", initiative=8, position=1
         )
         self.char3 = Character.objects.create(
-            name="Elf Ranger", initiative=18, position=2
+            encounter=self.encounter, name="Elf Ranger", initiative=18, position=2
         )
 
     def test_delete_character_reduces_count(self) -> None:
@@ -52,7 +102,8 @@ class CharacterDeleteViewTest(TestCase):
 
         # Delete the character with POST (simulating HTMX)
         delete_url = reverse(
-            "initiative_tracker:delete_character", kwargs={"pk": self.char1.pk}
+            "initiative_tracker:delete_character",
+            kwargs={"encounter_pk": self.encounter.pk, "pk": self.char1.pk},
         )
         response = self.client.post(delete_url)
 
@@ -64,16 +115,21 @@ class CharacterDeleteViewTest(TestCase):
         self.assertFalse(Character.objects.filter(pk=self.char1.pk).exists())
 
     def test_delete_character_with_htmx(self) -> None:
-        """Test that deleting a character redirects to show deletion."""
+        """Test that deleting with HTMX removes just that row."""
         delete_url = reverse(
-            "initiative_tracker:delete_character", kwargs={"pk": self.char2.pk}
+            "initiative_tracker:delete_character",
+            kwargs={"encounter_pk": self.encounter.pk, "pk": self.char2.pk},
         )
 
-        # Delete should always redirect to refresh the page
         response = self.client.post(delete_url, HTTP_HX_REQUEST="true")
 
-        # Should redirect (302)
-        self.assertEqual(response.status_code, 302)
+        # The row is deleted out-of-band instead of reloading the page
+        self.assertContains(
+            response,
+            f'<tr id="character-{self.char2.pk}" hx-swap-oob="delete"></tr>',
+            html=True,
+        )
+        self.assertEqual(response["HX-Reswap"], "none")
 
         # Character should be deleted
         self.assertFalse(Character.objects.filter(pk=self.char2.pk).exists())
@@ -84,7 +140,8 @@ class CharacterDeleteViewTest(TestCase):
     def test_delete_nonexistent_character(self) -> None:
         """Test that deleting a non-existent character returns 404."""
         delete_url = reverse(
-            "initiative_tracker:delete_character", kwargs={"pk": 9999}
+            "initiative_tracker:delete_character",
+            kwargs={"encounter_pk": self.encounter.pk, "pk": 9999},
         )
         response = self.client.post(delete_url)
         self.assertEqual(response.status_code, 404)
@@ -93,7 +150,8 @@ class CharacterDeleteViewTest(TestCase):
         """Test deleting all characters one by one."""
         for char in [self.char1, self.char2, self.char3]:
             delete_url = reverse(
-                "initiative_tracker:delete_character", kwargs={"pk": char.pk}
+                "initiative_tracker:delete_character",
+                kwargs={"encounter_pk": self.encounter.pk, "pk": char.pk},
             )
             self.client.post(delete_url)
 
@@ -106,17 +164,22 @@ class CharacterReorderTest(TestCase):
 
     def setUp(self) -> None:
         """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
         self.client = Client()
         self.char1 = Character.objects.create(
-            name="Character A", initiative=10, position=1
+            encounter=self.encounter, name="Character A", initiative=10, position=1
         )
         self.char2 = Character.objects.create(
-            name="Character B", initiative=15, position=2
+            encounter=self.encounter, name="Character B", initiative=15, position=2
         )
 
+    def _order(self) -> list[str]:
+        """Return the names in turn order."""
+        return list(self.encounter.turn_order().values_list("name", flat=True))
+
     def test_increase_position(self) -> None:
-        """Test increasing a character's position."""
-        reorder_url = reverse("initiative_tracker:reorder")
+        """Test that increasing a position moves the character past the next."""
+        reorder_url = reverse("initiative_tracker:reorder", args=[self.encounter.pk])
         response = self.client.post(
             reorder_url,
             {"action": "reorder_increase", "pk": self.char1.pk},
@@ -124,12 +187,11 @@ class CharacterReorderTest(TestCase):
 
         # Should redirect to show updated order
         self.assertEqual(response.status_code, 302)
-        self.char1.refresh_from_db()
-        self.assertEqual(self.char1.position, 2)
+        self.assertEqual(self._order(), ["Character B", "Character A"])
 
     def test_decrease_position(self) -> None:
-        """Test decreasing a character's position."""
-        reorder_url = reverse("initiative_tracker:reorder")
+        """Test that decreasing a position moves the character past the previous."""
+        reorder_url = reverse("initiative_tracker:reorder", args=[self.encounter.pk])
         response = self.client.post(
             reorder_url,
             {"action": "reorder_decrease", "pk": self.char2.pk},
@@ -137,15 +199,16 @@ class CharacterReorderTest(TestCase):
 
         # Should redirect to show updated order
         self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._order(), ["Character B", "Character A"])
         self.char2.refresh_from_db()
-        self.assertEqual(self.char2.position, 1)
+        self.assertGreaterEqual(self.char2.position, 0)
 
     def test_decrease_position_minimum(self) -> None:
-        """Test that position doesn't go below 0."""
+        """Test that the first character stays first, at its position."""
         self.char1.position = 0
         self.char1.save()
 
-        reorder_url = reverse("initiative_tracker:reorder")
+        reorder_url = reverse("initiative_tracker:reorder", args=[self.encounter.pk])
         response = self.client.post(
             reorder_url,
             {"action": "reorder_decrease", "pk": self.char1.pk},
@@ -155,28 +218,2331 @@ class CharacterReorderTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.char1.refresh_from_db()
         self.assertEqual(self.char1.position, 0)  # Should stay at 0
+        self.assertEqual(self._order(), ["Character A", "Character B"])
 
+    def test_nudges_pass_gapped_neighbours(self) -> None:
+        """Test that nudges change the order however far apart positions are."""
+        Character.objects.filter(pk=self.char1.pk).update(position=RANK_GAP)
+        Character.objects.filter(pk=self.char2.pk).update(position=2 * RANK_GAP)
+        c = Character.objects.create(
+            encounter=self.encounter, name="Character C", initiative=5, position=4096
+        )
+        stale = Encounter.objects.get(pk=self.encounter.pk)
 
-class TrackerViewTest(TestCase):
-    """Test cases for the tracker view."""
+        self.assertFalse(self.encounter.nudge_character(c, later=False))
+        c = Character.objects.get(pk=c.pk)
+        self.assertFalse(stale.nudge_character(c, later=False))
+
+        self.assertEqual(self._order(), ["Character C", "Character A", "Character B"])
+        c.refresh_from_db()
+        self.assertEqual(c.position, 0)
+
+    def test_concurrent_nudges_add_up(self) -> None:
+        """Test that nudges from two stale copies are not lost."""
+        a, b = self.char1, self.char2
+        c, d = (
+            Character.objects.create(
+                encounter=self.encounter, name=name, initiative=5, position=position
+            )
+            for name, position in (("Character C", 3072), ("Character D", 4096))
+        )
+        Character.objects.filter(pk=a.pk).update(position=RANK_GAP)
+        Character.objects.filter(pk=b.pk).update(position=2 * RANK_GAP)
+        stale = Encounter.objects.get(pk=self.encounter.pk)
+        first, second = (Character.objects.get(pk=a.pk) for _ in range(2))
+
+        self.assertFalse(self.encounter.nudge_character(first))
+        self.assertFalse(stale.nudge_character(second))
+
+        self.assertEqual(
+            self._order(), ["Character B", "Character C", "Character A", "Character D"]
+        )
+        self.assertEqual(second.position, 3584)
+
+    def test_nudge_writes_only_the_position(self) -> None:
+        """Test that a nudge reads two neighbours and updates one position."""
+        with CaptureQueriesContext(connection) as queries:
+            self.encounter.nudge_character(self.char2, later=False)
+
+        statements = [q["sql"] for q in queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(len(statements), 2)
+        self.assertIn('SET "position" =', statements[1])
+        self.assertNotIn('"name"', statements[1].split("WHERE")[0])
+        self.assertIn('"initiative_tracker_character"."position" = 2', statements[1])
+
+    def test_bogus_pk_is_404(self) -> None:
+        """Test that a pk that is not a plain number is rejected, not a crash."""
+        response = self.client.post(
+            reverse("initiative_tracker:reorder", args=[self.encounter.pk]),
+            {"action": "reorder_increase", "pk": "\u00b2"},
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_reorder_other_encounters_character_is_404(self) -> None:
+        """Test that a character of another encounter cannot be nudged."""
+        other = Encounter.objects.create(name="Other")
+        response = self.client.post(
+            reverse("initiative_tracker:reorder", args=[other.pk]),
+            {"action": "reorder_increase", "pk": self.char1.pk},
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.char1.refresh_from_db()
+        self.assertEqual(self.char1.position, 1)
+
+
+class NextTurnTest(TestCase):
+    """Test cases for advancing the turn cursor."""
 
     def setUp(self) -> None:
         """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
         self.client = Client()
-        Character.objects.create(name="Character 1", initiative=10, position=0)
-        Character.objects.create(name="Character 2", initiative=15, position=1)
+        self.url = reverse("initiative_tracker:next_turn", args=[self.encounter.pk])
+        self.fighter = Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative=18, position=0
+        )
+        self.rogue = Character.objects.create(
+            encounter=self.encounter, name="Rogue", initiative=14, position=0
+        )
+        self.goblin = Character.objects.create(
+            encounter=self.encounter, name="Goblin", initiative=9, position=0
+        )
 
-    def test_tracker_view_displays_characters(self) -> None:
-        """Test that the tracker view displays all characters."""
-        response = self.client.get(reverse("initiative_tracker:tracker"))
+    def test_next_turn_is_labelled_in_metrics(self) -> None:
+        """Test that metrics name the TrackerView action, not just the URL."""
+        registry.reset()
+        response = self.client.post(
+            self.url, {"action": "next_turn"}, HTTP_HX_REQUEST="true"
+        )
+
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn(
+            'tabletop_db_queries_count{action="next_turn",method="POST",'
+            'view="initiative_tracker:next_turn"} 1',
+            registry.expose(),
+        )
+
+    def test_next_turn_moves_cursor_not_positions(self) -> None:
+        """Test that advancing only moves the cursor."""
+        response = self.client.post(self.url, {"action": "next_turn"})
+
+        self.assertEqual(response.status_code, 302)
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.turn_index, 1)
+        self.assertEqual(self.encounter.round_number, 1)
+        self.assertEqual(
+            list(self.encounter.characters.values_list("position", flat=True)),
+            [0, 0, 0],
+        )
+
+    def test_next_turn_wraps_to_new_round(self) -> None:
+        """Test that the cursor wraps around and starts a new round."""
+        for _ in range(3):
+            self.client.post(self.url, {"action": "next_turn"})
+
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.turn_index, 0)
+        self.assertEqual(self.encounter.round_number, 2)
+
+    def test_stale_next_turn_does_not_advance_twice(self) -> None:
+        """Test that a second tab's click for an old turn is rejected."""
+        version = self.encounter.turn_version
+        self.client.post(self.url, {"action": "next_turn", "turn_version": version})
+        response = self.client.post(
+            self.url,
+            {"action": "next_turn", "turn_version": version},
+            HTTP_HX_REQUEST="true",
+        )
+
+        self.assertContains(response, 'name="turn_version" value="1"')
+        self.assertIn(
+            "The turn already moved on.",
+            [str(m) for m in get_messages(response.wsgi_request)],
+        )
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.turn_index, 1)
+        self.assertEqual(self.encounter.turn_version, 1)
+
+    def test_next_turn_is_single_update(self) -> None:
+        """Test that advancing the cursor issues exactly one UPDATE."""
+        with CaptureQueriesContext(connection) as queries:
+            self.encounter.advance_turn()
+
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+
+    def test_next_turn_without_characters_keeps_round(self) -> None:
+        """Test that an empty encounter does not start new rounds."""
+        empty = Encounter.objects.create(name="Empty")
+        empty.advance_turn()
+
+        self.assertEqual(empty.turn_index, 0)
+        self.assertEqual(empty.round_number, 1)
+
+    def test_htmx_next_turn_renders_current_turn(self) -> None:
+        """Test that the HTMX partial shows the new current turn."""
+        response = self.client.post(
+            self.url, {"action": "next_turn"}, HTTP_HX_REQUEST="true"
+        )
 
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, "Character 1")
-        self.assertContains(response, "Character 2")
+        self.assertEqual(response.context["current_turn"].pk, self.rogue.pk)
 
-    def test_tracker_shows_current_turn(self) -> None:
-        """Test that the tracker shows the current turn character."""
-        response = self.client.get(reverse("initiative_tracker:tracker"))
+    def test_delete_before_cursor_keeps_current_turn(self) -> None:
+        """Test that removing an earlier character keeps the acting one."""
+        self.client.post(self.url, {"action": "next_turn"})
+        self.client.post(self.url, {"action": "next_turn"})
+        self.client.post(
+            reverse(
+                "initiative_tracker:delete_character",
+                kwargs={"encounter_pk": self.encounter.pk, "pk": self.fighter.pk},
+            )
+        )
 
-        # Should show current turn
-        self.assertContains(response, "Current Turn")
+        response = self.client.get(
+            reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+        )
+        self.assertEqual(response.context["current_turn"]["pk"], self.goblin.pk)
+
+    def test_add_before_cursor_keeps_current_turn(self) -> None:
+        """Test that a faster newcomer does not steal the current turn."""
+        self.client.post(self.url, {"action": "next_turn"})
+        self.client.post(
+            reverse("initiative_tracker:add_character", args=[self.encounter.pk]),
+            {"action": "add", "name": "Wizard", "initiative": 20, "position": 0},
+        )
+
+        response = self.client.get(
+            reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+        )
+        self.assertEqual(response.context["current_turn"]["pk"], self.rogue.pk)
+
+
+class BulkAddTest(TestCase):
+    """Test cases for adding many characters in one request."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.client = Client()
+        self.url = reverse(
+            "initiative_tracker:bulk_add_characters", args=[self.encounter.pk]
+        )
+
+    def test_bulk_add_lines(self) -> None:
+        """Test adding a pasted list of name/initiative/position lines."""
+        data = "Goblin Scout 12\nOrc Warrior 8 5\nKobold"
+        response = self.client.post(self.url, {"rows": data, "format": "auto"})
+
+        self.assertEqual(response.status_code, 302)
+        rows = list(
+            self.encounter.characters.order_by("pk").values_list(
+                "name", "initiative", "position"
+            )
+        )
+        self.assertEqual(
+            rows, [("Goblin Scout", 12, 1), ("Orc Warrior", 8, 5), ("Kobold", 0, 6)]
+        )
+
+    def test_bulk_add_csv_with_header(self) -> None:
+        """Test adding characters from CSV with a header row."""
+        data = "initiative,name\n14,Elf Ranger\n3,Zombie"
+        self.client.post(self.url, {"rows": data, "format": "csv"})
+
+        self.assertEqual(
+            set(self.encounter.characters.values_list("name", "initiative")),
+            {("Elf Ranger", 14), ("Zombie", 3)},
+        )
+
+    def test_bulk_add_json(self) -> None:
+        """Test adding characters from a JSON list."""
+        data = '[{"name": "Dragon", "initiative": 20, "position": 0}]'
+        self.client.post(self.url, {"rows": data, "format": "json"})
+
+        dragon = self.encounter.characters.get()
+        self.assertEqual(
+            (dragon.name, dragon.initiative, dragon.position), ("Dragon", 20, 0)
+        )
+
+    def test_bulk_add_rejects_invalid_rows(self) -> None:
+        """Test that one invalid row rejects the whole batch."""
+        data = "Goblin, 12\n  , 5\nOrc, -3"
+        response = self.client.post(self.url, {"rows": data, "format": "csv"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Row 2")
+        self.assertContains(response, "Row 3")
+        self.assertFalse(self.encounter.characters.exists())
+
+    def test_bulk_add_uses_single_insert(self) -> None:
+        """Test that all rows are written with one INSERT."""
+        data = "\n".join(f"Goblin {i} {i % 20}" for i in range(100))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.url, {"rows": data, "format": "lines"}, HTTP_HX_REQUEST="true"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        inserts = [
+            q
+            for q in queries
+            if q["sql"].startswith('INSERT INTO "initiative_tracker_character"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.encounter.characters.count(), 100)
+
+
+class MoveCharacterTest(TestCase):
+    """Test cases for drag-and-drop reordering with gapped ranks."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.client = Client()
+        self.url = reverse("initiative_tracker:reorder", args=[self.encounter.pk])
+        self.chars = [
+            Character.objects.create(
+                encounter=self.encounter,
+                name=name,
+                initiative=10,
+                position=(index + 1) * RANK_GAP,
+            )
+            for index, name in enumerate(["A", "B", "C", "D"])
+        ]
+
+    def _order(self) -> list[str]:
+        """Return the encounter's character names in turn order."""
+        return [c.name for c in self.encounter.turn_order()]
+
+    def _move(self, char: Character, after: Any = None, before: Any = None) -> Any:
+        """Post a move of ``char`` between ``after`` and ``before``."""
+        return self.client.post(
+            self.url,
+            {
+                "action": "move",
+                "pk": char.pk,
+                "after_pk": after.pk if after else "",
+                "before_pk": before.pk if before else "",
+            },
+        )
+
+    def test_move_between_neighbours_writes_one_row(self) -> None:
+        """Test that a move into a gap updates only the moved row."""
+        a, b, c, d = self.chars
+        with CaptureQueriesContext(connection) as queries:
+            response = self._move(d, after=a, before=b)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._order(), ["A", "D", "B", "C"])
+        updates = [
+            q
+            for q in queries
+            if q["sql"].startswith('UPDATE "initiative_tracker_character"')
+        ]
+        self.assertEqual(len(updates), 1)
+        b.refresh_from_db()
+        self.assertEqual(b.position, 2 * RANK_GAP)
+
+    def test_move_to_top_and_bottom(self) -> None:
+        """Test moving characters to either end of the order."""
+        a, b, c, d = self.chars
+        self._move(c, before=a)
+        self._move(a, after=d)
+
+        self.assertEqual(self._order(), ["C", "B", "D", "A"])
+
+    def test_move_next_to_unloaded_rows(self) -> None:
+        """Test that a missing neighbour is looked up from the turn order."""
+        a, b, c, d = self.chars
+        # Dropped below B and above a sentinel row, or above C below one
+        self._move(d, after=b)
+        self._move(a, before=c)
+
+        self.assertEqual(self._order(), ["B", "D", "A", "C"])
+
+    def test_move_without_gap_renumbers(self) -> None:
+        """Test that exhausted gaps fall back to one renumbering."""
+        a, b, c, d = self.chars
+        Character.objects.filter(pk=b.pk).update(position=RANK_GAP + 1)
+        b.refresh_from_db()
+
+        self._move(d, after=a, before=b)
+
+        self.assertEqual(self._order(), ["A", "D", "B", "C"])
+        self.assertEqual(
+            [c.position for c in self.encounter.turn_order()],
+            [RANK_GAP, 2 * RANK_GAP, 3 * RANK_GAP, 4 * RANK_GAP],
+        )
+
+    def test_move_keeps_current_turn(self) -> None:
+        """Test that moving a row across the cursor keeps the acting character."""
+        a, b, c, d = self.chars
+        self.encounter.advance_turn()  # B acts
+        self._move(d, before=a)
+
+        response = self.client.get(
+            reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+        )
+        self.assertEqual(response.context["current_turn"]["pk"], b.pk)
+
+    def test_move_unknown_character_returns_404(self) -> None:
+        """Test that moving a character of another encounter fails."""
+        other = Encounter.objects.create(name="Other")
+        stranger = Character.objects.create(encounter=other, name="Stranger")
+
+        response = self._move(stranger, after=self.chars[0])
+        self.assertEqual(response.status_code, 404)
+
+    def test_set_full_order(self) -> None:
+        """Test applying a complete new order in one request."""
+        a, b, c, d = self.chars
+        response = self.client.post(
+            self.url,
+            {"action": "set_order", "order": [d.pk, c.pk, b.pk, a.pk]},
+            HTTP_HX_REQUEST="true",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._order(), ["D", "C", "B", "A"])
+
+    def test_set_incomplete_order_is_rejected(self) -> None:
+        """Test that an order missing characters is rejected."""
+        a, b, c, d = self.chars
+        response = self.client.post(
+            self.url, {"action": "set_order", "order": [d.pk, c.pk]}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._order(), ["A", "B", "C", "D"])
+
+
+class QueryBudgetTest(TestCase):
+    """Pin the number of queries of every TrackerView action."""
+
+    SIZES = (3, 30)
+
+    def _seed(self, size: int) -> Encounter:
+        """
+        Create an encounter with ``size`` characters.
+
+        The seeding is logged, so the actions pay the steady cost of recording
+        an event (claim a sequence, INSERT) and not the first-action snapshot.
+        """
+        encounter = Encounter.objects.create(name=f"Budget {size}")
+        characters = Character.objects.bulk_create(
+            Character(
+                encounter=encounter,
+                name=f"Goblin {i}",
+                initiative=i % 20,
+                position=(i + 1) * RANK_GAP,
+            )
+            for i in range(size)
+        )
+        checkpoint(encounter)
+        record(encounter, "bulk_add", map(history_row, characters))
+        return encounter
+
+    def _assert_budget(self, queries: int, action: Any) -> None:
+        """
+        Run ``action(encounter, characters)`` against every seeded size.
+
+        A mutation and its log event share a transaction, which inside the
+        test's own adds a savepoint pair to the mutations' budgets.
+        """
+        for size in self.SIZES:
+            with self.subTest(size=size):
+                encounter = self._seed(size)
+                characters = list(encounter.turn_order())
+                with self.assertNumQueries(queries):
+                    response = action(encounter, characters)
+                self.assertLess(response.status_code, 400)
+
+    def test_get_tracker(self) -> None:
+        """Test the full page: encounter plus one SELECT of the characters."""
+        self._assert_budget(
+            2,
+            lambda e, chars: self.client.get(
+                reverse("initiative_tracker:tracker", args=[e.pk])
+            ),
+        )
+
+    def test_get_tracker_htmx(self) -> None:
+        """Test the HTMX partial: encounter plus one SELECT of the characters."""
+        self._assert_budget(
+            2,
+            lambda e, chars: self.client.get(
+                reverse("initiative_tracker:tracker", args=[e.pk]),
+                HTTP_HX_REQUEST="true",
+            ),
+        )
+
+    def test_get_add_form(self) -> None:
+        """Test the add form: encounter plus the next position."""
+        self._assert_budget(
+            2,
+            lambda e, chars: self.client.get(
+                reverse("initiative_tracker:add_character", args=[e.pk]),
+                HTTP_HX_REQUEST="true",
+            ),
+        )
+
+    def test_add_character(self) -> None:
+        """Test adding: encounter, turns, INSERT, log event and successor."""
+        self._assert_budget(
+            9,
+            lambda e, chars: self.client.post(
+                reverse("initiative_tracker:add_character", args=[e.pk]),
+                {"action": "add", "name": "Orc", "initiative": 5, "position": 1},
+                HTTP_HX_REQUEST="true",
+            ),
+        )
+
+    def test_bulk_add_characters(self) -> None:
+        """Test bulk adding: encounter, position, INSERT, log event, re-render."""
+        self._assert_budget(
+            8,
+            lambda e, chars: self.client.post(
+                reverse("initiative_tracker:bulk_add_characters", args=[e.pk]),
+                {"rows": "Orc 5\nOgre 3", "format": "lines"},
+                HTTP_HX_REQUEST="true",
+            ),
+        )
+
+    def test_delete_character(self) -> None:
+        """Test deleting: encounter, character, cursor, DELETE and log event."""
+        self._assert_budget(
+            8,
+            lambda e, chars: self.client.post(
+                reverse(
+                    "initiative_tracker:delete_character",
+                    kwargs={"encounter_pk": e.pk, "pk": chars[0].pk},
+                )
+            ),
+        )
+
+    def test_next_turn(self) -> None:
+        """Test advancing: encounter, turns, UPDATE, reload and log event."""
+        self._assert_budget(
+            9,
+            lambda e, chars: self.client.post(
+                reverse("initiative_tracker:next_turn", args=[e.pk]),
+                {"action": "next_turn"},
+                HTTP_HX_REQUEST="true",
+            ),
+        )
+
+    def test_reorder(self) -> None:
+        """Test nudging: encounter, character, neighbours, guarded UPDATE, log."""
+        # The UPDATE claims the row in a savepoint of its own
+        self._assert_budget(
+            10,
+            lambda e, chars: self.client.post(
+                reverse("initiative_tracker:reorder", args=[e.pk]),
+                {"action": "reorder_increase", "pk": chars[0].pk},
+            ),
+        )
+
+    def test_move(self) -> None:
+        """Test a drag-and-drop move: encounter, rows, turns, UPDATE, log event."""
+        # The UPDATE claims the row in a savepoint of its own
+        self._assert_budget(
+            11,
+            lambda e, chars: self.client.post(
+                reverse("initiative_tracker:reorder", args=[e.pk]),
+                {
+                    "action": "move",
+                    "pk": chars[-1].pk,
+                    "after_pk": chars[0].pk,
+                    "before_pk": chars[1].pk,
+                },
+                HTTP_HX_REQUEST="true",
+            ),
+        )
+
+    def test_roll_initiative(self) -> None:
+        """Test rolling: encounter, characters, bulk UPDATE, cursor, log, render."""
+        self._assert_budget(
+            10,
+            lambda e, chars: self.client.post(
+                reverse("initiative_tracker:roll_initiative", args=[e.pk]),
+                {"action": "roll_initiative", "seed": 7},
+                HTTP_HX_REQUEST="true",
+            ),
+        )
+
+
+class RollInitiativeTest(TestCase):
+    """Test cases for rolling initiative for a whole encounter."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.url = reverse(
+            "initiative_tracker:roll_initiative", args=[self.encounter.pk]
+        )
+        self.fighter = Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative_modifier=2
+        )
+        self.rogue = Character.objects.create(
+            encounter=self.encounter,
+            name="Rogue",
+            initiative_modifier=4,
+            roll_mode=RollMode.ADVANTAGE,
+        )
+        self.goblin = Character.objects.create(
+            encounter=self.encounter, name="Goblin", roll_mode=RollMode.DISADVANTAGE
+        )
+
+    def test_dice_keep_the_right_die_and_add_the_modifier(self) -> None:
+        """Test advantage, disadvantage and modifiers on the same dice."""
+        modes = ["normal", "advantage", "disadvantage"]
+        normal = roll_d20s(["normal"] * 3, [0, 0, 0], random.Random(3))
+        rolled = roll_d20s(modes, [1, 0, 0], random.Random(3))
+
+        dice = random.Random(3).choices(range(1, 21), k=6)
+        self.assertEqual(normal, dice[0::2])
+        self.assertEqual(rolled[0], dice[0] + 1)
+        self.assertEqual(rolled[1], max(dice[2], dice[3]))
+        self.assertEqual(rolled[2], min(dice[4], dice[5]))
+
+    def test_seeded_roll_sorts_and_restarts_the_encounter(self) -> None:
+        """Test that a seeded roll is repeatable and sets the turn order."""
+        self.encounter.advance_turn()
+        self.encounter.roll_initiative(seed=42)
+        first = list(self.encounter.turn_order().values_list("pk", "initiative"))
+        self.encounter.roll_initiative(seed=42)
+        second = list(self.encounter.turn_order().values_list("pk", "initiative"))
+
+        self.assertEqual(first, second)
+        initiatives = [initiative for _pk, initiative in first]
+        self.assertEqual(initiatives, sorted(initiatives, reverse=True))
+        self.assertEqual(
+            list(self.encounter.turn_order().values_list("position", flat=True)),
+            [RANK_GAP, 2 * RANK_GAP, 3 * RANK_GAP],
+        )
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.turn_index, 0)
+        self.assertEqual(self.encounter.round_number, 1)
+
+    def test_roll_writes_every_character_at_once(self) -> None:
+        """Test that the new rolls are written with a single UPDATE."""
+        with CaptureQueriesContext(connection) as queries:
+            self.encounter.roll_initiative(seed=1)
+
+        character_updates = [
+            q for q in queries if 'UPDATE "initiative_tracker_character"' in q["sql"]
+        ]
+        self.assertEqual(len(character_updates), 1)
+
+    def test_htmx_roll_renders_the_new_order(self) -> None:
+        """Test that the view rolls and re-renders the tracker once."""
+        response = self.client.post(
+            self.url, {"action": "roll_initiative", "seed": 5}, HTTP_HX_REQUEST="true"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "initiative_tracker/tracker_partial.html")
+        order = [row["pk"] for row in response.context["characters"]]
+        self.assertEqual(
+            order, list(self.encounter.turn_order().values_list("pk", flat=True))
+        )
+
+    def test_add_form_accepts_modifier_and_roll_mode(self) -> None:
+        """Test that new characters can carry their initiative bonus."""
+        self.client.post(
+            reverse("initiative_tracker:add_character", args=[self.encounter.pk]),
+            {
+                "action": "add",
+                "name": "Wizard",
+                "initiative": 0,
+                "position": 0,
+                "initiative_modifier": -1,
+                "roll_mode": "advantage",
+            },
+        )
+
+        wizard = Character.objects.get(name="Wizard")
+        self.assertEqual(wizard.initiative_modifier, -1)
+        self.assertEqual(wizard.roll_mode, RollMode.ADVANTAGE)
+
+
+@skipUnless(connection.vendor == "sqlite", "Checks SQLite query plans")
+class TurnOrderIndexTest(TestCase):
+    """Test that tracker reads are served by the turn order index."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        Character.objects.bulk_create(
+            Character(encounter=self.encounter, name=f"Goblin {i}", initiative=i)
+            for i in range(5)
+        )
+        self.goblin = self.encounter.turn_order()[2]
+
+    def _assert_covered(self, queryset: Any) -> None:
+        """Assert the query reads only the index and needs no sort."""
+        plan = queryset.explain()
+        self.assertIn("USING COVERING INDEX character_turn_order_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_tracker_rows_come_from_the_index(self) -> None:
+        """Test that the tracker listing is an index scan in turn order."""
+        self._assert_covered(self.encounter.turn_order().values(*TRACKER_FIELDS))
+
+    def test_neighbour_lookups_come_from_the_index(self) -> None:
+        """Test that successor and ordinal lookups are index range scans."""
+        self._assert_covered(self.encounter._successors(self.goblin)[:1])
+        self._assert_covered(self.encounter._predecessors(self.goblin).values("pk"))
+
+    def test_name_searches_use_an_index(self) -> None:
+        """Test that admin name searches seek an index, filtered or not."""
+        matches = Character.objects.filter(name__istartswith="gob").order_by(
+            *CharacterAdmin.ordering
+        )
+        self.assertIn("USING INDEX character_name_idx", matches.explain())
+        # Within an encounter the turn order index, which ends with the name,
+        # checks the prefix and keeps the order
+        self._assert_covered(matches.filter(encounter=self.encounter).values("pk"))
+
+
+class SimulationTest(TestCase):
+    """Test cases for the Monte Carlo initiative simulator."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.fighter = Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative_modifier=5
+        )
+        self.goblin = Character.objects.create(
+            encounter=self.encounter,
+            name="Goblin",
+            initiative_modifier=2,
+            roll_mode=RollMode.DISADVANTAGE,
+        )
+        self.combatants = combatants_of([self.fighter, self.goblin])
+
+    def test_seeded_runs_match_across_worker_counts(self) -> None:
+        """Test that batch seeds make the result independent of the pool size."""
+        with (
+            mock.patch("initiative_tracker.simulation.CHUNK_SIZE", 100),
+            mock.patch("initiative_tracker.simulation.POOL_THRESHOLD", 200),
+        ):
+            alone = simulate(self.combatants, 500, seed=7, pair=(1, 0), workers=1)
+            pooled = simulate(self.combatants, 500, seed=7, pair=(1, 0), workers=2)
+
+        self.assertEqual(alone, pooled)
+        self.assertAlmostEqual(sum(s.first for s in alone.stats), 1.0)
+        self.assertEqual(alone.pair, (self.combatants[1], self.combatants[0]))
+
+    def test_runs_share_one_process_pool(self) -> None:
+        """Test that runs without a worker count reuse the process-wide pool."""
+        with (
+            mock.patch("initiative_tracker.simulation.CHUNK_SIZE", 100),
+            mock.patch("initiative_tracker.simulation.POOL_THRESHOLD", 200),
+            mock.patch("initiative_tracker.simulation._shared_pool", None),
+            mock.patch("os.cpu_count", return_value=2),
+            mock.patch.object(simulation, "_pool", wraps=simulation._pool) as pool,
+        ):
+            alone = simulate(self.combatants, 500, seed=7, workers=1)
+            first = simulate(self.combatants, 500, seed=7)
+            second = simulate(self.combatants, 500, seed=7)
+            assert simulation._shared_pool is not None
+            simulation._shared_pool.shutdown()
+
+        pool.assert_called_once_with()
+        self.assertEqual(first, alone)
+        self.assertEqual(second, alone)
+
+    def test_probabilities_follow_modifiers_and_advantage(self) -> None:
+        """Test that the better modifier and roll mode usually act first."""
+        progress: list[int] = []
+        result = simulate(
+            self.combatants, 5000, seed=1, pair=(0, 1), progress=progress.append
+        )
+
+        fighter, goblin = result.stats
+        self.assertGreater(fighter.first, 0.75)
+        self.assertEqual(result.ahead, fighter.first)
+        self.assertLess(fighter.mean_slot, goblin.mean_slot)
+        self.assertAlmostEqual(fighter.mean_slot + goblin.mean_slot, 3.0)
+        self.assertEqual(progress, [5000])
+
+    def test_ties_go_to_the_higher_modifier_then_the_earlier_combatant(
+        self,
+    ) -> None:
+        """Test that the ranked batches break ties like ``roll_initiative()``."""
+        twins = [Combatant("A", 0, "normal"), Combatant("B", 0, "normal")]
+        # The earlier twin also wins the 20 ties out of 400 dice pairs
+        first, _ = simulate(twins, 200_000, seed=1).stats
+        self.assertAlmostEqual(first.first, 210 / 400, delta=0.005)
+
+        rivals = [Combatant("A", 0, "normal"), Combatant("B", 1, "normal")]
+        # B wins unless A's die beats B's by two or more: 171 of 400 pairs
+        _, second = simulate(rivals, 200_000, seed=1).stats
+        self.assertAlmostEqual(second.first, 229 / 400, delta=0.005)
+
+    def test_form_requires_two_different_characters(self) -> None:
+        """Test that the compared pair is validated and mapped to indexes."""
+        characters = [self.fighter, self.goblin]
+        for first, second in [(self.fighter.pk, ""), (self.goblin.pk, self.goblin.pk)]:
+            form = SimulationForm(
+                {"trials": 10, "first": first, "second": second},
+                characters=characters,
+            )
+            self.assertFalse(form.is_valid())
+
+        form = SimulationForm(
+            {"trials": 10, "first": self.goblin.pk, "second": self.fighter.pk},
+            characters=characters,
+        )
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.pair, (1, 0))
+
+    def test_panel_links_the_submitted_simulation_to_its_stream(self) -> None:
+        """Test that submitting the panel renders a progress bar on the stream."""
+        url = reverse("initiative_tracker:simulate", args=[self.encounter.pk])
+        response = self.client.get(url, HTTP_HX_REQUEST="true")
+        self.assertContains(response, 'id="simulation-panel"')
+        self.assertNotContains(response, "data-simulation-url")
+
+        response = self.client.get(
+            url, {"trials": 200, "seed": 3}, HTTP_HX_REQUEST="true"
+        )
+        stream_url = reverse(
+            "initiative_tracker:simulation_stream", args=[self.encounter.pk]
+        )
+        self.assertContains(response, f'data-simulation-url="{stream_url}?trials=200')
+
+    def test_stream_sends_the_result_under_wsgi(self) -> None:
+        """Test that the stream renders the simulation's result as an event."""
+        url = reverse("initiative_tracker:simulation_stream", args=[self.encounter.pk])
+        response = self.client.get(
+            url,
+            {
+                "trials": 200,
+                "seed": 3,
+                "first": self.fighter.pk,
+                "second": self.goblin.pk,
+            },
+        )
+
+        body = b"".join(response.streaming_content).decode()  # type: ignore[attr-defined]
+        self.assertTrue(body.startswith("event: result\n"))
+        self.assertIn("Fighter acts before Goblin in", body)
+        self.assertIn("Disadvantage", body)
+
+        response = self.client.get(url, {"trials": 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_prints_the_estimates(self) -> None:
+        """Test that the management command reports every character."""
+        out = io.StringIO()
+        call_command(
+            "simulate_encounter",
+            self.encounter.pk,
+            "--trials=300",
+            "--seed=2",
+            "--before",
+            "Goblin",
+            "Fighter",
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn("Fighter", output)
+        self.assertIn("disadvantage", output)
+        self.assertIn("Goblin acts before Fighter in", output)
+        with self.assertRaises(CommandError):
+            call_command("simulate_encounter", self.encounter.pk, "--before", "A", "B")
+
+
+class CompactionTest(TestCase):
+    """Test cases for compacting positions in one set-based UPDATE."""
+
+    def setUp(self) -> None:
+        """Set up an encounter with drifted positions, B acting."""
+        self.encounter = Encounter.objects.create(name="Drift", turn_index=1)
+        self.chars = [
+            Character.objects.create(
+                encounter=self.encounter, name=name, initiative=initiative, position=p
+            )
+            for name, initiative, p in (
+                ("A", 10, 0),
+                ("B", 15, 3),
+                ("C", 12, 3),
+                ("D", 8, 90_000),
+            )
+        ]
+
+    def _order(self) -> list[tuple[str, int]]:
+        """Return the names and positions in turn order."""
+        return list(self.encounter.turn_order().values_list("name", "position"))
+
+    def _log(self) -> None:
+        """Start the combat log, as the first tracker action would."""
+        checkpoint(self.encounter)
+        record(self.encounter, "add", map(history_row, self.chars))
+
+    def test_compact_positions_keeps_the_turn_order(self) -> None:
+        """Test that one UPDATE spreads positions and the cursor stays put."""
+        with self.assertNumQueries(1):
+            moved = self.encounter.compact_positions()
+
+        self.assertEqual(moved, 4)
+        self.assertEqual(
+            self._order(),
+            [("A", RANK_GAP), ("B", 2 * RANK_GAP), ("C", 3 * RANK_GAP), ("D", 4096)],
+        )
+        _rows, current = self.encounter.tracker_rows()
+        assert current is not None
+        self.assertEqual(current["name"], "B")
+        self.assertEqual(self.encounter.compact_positions(), 0)
+
+    def test_crowded_nudge_compacts_and_undoes_in_one_step(self) -> None:
+        """Test that a nudge past POSITION_LIMIT compacts, logged with the nudge."""
+        self._log()
+        c, d = self.chars[2:]
+        Character.objects.filter(pk=d.pk).update(position=POSITION_LIMIT)
+
+        self.client.post(
+            reverse("initiative_tracker:reorder", args=[self.encounter.pk]),
+            {"action": "reorder_increase", "pk": c.pk},
+        )
+
+        self.assertEqual(
+            self._order(),
+            [("A", 1024), ("B", 2048), ("D", 3072), ("C", 4096)],
+        )
+        self.client.post(
+            reverse("initiative_tracker:history", args=[self.encounter.pk]),
+            {"action": "undo"},
+        )
+        self.assertEqual([p for _, p in self._order()], [0, 3, 3, 90_000])
+
+    def test_crowded_add_compacts(self) -> None:
+        """Test that adding a character past POSITION_LIMIT compacts too."""
+        self.client.post(
+            reverse("initiative_tracker:add_character", args=[self.encounter.pk]),
+            {"name": "E", "initiative": 1, "position": POSITION_LIMIT + 1},
+            HTTP_HX_REQUEST="true",
+        )
+
+        self.assertEqual(self._order()[-2:], [("D", 4 * RANK_GAP), ("E", 5 * RANK_GAP)])
+
+    def test_command_compacts_and_logs(self) -> None:
+        """Test that the command compacts every encounter and logs the change."""
+        self._log()
+        other = Encounter.objects.create(name="Tidy")
+        Character.objects.create(
+            encounter=other, name="Z", initiative=1, position=RANK_GAP
+        )
+        out = io.StringIO()
+
+        call_command("compact_positions", stdout=out)
+
+        self.assertIn("Compacted 4 characters in 1 encounters.", out.getvalue())
+        actions = self.encounter.events.values_list("action", flat=True)
+        self.assertEqual(actions.last(), "compact")
+        self.assertFalse(other.events.exists())
+        self.encounter.refresh_from_db()
+        restore(self.encounter, 1)
+        self.assertEqual([p for _, p in self._order()], [0, 3, 3, 90_000])
+        restore(self.encounter, 2)
+        self.assertEqual([p for _, p in self._order()], [1024, 2048, 3072, 4096])
+        with self.assertRaises(CommandError):
+            call_command("compact_positions", 999)
+
+
+class CombatLogTest(TestCase):
+    """Test cases for the combat log and undo, redo and rewind."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.fighter = Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative=18, position=1
+        )
+        self.goblin = Character.objects.create(
+            encounter=self.encounter, name="Goblin", initiative=12, position=2
+        )
+        self.history_url = reverse(
+            "initiative_tracker:history", args=[self.encounter.pk]
+        )
+
+    def _next_turn(self, times: int = 1) -> None:
+        """Take ``times`` turns through the tracker."""
+        url = reverse("initiative_tracker:next_turn", args=[self.encounter.pk])
+        for _ in range(times):
+            self.client.post(url, {"action": "next_turn"})
+
+    def _travel(self, action: str, **data: Any) -> Any:
+        """Post an undo, redo or rewind and return the response."""
+        return self.client.post(
+            self.history_url, {"action": action, **data}, HTTP_HX_REQUEST="true"
+        )
+
+    def test_failed_record_rolls_the_action_back(self) -> None:
+        """Test that an action is not kept without its combat log event."""
+        url = reverse(
+            "initiative_tracker:delete_character",
+            kwargs={"encounter_pk": self.encounter.pk, "pk": self.fighter.pk},
+        )
+        with (
+            mock.patch("initiative_tracker.views.record", side_effect=DatabaseError),
+            self.assertRaises(DatabaseError),
+        ):
+            self.client.post(url)
+
+        self.assertTrue(Character.objects.filter(pk=self.fighter.pk).exists())
+        self.assertFalse(CombatEvent.objects.filter(encounter=self.encounter).exists())
+
+    def test_undo_and_redo_a_delete(self) -> None:
+        """Test that an undone delete brings the character back as it was."""
+        self._next_turn()
+        self.client.post(
+            reverse(
+                "initiative_tracker:delete_character",
+                kwargs={"encounter_pk": self.encounter.pk, "pk": self.fighter.pk},
+            )
+        )
+        self.assertFalse(Character.objects.filter(pk=self.fighter.pk).exists())
+
+        response = self._travel("undo")
+
+        self.assertContains(response, "Fighter")
+        fighter = Character.objects.get(pk=self.fighter.pk)
+        self.assertEqual((fighter.initiative, fighter.position), (18, 1))
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.turn_index, 1)
+        self.assertTrue(self.encounter.can_redo)
+
+        self._travel("redo")
+        self.assertFalse(Character.objects.filter(pk=self.fighter.pk).exists())
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.history_head, 2)
+
+    def test_undo_rejects_stale_next_turn(self) -> None:
+        """Test that undoing a turn moves the cursor back and bumps the version."""
+        self._next_turn()
+        self.encounter.refresh_from_db()
+        stale_version = self.encounter.turn_version
+
+        self._travel("undo")
+
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.turn_index, 0)
+        self.assertFalse(self.encounter.can_undo)
+        self.assertFalse(self.encounter.advance_turn(stale_version))
+
+    def test_new_action_drops_the_undone_events(self) -> None:
+        """Test that recording after an undo discards the redo branch."""
+        self._next_turn(2)
+        self._travel("undo")
+        self._travel("undo")
+        self._next_turn()
+
+        self.encounter.refresh_from_db()
+        self.assertEqual(
+            (self.encounter.history_head, self.encounter.history_size), (1, 1)
+        )
+        self.assertEqual(self.encounter.events.count(), 1)
+        self.assertFalse(self.encounter.can_redo)
+
+    def test_restore_cost_does_not_grow_with_the_log(self) -> None:
+        """Test that undo replays from the nearest snapshot, never the whole log."""
+        self._next_turn(12)
+        self.encounter.refresh_from_db()
+        with CaptureQueriesContext(connection) as short_log:
+            self.assertTrue(restore(self.encounter, self.encounter.history_head - 1))
+
+        self._next_turn(SNAPSHOT_INTERVAL * 3)
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.snapshots.count(), 4)
+        with CaptureQueriesContext(connection) as long_log:
+            self.assertTrue(restore(self.encounter, self.encounter.history_head - 1))
+
+        self.assertEqual(len(long_log), len(short_log))
+        replayed = next(q["sql"] for q in long_log if "combatevent" in q["sql"])
+        self.assertIn(f'"sequence" > {SNAPSHOT_INTERVAL * 3}', replayed)
+
+    def test_rewind_to_a_round(self) -> None:
+        """Test that rewinding restores the state when the round began."""
+        self._next_turn(2)
+        self.client.post(
+            reverse("initiative_tracker:reorder", args=[self.encounter.pk]),
+            {"action": "reorder_increase", "pk": self.fighter.pk},
+        )
+        self._next_turn(2)
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.round_number, 3)
+
+        self._travel("rewind", round=2)
+
+        self.encounter.refresh_from_db()
+        self.assertEqual(
+            (self.encounter.round_number, self.encounter.turn_index), (2, 0)
+        )
+        self.fighter.refresh_from_db()
+        self.assertEqual(self.fighter.position, 1)
+
+    def test_nothing_to_undo(self) -> None:
+        """Test that undo and an unknown round leave the encounter alone."""
+        for action, data in [("undo", {}), ("redo", {}), ("rewind", {"round": 9})]:
+            response = self._travel(action, **data)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [m.message for m in get_messages(response.wsgi_request)][-1],
+                "There is nothing to restore.",
+            )
+        self.assertFalse(self.encounter.events.exists())
+
+
+class ExportTest(TestCase):
+    """Test cases for the streaming CSV and JSON Lines exports."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.other = Encounter.objects.create(name="Other Table")
+        Character.objects.create(
+            encounter=self.encounter, name="Goblin, Scout", initiative=12, position=2
+        )
+        Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative=18, position=1
+        )
+        Character.objects.create(encounter=self.other, name="Ogre")
+
+    def _download(self, url: str) -> str:
+        """Return the body of a streamed export."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()  # type: ignore[attr-defined]
+
+    def test_exports_read_in_index_order(self) -> None:
+        """Test that no export sorts its rows before sending the first one."""
+        for kind in EXPORTS:
+            with self.subTest(kind=kind):
+                self.assertNotIn("TEMP B-TREE", export_rows(kind).explain())
+
+    def test_characters_csv_in_turn_order(self) -> None:
+        """Test that an encounter's characters export as CSV in turn order."""
+        url = reverse(
+            "initiative_tracker:encounter_export",
+            args=[self.encounter.pk, "characters", "csv"],
+        )
+        response = self.client.get(url)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn(
+            f'filename="encounter-{self.encounter.pk}-characters.csv"',
+            response["Content-Disposition"],
+        )
+
+        rows = list(csv.reader(io.StringIO(self._download(url))))
+
+        self.assertEqual(rows[0][:3], ["id", "encounter_id", "name"])
+        self.assertEqual([row[2] for row in rows[1:]], ["Fighter", "Goblin, Scout"])
+
+    def test_combat_log_json_lines(self) -> None:
+        """Test that the combat log exports one JSON object per event."""
+        self.client.post(
+            reverse("initiative_tracker:next_turn", args=[self.encounter.pk]),
+            {"action": "next_turn"},
+        )
+        url = reverse(
+            "initiative_tracker:encounter_export",
+            args=[self.encounter.pk, "events", "jsonl"],
+        )
+
+        events = [json.loads(line) for line in self._download(url).splitlines()]
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["action"], "next_turn")
+        self.assertEqual(events[0]["turn_index"], 1)
+        self.assertEqual(events[0]["rows"], [])
+
+    def test_rows_are_streamed_in_chunks(self) -> None:
+        """Test that rows are read through a cursor and sent in batches."""
+        with mock.patch("initiative_tracker.export.EXPORT_CHUNK_SIZE", 2):
+            chunks = list(export_lines("characters", "jsonl"))
+
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(chunks[0].count("\n"), 2)
+
+    async def test_asgi_export_streams_asynchronously(self) -> None:
+        """Test that ASGI requests get an async iterator, chunk by chunk."""
+        url = reverse(
+            "initiative_tracker:encounter_export",
+            args=[self.encounter.pk, "characters", "csv"],
+        )
+        response = await self.async_client.get(url)
+
+        self.assertTrue(response.is_async)  # type: ignore[attr-defined]
+        chunks = [c async for c in response.streaming_content]  # type: ignore[attr-defined]
+        self.assertEqual(b"".join(chunks).decode().count("\r\n"), 3)
+
+    def test_full_exports_are_for_staff(self) -> None:
+        """Test that exporting every encounter needs a staff user."""
+        url = reverse("initiative_tracker:export", args=["characters", "csv"])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        staff = User.objects.create_user("gm", password="secret", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(len(self._download(url).splitlines()), 4)
+        bogus = reverse("initiative_tracker:export", args=["users", "csv"])
+        self.assertEqual(self.client.get(bogus).status_code, 404)
+
+    def test_command_writes_the_export(self) -> None:
+        """Test that the management command streams an export to stdout."""
+        out = io.StringIO()
+        call_command(
+            "export_tracker",
+            "encounters",
+            "--format=jsonl",
+            f"--encounter={self.other.pk}",
+            stdout=out,
+        )
+
+        self.assertEqual(json.loads(out.getvalue())["name"], "Other Table")
+        with self.assertRaises(CommandError):
+            call_command("export_tracker", "characters", "--encounter=999")
+
+
+class StatBlockLibraryTest(TestCase):
+    """Test cases for searching the stat-block library and adding copies."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.archer = StatBlock.objects.create(
+            name="Goblin Archer", initiative_modifier=2, tags="goblinoid"
+        )
+        self.boss = StatBlock.objects.create(
+            name="Goblin Boss",
+            initiative_modifier=1,
+            roll_mode=RollMode.ADVANTAGE,
+            tags="goblinoid leader",
+        )
+        StatBlock.objects.create(name="Ogre", tags="giant")
+        self.url = reverse("initiative_tracker:library", args=[self.encounter.pk])
+
+    def _names(self, query: str) -> list[str]:
+        """Return the names of the stat blocks found for ``query``."""
+        return sorted(block.name for block in search_stat_blocks(query))
+
+    def test_search_by_word_prefix(self) -> None:
+        """Test that every word of the query matches the start of a word."""
+        self.assertEqual(self._names("gob"), ["Goblin Archer", "Goblin Boss"])
+        self.assertEqual(self._names("gob arch"), ["Goblin Archer"])
+        self.assertEqual(self._names("lead"), ["Goblin Boss"])
+        self.assertEqual(self._names("blin"), [])
+
+    def test_fallback_matches_like_the_index(self) -> None:
+        """Test that databases without FTS5 find the same word prefixes."""
+        queries = ["gob", "gob arch", "lead", "blin", "oid", "GIANT", "g"]
+        indexed = {query: self._names(query) for query in queries}
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            for query in queries:
+                with self.subTest(query):
+                    self.assertEqual(self._names(query), indexed[query])
+
+    def test_short_and_hostile_queries(self) -> None:
+        """Test that one-letter words and FTS syntax are not searched."""
+        self.assertEqual(self._names("g"), [])
+        self.assertEqual(self._names('ogre" *'), ["Ogre"])
+        self.assertEqual(match_expression('ogre" NEAR(*'), '"ogre"* "NEAR"*')
+
+    def test_index_follows_updates_and_deletes(self) -> None:
+        """Test that the search index is kept in sync by its triggers."""
+        StatBlock.objects.filter(pk=self.archer.pk).update(
+            name="Kobold Archer", tags="kobold"
+        )
+        self.boss.delete()
+
+        self.assertEqual(self._names("gob"), [])
+        self.assertEqual(self._names("kob"), ["Kobold Archer"])
+
+    def test_search_renders_only_the_results(self) -> None:
+        """Test that typing in the search box swaps in just the results."""
+        response = self.client.get(
+            self.url,
+            {"q": "ogre"},
+            HTTP_HX_REQUEST="true",
+            HTTP_HX_TARGET="library-results",
+        )
+
+        self.assertContains(response, "Ogre")
+        self.assertNotContains(response, "Goblin")
+        self.assertNotContains(response, 'id="library-panel"')
+
+    def test_add_copies_rolls_each_one(self) -> None:
+        """Test that copies are numbered, rolled and recorded for undo."""
+        response = self.client.post(
+            reverse("initiative_tracker:add_copies", args=[self.encounter.pk]),
+            {"action": "add_copies", "stat_block": self.boss.pk, "copies": 3},
+        )
+
+        self.assertEqual(response.status_code, 302)
+        copies = list(self.encounter.characters.order_by("name"))
+        self.assertEqual(
+            [c.name for c in copies],
+            ["Goblin Boss 1", "Goblin Boss 2", "Goblin Boss 3"],
+        )
+        for copy in copies:
+            self.assertEqual(copy.roll_mode, RollMode.ADVANTAGE)
+            self.assertEqual(copy.initiative_modifier, 1)
+            self.assertIn(copy.initiative, range(2, 22))
+        self.assertEqual(self.encounter.events.get().action, "add_copies")
+
+    def test_add_copies_rejects_bad_counts(self) -> None:
+        """Test that the number of copies is validated."""
+        response = self.client.post(
+            reverse("initiative_tracker:add_copies", args=[self.encounter.pk]),
+            {"action": "add_copies", "stat_block": self.boss.pk, "copies": 0},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.encounter.characters.exists())
+
+    def test_import_command(self) -> None:
+        """Test that stat blocks are imported from CSV and indexed."""
+        path = self._write(
+            "library.csv",
+            "name,initiative_modifier,roll_mode,hit_points,tags\n"
+            "Hobgoblin Captain,2,advantage,39,goblinoid\n",
+        )
+        call_command("import_stat_blocks", str(path), stdout=io.StringIO())
+
+        captain = StatBlock.objects.get(name="Hobgoblin Captain")
+        self.assertEqual(captain.hit_points, 39)
+        self.assertEqual(self._names("hob"), ["Hobgoblin Captain"])
+
+    def test_import_command_reports_bad_rows(self) -> None:
+        """Test that an invalid row stops the import with its number."""
+        path = self._write("library.jsonl", '{"name": "Imp", "roll_mode": "lucky"}\n')
+
+        with self.assertRaisesMessage(CommandError, "Row 1: roll_mode"):
+            call_command("import_stat_blocks", str(path), stdout=io.StringIO())
+
+    def _write(self, name: str, content: str) -> Any:
+        """Write ``content`` to a temporary file called ``name``."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = pathlib.Path(directory.name) / name
+        path.write_text(content, encoding="utf-8")
+        return path
+
+
+class AdminScalingTest(TestCase):
+    """Test cases for the keyset-paginated admin and its set-based actions."""
+
+    def setUp(self) -> None:
+        """Set up two encounters and log in a superuser."""
+        self.first = Encounter.objects.create(name="Cave", turn_index=2, round_number=3)
+        self.second = Encounter.objects.create(name="Bridge")
+        Character.objects.bulk_create(
+            [
+                Character(
+                    encounter=encounter,
+                    name=f"{prefix} {i}",
+                    initiative=i,
+                    position=5,
+                    roll_mode=RollMode.ADVANTAGE if i % 2 else RollMode.NORMAL,
+                )
+                for encounter, prefix in ((self.first, "Goblin"), (self.second, "Orc"))
+                for i in range(30)
+            ]
+        )
+        self.client.force_login(
+            User.objects.create_superuser("admin", password="secret")
+        )
+        self.changelist = reverse("admin:initiative_tracker_character_changelist")
+        self.encounters = reverse("admin:initiative_tracker_encounter_changelist")
+
+    def _page(self, url: str) -> Any:
+        """Fetch a changelist page."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_pages_follow_the_cursor(self) -> None:
+        """Test that the next links walk every character once, in turn order."""
+        url = self.changelist
+        names: list[str] = []
+        per_page = mock.patch.object(CharacterAdmin, "list_per_page", 25)
+        per_page.start()
+        self.addCleanup(per_page.stop)
+        page_queries = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                cl = self._page(url).context["cl"]
+            page_queries.append(len(queries))
+            names.extend(c.name for c in cl.result_list)
+            url = cl.next_url and self.changelist + cl.next_url
+        expected = list(
+            Character.objects.order_by(
+                "encounter_id", "position", "-initiative", "pk"
+            ).values_list("name", flat=True)
+        )
+        self.assertEqual(names, expected)
+
+        self.assertEqual(len(names), 60)
+        # Full pages cost the same wherever they are; the short last page
+        # does not look past its end
+        self.assertEqual(page_queries[0], page_queries[1])
+        self.assertEqual(page_queries[2], page_queries[0] - 1)
+        cl = self._page(f"{self.changelist}?cursor=999_0_0_0").context["cl"]
+        self.assertEqual(list(cl.result_list), [])
+
+    def test_list_editable_saves_the_page(self) -> None:
+        """Test that initiative and position are edited inline on a keyset page."""
+        url = f"{self.changelist}?encounter={self.second.pk}"
+        formset = self._page(url).context["cl"].formset
+        self.assertEqual(len(formset.forms), 30)
+        orc = Character.objects.get(name="Orc 3")
+
+        response = self.client.post(
+            url,
+            {
+                "form-TOTAL_FORMS": 1,
+                "form-INITIAL_FORMS": 1,
+                "form-0-id": orc.pk,
+                "form-0-initiative": 17,
+                "form-0-position": 9,
+                "_save": "Save",
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        orc.refresh_from_db()
+        self.assertEqual((orc.initiative, orc.position), (17, 9))
+
+    def test_count_is_estimated_and_capped(self) -> None:
+        """Test that the total is estimated and filtered counts are exact."""
+        response = self._page(self.changelist)
+        self.assertTrue(response.context["cl"].count_estimated)
+        self.assertContains(response, "About 60 Characters")
+        self.assertNotContains(response, "SELECT COUNT")
+
+        response = self._page(f"{self.changelist}?encounter={self.second.pk}")
+        self.assertEqual(response.context["cl"].result_count, 30)
+        self.assertContains(response, "30 Characters")
+        with mock.patch("initiative_tracker.admin.COUNT_LIMIT", 10):
+            response = self._page(f"{self.changelist}?q=gob")
+        self.assertContains(response, "10+ Characters")
+
+    def test_bad_cursor_is_rejected(self) -> None:
+        """Test that a malformed cursor falls back like a bad lookup."""
+        response = self.client.get(f"{self.changelist}?cursor=oops")
+        self.assertRedirects(response, f"{self.changelist}?e=1")
+
+    def test_name_search_matches_prefixes(self) -> None:
+        """Test that the search finds names by prefix, ignoring case."""
+        cl = self._page(f"{self.changelist}?q=%22orc+1%22").context["cl"]
+        self.assertEqual(
+            sorted(c.name for c in cl.result_list),
+            ["Orc 1"] + [f"Orc {i}" for i in range(10, 20)],
+        )
+        cl = self._page(f"{self.changelist}?q=GOB").context["cl"]
+        self.assertTrue(cl.result_list)
+        self.assertFalse(
+            self._page(f"{self.changelist}?q=blin").context["cl"].result_list
+        )
+
+    def _act(self, action: str, *encounters: Encounter) -> Any:
+        """Run an admin action on ``encounters``."""
+        return self.client.post(
+            self.encounters,
+            {
+                "action": action,
+                "_selected_action": [e.pk for e in encounters],
+            },
+            follow=True,
+        )
+
+    def test_compact_positions(self) -> None:
+        """Test that compacting spaces positions and keeps the turn order."""
+        before = list(self.first.characters.order_by(*TURN_ORDER))
+        with CaptureQueriesContext(connection) as queries:
+            response = self._act("compact_positions", self.first)
+        self.assertContains(response, "Compacted the positions of 30 characters.")
+        self.assertEqual(sum("UPDATE" in q["sql"] for q in queries.captured_queries), 1)
+        after = list(self.first.characters.order_by(*TURN_ORDER))
+        self.assertEqual(after, before)
+        self.assertEqual(
+            [c.position for c in after], [RANK_GAP * i for i in range(1, 31)]
+        )
+        self.assertEqual(
+            set(self.second.characters.values_list("position", flat=True)), {5}
+        )
+
+    def test_reroll_initiative(self) -> None:
+        """Test that the database rolls everyone and the encounters restart."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self._act("reroll_initiative", self.first, self.second)
+        self.assertContains(response, "Rolled initiative for 60 characters.")
+        self.assertEqual(sum("UPDATE" in q["sql"] for q in queries.captured_queries), 3)
+        for encounter in (self.first, self.second):
+            encounter.refresh_from_db()
+            self.assertEqual((encounter.turn_index, encounter.round_number), (0, 1))
+            rolls = list(encounter.characters.order_by(*TURN_ORDER))
+            self.assertTrue(all(1 <= c.initiative <= 20 for c in rolls))
+            self.assertEqual(
+                [c.initiative for c in rolls],
+                sorted((c.initiative for c in rolls), reverse=True),
+            )
+            self.assertEqual(len({c.position for c in rolls}), 30)
+
+    def test_reroll_is_logged(self) -> None:
+        """Test that undoing the action after a reroll keeps the new rolls."""
+        next_turn = reverse("initiative_tracker:next_turn", args=[self.first.pk])
+        self.client.post(next_turn, {"action": "next_turn"})
+
+        self._act("reroll_initiative", self.first)
+        rolled = list(self.first.characters.values_list("pk", "initiative", "position"))
+        self.client.post(next_turn, {"action": "next_turn"})
+        self.client.post(
+            reverse("initiative_tracker:history", args=[self.first.pk]),
+            {"action": "undo"},
+        )
+
+        self.assertEqual(
+            [e.action for e in self.first.events.order_by("sequence")],
+            ["next_turn", "roll_initiative", "next_turn"],
+        )
+        self.assertEqual(
+            list(self.first.characters.values_list("pk", "initiative", "position")),
+            rolled,
+        )
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.turn_index, self.first.round_number), (0, 1))
+        self.assertFalse(self.second.events.exists())
+
+    def test_delete_with_characters(self) -> None:
+        """Test that deleting encounters takes their characters and log along."""
+        self.client.post(
+            reverse("initiative_tracker:next_turn", args=[self.first.pk]),
+            {"action": "next_turn"},
+        )
+        self.assertTrue(self.first.events.exists())
+        actions = self.client.get(self.encounters).context["action_form"]
+        self.assertNotIn(
+            "delete_selected", [name for name, _ in actions.fields["action"].choices]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self._act("delete_with_characters", self.first)
+        self.assertContains(response, "Deleted 1 encounter.")
+        deletes = [q["sql"] for q in queries.captured_queries if "DELETE" in q["sql"]]
+        self.assertEqual(len(deletes), 4)
+        self.assertFalse(Encounter.objects.filter(pk=self.first.pk).exists())
+        self.assertEqual(Character.objects.count(), 30)
+        self.assertFalse(CombatEvent.objects.exists())
+        self.assertFalse(CombatSnapshot.objects.exists())
+
+
+class TrackerViewTest(TestCase):
+    """Test cases for the tracker view."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.client = Client()
+        Character.objects.create(
+            encounter=self.encounter, name="Character 1", initiative=10, position=0
+        )
+        Character.objects.create(
+            encounter=self.encounter, name="Character 2", initiative=15, position=1
+        )
+
+    def test_tracker_view_displays_characters(self) -> None:
+        """Test that the tracker view displays all characters."""
+        response = self.client.get(
+            reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Character 1")
+        self.assertContains(response, "Character 2")
+
+    def test_tracker_shows_current_turn(self) -> None:
+        """Test that the tracker shows the current turn character."""
+        response = self.client.get(
+            reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+        )
+
+        # Should show current turn
+        self.assertContains(response, "Current Turn")
+
+    def test_action_routes_refuse_get(self) -> None:
+        """Test that routes which only take actions answer GET with 405."""
+        character = Character.objects.get(name="Character 1")
+        routes = [
+            ("next_turn", [self.encounter.pk], "POST"),
+            ("roll_initiative", [self.encounter.pk], "POST"),
+            ("reorder", [self.encounter.pk], "POST"),
+            ("history", [self.encounter.pk], "POST"),
+            ("add_copies", [self.encounter.pk], "POST"),
+            ("delete_character", [self.encounter.pk, character.pk], "POST, DELETE"),
+        ]
+        for name, args, allowed in routes:
+            with self.subTest(name):
+                response = self.client.get(
+                    reverse(f"initiative_tracker:{name}", args=args)
+                )
+                self.assertEqual(response.status_code, 405)
+                self.assertEqual(response["Allow"], allowed)
+        self.assertTrue(Character.objects.filter(pk=character.pk).exists())
+
+
+class EncounterListViewTest(TestCase):
+    """Test cases for listing and creating encounters."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.client = Client()
+        self.url = reverse("initiative_tracker:encounter_list")
+
+    def test_create_encounter_redirects_to_tracker(self) -> None:
+        """Test that creating an encounter opens its tracker."""
+        response = self.client.post(self.url, {"name": "Goblin Ambush"})
+
+        encounter = Encounter.objects.get()
+        self.assertEqual(encounter.name, "Goblin Ambush")
+        self.assertRedirects(response, encounter.get_absolute_url())
+
+    def test_create_encounter_rejects_blank_name(self) -> None:
+        """Test that a blank encounter name is rejected."""
+        response = self.client.post(self.url, {"name": "   "})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Encounter.objects.exists())
+
+    def test_list_shows_encounters(self) -> None:
+        """Test that the list shows existing encounters."""
+        Encounter.objects.create(name="Dragon Lair")
+        response = self.client.get(self.url)
+
+        self.assertContains(response, "Dragon Lair")
+
+
+class EncounterIsolationTest(TestCase):
+    """Test cases ensuring encounters never see each other's characters."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.client = Client()
+        self.encounter = Encounter.objects.create(name="Table One")
+        self.other = Encounter.objects.create(name="Table Two")
+        self.char = Character.objects.create(
+            encounter=self.encounter, name="Goblin Scout", initiative=12, position=0
+        )
+        self.other_char = Character.objects.create(
+            encounter=self.other, name="Owlbear", initiative=9, position=0
+        )
+
+    def test_tracker_only_shows_own_characters(self) -> None:
+        """Test that a tracker lists only its encounter's characters."""
+        response = self.client.get(
+            reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+        )
+
+        self.assertContains(response, "Goblin Scout")
+        self.assertNotContains(response, "Owlbear")
+
+    def test_cannot_delete_character_of_other_encounter(self) -> None:
+        """Test that characters are only reachable through their encounter."""
+        delete_url = reverse(
+            "initiative_tracker:delete_character",
+            kwargs={"encounter_pk": self.encounter.pk, "pk": self.other_char.pk},
+        )
+        response = self.client.post(delete_url)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Character.objects.filter(pk=self.other_char.pk).exists())
+
+    def test_add_character_joins_encounter(self) -> None:
+        """Test that added characters belong to the encounter in the URL."""
+        self.client.post(
+            reverse("initiative_tracker:add_character", args=[self.other.pk]),
+            {"action": "add", "name": "Kobold", "initiative": 5, "position": 1},
+        )
+
+        self.assertEqual(Character.objects.get(name="Kobold").encounter, self.other)
+
+    def test_unknown_encounter_returns_404(self) -> None:
+        """Test that an unknown encounter id returns 404."""
+        response = self.client.get(reverse("initiative_tracker:tracker", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class RecordingBroker(Broker):
+    """Broker remembering what was published; only English has listeners."""
+
+    def __init__(self) -> None:
+        """Start with an empty record."""
+        self.published: list[tuple[str, Message]] = []
+
+    def publish(self, channel: str, message: Message) -> None:
+        """Record the published message."""
+        self.published.append((channel, message))
+
+    def has_subscribers(self, channel: str) -> bool:
+        """Pretend that only English viewers are connected."""
+        return channel.endswith(".en")
+
+
+class InProcessBrokerTest(TestCase):
+    """Test cases for the in-process broker."""
+
+    async def test_subscriber_receives_published_messages(self) -> None:
+        """Test that messages reach subscribers of their channel only."""
+        broker = InProcessBroker()
+        stream = broker.subscribe("tracker.1.en")
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+
+        self.assertTrue(broker.has_subscribers("tracker.1.en"))
+        broker.publish("tracker.2.en", Message("tracker", "other"))
+        broker.publish("tracker.1.en", Message("tracker", "mine"))
+
+        self.assertEqual(await pending, Message("tracker", "mine"))
+        await stream.aclose()
+        self.assertFalse(broker.has_subscribers("tracker.1.en"))
+
+    async def test_keepalive_yields_none(self) -> None:
+        """Test that an idle subscription yields ``None`` as a keepalive."""
+        broker = InProcessBroker()
+        stream = broker.subscribe("tracker.1.en", keepalive=0.01)
+
+        self.assertIsNone(await anext(stream))
+        await stream.aclose()
+
+
+@override_settings(TRACKER_BROKER="initiative_tracker.tests.RecordingBroker")
+class LiveUpdatesTest(TestCase):
+    """Test cases for pushing tracker updates to viewers."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative=18, position=0
+        )
+        Character.objects.create(
+            encounter=self.encounter, name="Rogue", initiative=14, position=0
+        )
+
+    def test_mutation_publishes_one_render_per_listening_language(self) -> None:
+        """Test that a mutation is rendered once for the listening viewers."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("initiative_tracker:next_turn", args=[self.encounter.pk]),
+                {"action": "next_turn"},
+            )
+
+        published = get_broker().published  # type: ignore[attr-defined]
+        self.assertEqual(len(published), 1)
+        channel, message = published[0]
+        self.assertEqual(channel, tracker_channel(self.encounter.pk, "en"))
+        self.assertIn("Current Turn", message.data)
+        self.assertIn("Rogue", message.data)
+        self.assertNotIn("csrfmiddlewaretoken", message.data)
+
+    def test_watch_page_renders_read_only_tracker(self) -> None:
+        """Test that the player view shows the tracker without controls."""
+        response = self.client.get(
+            reverse("initiative_tracker:watch", args=[self.encounter.pk])
+        )
+
+        self.assertContains(response, "Fighter")
+        self.assertNotContains(response, "Next Turn")
+
+    def test_stream_under_wsgi_sends_current_state(self) -> None:
+        """Test that WSGI clients get the current state and a retry hint."""
+        response = self.client.get(
+            reverse("initiative_tracker:tracker_stream", args=[self.encounter.pk])
+        )
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join(response.streaming_content).decode()  # type: ignore[attr-defined]
+        self.assertIn("retry: ", body)
+        self.assertIn("event: tracker", body)
+        self.assertIn("data: ", body)
+
+    @override_settings(TRACKER_BROKER="initiative_tracker.broker.InProcessBroker")
+    async def test_stream_under_asgi_relays_published_messages(self) -> None:
+        """Test that ASGI clients receive messages published after connecting."""
+        response = await self.async_client.get(
+            reverse("initiative_tracker:tracker_stream", args=[self.encounter.pk])
+        )
+        stream = aiter(response.streaming_content)  # type: ignore[attr-defined]
+        self.assertTrue((await anext(stream)).startswith(b"retry: "))
+
+        channel = tracker_channel(self.encounter.pk, "en")
+        pending = asyncio.ensure_future(anext(stream))
+        while not get_broker().has_subscribers(channel):
+            await asyncio.sleep(0)
+        get_broker().publish(channel, Message("tracker", "<p>Round 2</p>"))
+
+        self.assertEqual(await pending, b"event: tracker\ndata: <p>Round 2</p>\n\n")
+        await stream.aclose()
+
+
+class RenderCacheTest(TestCase):
+    """Test cases for the versioned cache of the tracker fragment."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.fighter = Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative=18, position=0
+        )
+        Character.objects.create(
+            encounter=self.encounter, name="Rogue", initiative=14, position=0
+        )
+        self.url = reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+
+    def _get(self, **extra: Any) -> Any:
+        """Fetch the tracker partial."""
+        return self.client.get(self.url, HTTP_HX_REQUEST="true", **extra)
+
+    def test_warm_partial_needs_no_queries(self) -> None:
+        """Test that a repeated HTMX refresh is served without the database."""
+        self._get()
+
+        with self.assertNumQueries(0):
+            response = self._get()
+
+        self.assertContains(response, "Fighter")
+
+    def test_warm_full_page_only_loads_the_encounter(self) -> None:
+        """Test that a repeated full page load skips the character SELECT."""
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertContains(response, "Rogue")
+        self.assertContains(response, "Test Encounter")
+
+    def test_cached_fragment_gets_the_requesting_users_csrf_token(self) -> None:
+        """Test that the shared fragment is filled with each user's token."""
+        self._get()
+        other = Client(enforce_csrf_checks=True)
+
+        response = other.get(self.url, HTTP_HX_REQUEST="true")
+
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        token = response.cookies["csrftoken"].value
+        next_turn = other.post(
+            reverse("initiative_tracker:next_turn", args=[self.encounter.pk]),
+            {"action": "next_turn"},
+            HTTP_X_CSRFTOKEN=token,
+        )
+        self.assertEqual(next_turn.status_code, 302)
+
+    def test_cache_is_per_language(self) -> None:
+        """Test that each language gets its own rendering."""
+        self._get()
+
+        with translation.override("de"):
+            url = reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+            response = self.client.get(url, HTTP_HX_REQUEST="true")
+
+        self.assertContains(response, "Aktueller Zug")
+
+    def test_write_paths_invalidate_the_cache(self) -> None:
+        """Test that every TrackerView mutation is visible on the next read."""
+        tracker = "initiative_tracker:"
+        pk = self.encounter.pk
+        mutations = [
+            (reverse(tracker + "next_turn", args=[pk]), {"action": "next_turn"}),
+            (
+                reverse(tracker + "reorder", args=[pk]),
+                {"action": "reorder_increase", "pk": self.fighter.pk},
+            ),
+            (
+                reverse(tracker + "add_character", args=[pk]),
+                {"name": "Wizard", "initiative": 12, "position": 0},
+            ),
+            (
+                reverse(tracker + "delete_character", args=[pk, self.fighter.pk]),
+                {},
+            ),
+        ]
+        for url, data in mutations:
+            with self.subTest(url=url):
+                before = self._get().content
+                self.client.post(url, data)
+                self.assertNotEqual(self._get().content, before)
+
+    def test_model_saves_invalidate_the_cache(self) -> None:
+        """Test that admin-style saves and deletes bump the version."""
+        self._get()
+
+        self.fighter.name = "Paladin"
+        self.fighter.save()
+
+        self.assertContains(self._get(), "Paladin")
+
+        self.encounter.delete()
+
+        self.assertEqual(self._get().status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    """Test cases for ETag based revalidation of the tracker."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative=18, position=0
+        )
+        self.url = reverse("initiative_tracker:tracker", args=[self.encounter.pk])
+
+    def _get(self, **extra: Any) -> Any:
+        """Fetch the tracker partial."""
+        return self.client.get(self.url, HTTP_HX_REQUEST="true", **extra)
+
+    def test_response_carries_validators(self) -> None:
+        """Test that the tracker is sent with an ETag and must be revalidated."""
+        response = self._get()
+
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("HX-Request", response["Vary"])
+
+    def test_matching_etag_gets_304_without_queries(self) -> None:
+        """Test that an unchanged tracker is answered with an empty 304."""
+        etag = self._get()["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_mutation_changes_etag(self) -> None:
+        """Test that a stale ETag gets the new state after a mutation."""
+        etag = self._get()["ETag"]
+        self.client.post(
+            reverse("initiative_tracker:next_turn", args=[self.encounter.pk]),
+            {"action": "next_turn"},
+            HTTP_HX_REQUEST="true",
+        )
+
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_depends_on_variant_language_and_theme(self) -> None:
+        """Test that partial, full page, language and theme differ."""
+        partial = self._get()["ETag"]
+        page = self.client.get(self.url)["ETag"]
+        with translation.override("de"):
+            german = self.client.get(
+                reverse("initiative_tracker:tracker", args=[self.encounter.pk]),
+                HTTP_HX_REQUEST="true",
+            )["ETag"]
+        self.client.post(reverse("core:toggle_theme"), {"theme": "dark"})
+        dark = self._get()["ETag"]
+
+        self.assertEqual(len({partial, page, german, dark}), 4)
+
+    def test_pending_messages_disable_revalidation(self) -> None:
+        """Test that a response showing messages is never answered with 304."""
+        etag = self.client.get(self.url)["ETag"]
+        self.client.post(
+            reverse("initiative_tracker:reorder", args=[self.encounter.pk]),
+            {"action": "reorder_increase", "pk": self.encounter.characters.get().pk},
+        )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertContains(response, "Position updated!")
+
+
+class RowUpdatesTest(TestCase):
+    """Test cases for patching single rows into the tracker with HTMX."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.fighter = Character.objects.create(
+            encounter=self.encounter, name="Fighter", initiative=18, position=0
+        )
+        self.rogue = Character.objects.create(
+            encounter=self.encounter, name="Rogue", initiative=14, position=0
+        )
+        Character.objects.bulk_create(
+            Character(encounter=self.encounter, name=f"Goblin {i}", position=i)
+            for i in range(1, 30)
+        )
+
+    def _post(self, name: str, data: dict[str, Any], *args: Any) -> Any:
+        """Post ``data`` to the named tracker URL as HTMX."""
+        return self.client.post(
+            reverse(f"initiative_tracker:{name}", args=[self.encounter.pk, *args]),
+            data,
+            HTTP_HX_REQUEST="true",
+        )
+
+    def test_next_turn_patches_banner_and_two_rows(self) -> None:
+        """Test that advancing only re-renders the rows losing and gaining focus."""
+        response = self._post("next_turn", {"action": "next_turn"})
+
+        content = response.content.decode()
+        self.assertEqual(response["HX-Reswap"], "none")
+        self.assertIn('id="turn-banner" hx-swap-oob="true"', content)
+        self.assertEqual(content.count("<tr "), 2)
+        self.assertIn(f'id="character-{self.fighter.pk}"', content)
+        self.assertIn(f'id="character-{self.rogue.pk}"', content)
+        self.assertNotIn("Goblin", content)
+
+    def test_add_inserts_row_before_its_successor(self) -> None:
+        """Test that a new character is inserted in front of the next one."""
+        response = self._post(
+            "add_character",
+            {"action": "add", "name": "Wizard", "initiative": 16, "position": 0},
+        )
+
+        content = response.content.decode()
+        self.assertIn(f'hx-swap-oob="beforebegin:#character-{self.rogue.pk}"', content)
+        self.assertIn("Wizard", content)
+        self.assertEqual(content.count("<tr "), 1)
+        self.assertIn('id="add-form" hx-swap-oob="innerHTML"', content)
+
+    def test_add_last_appends_row(self) -> None:
+        """Test that a character acting last is appended to the table."""
+        response = self._post(
+            "add_character",
+            {"action": "add", "name": "Sloth", "initiative": 1, "position": 99},
+        )
+
+        self.assertContains(response, 'hx-swap-oob="beforebegin:#rows-end"')
+
+    def test_reorder_moves_row(self) -> None:
+        """Test that a nudged row is removed and re-inserted at its new place."""
+        self.encounter.compact_positions()
+        response = self._post(
+            "reorder", {"action": "reorder_increase", "pk": self.fighter.pk}
+        )
+
+        content = response.content.decode()
+        self.assertIn(
+            f'<tr id="character-{self.fighter.pk}" hx-swap-oob="delete">', content
+        )
+        goblin = Character.objects.get(name="Goblin 1")
+        self.assertIn(f'beforebegin:#character-{goblin.pk}"', content)
+
+    def test_deleting_the_acting_character_highlights_the_next(self) -> None:
+        """Test that the new acting character's row gets the highlight."""
+        response = self._post("delete_character", {}, self.fighter.pk)
+
+        content = response.content.decode()
+        self.assertIn(
+            f'<tr id="character-{self.rogue.pk}" data-pk="{self.rogue.pk}" '
+            'draggable="true" class="table-active" hx-swap-oob="true">',
+            content,
+        )
+
+    def test_emptied_tracker_is_rendered_whole(self) -> None:
+        """Test that the table is re-rendered when its last row goes."""
+        encounter = Encounter.objects.create(name="Duel")
+        loner = Character.objects.create(encounter=encounter, name="Loner")
+
+        response = self.client.post(
+            reverse(
+                "initiative_tracker:delete_character", args=[encounter.pk, loner.pk]
+            ),
+            HTTP_HX_REQUEST="true",
+        )
+
+        self.assertNotIn("HX-Reswap", response)
+        self.assertContains(response, "No characters added yet!")
+
+
+class WindowedTrackerTest(TestCase):
+    """Test cases for rendering a window of rows and loading the rest in chunks."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Horde")
+        Character.objects.bulk_create(
+            Character(encounter=self.encounter, name=f"Orc {i}", position=i)
+            for i in range(2 * TRACKER_WINDOW + 20)
+        )
+        self.order = list(self.encounter.turn_order())
+
+    def _rows(self, content: bytes) -> list[int]:
+        """Return the ids of the character rows in ``content``, in order."""
+        return [
+            int(pk) for pk in re.findall(r'<tr id="character-(\d+)"', content.decode())
+        ]
+
+    def _chunk(self, direction: str, character: Character) -> Any:
+        """Fetch the chunk of rows ``direction`` (after/before) ``character``."""
+        key = f"{character.position}_{character.initiative}_{character.pk}"
+        return self.client.get(
+            reverse("initiative_tracker:tracker_rows", args=[self.encounter.pk]),
+            {direction: key},
+            HTTP_HX_REQUEST="true",
+        )
+
+    def _tracker(self) -> Any:
+        """Fetch the tracker fragment."""
+        return self.client.get(
+            self.encounter.get_absolute_url(), HTTP_HX_REQUEST="true"
+        )
+
+    def test_first_paint_renders_only_the_window(self) -> None:
+        """Test that the tracker renders the first rows and a sentinel."""
+        response = self._tracker()
+
+        pks = [c.pk for c in self.order[:TRACKER_WINDOW]]
+        self.assertEqual(self._rows(response.content), pks)
+        self.assertContains(response, 'id="rows-later"')
+        self.assertContains(response, 'hx-trigger="revealed"')
+        self.assertNotContains(response, 'id="rows-earlier"')
+        self.assertNotContains(response, 'id="rows-end"')
+
+    def test_window_starts_at_the_current_turn(self) -> None:
+        """Test that the rows before the acting character load on request."""
+        Encounter.objects.filter(pk=self.encounter.pk).update(turn_index=30)
+
+        response = self._tracker()
+
+        pks = [c.pk for c in self.order[30 : 30 + TRACKER_WINDOW]]
+        self.assertEqual(self._rows(response.content), pks)
+        self.assertContains(response, 'id="rows-earlier"')
+        self.assertContains(response, "Current Turn: Orc 30")
+
+    def test_window_near_the_end_is_filled_with_earlier_rows(self) -> None:
+        """Test that a window at the end of the order reaches back instead."""
+        Encounter.objects.filter(pk=self.encounter.pk).update(
+            turn_index=len(self.order) - 5
+        )
+
+        response = self._tracker()
+
+        pks = [c.pk for c in self.order[-TRACKER_WINDOW:]]
+        self.assertEqual(self._rows(response.content), pks)
+        self.assertContains(response, 'id="rows-earlier"')
+        self.assertContains(response, 'id="rows-end"')
+
+    def test_chunks_follow_the_turn_order(self) -> None:
+        """Test that chunks pick up right after the row they are keyed on."""
+        first = self._chunk("after", self.order[TRACKER_WINDOW - 1])
+        last = self._chunk("after", self.order[2 * TRACKER_WINDOW - 1])
+
+        pks = [c.pk for c in self.order[TRACKER_WINDOW : 2 * TRACKER_WINDOW]]
+        self.assertEqual(self._rows(first.content), pks)
+        self.assertContains(first, 'id="rows-later"')
+        pks = [c.pk for c in self.order[2 * TRACKER_WINDOW :]]
+        self.assertEqual(self._rows(last.content), pks)
+        self.assertNotContains(last, 'id="rows-later"')
+        self.assertContains(last, 'id="rows-end"')
+
+    def test_earlier_chunk_ends_before_its_row(self) -> None:
+        """Test that earlier rows come in turn order up to the keyed row."""
+        response = self._chunk("before", self.order[TRACKER_WINDOW + 10])
+
+        pks = [c.pk for c in self.order[10 : TRACKER_WINDOW + 10]]
+        self.assertEqual(self._rows(response.content), pks)
+        self.assertContains(response, 'id="rows-earlier"')
+        self.assertNotContains(response, 'id="rows-end"')
+
+    def test_chunk_reads_a_fixed_number_of_rows(self) -> None:
+        """Test that a chunk seeks the index instead of counting rows."""
+        with CaptureQueriesContext(connection) as queries:
+            self._chunk("after", self.order[-TRACKER_WINDOW - 1])
+
+        sql = next(q["sql"] for q in queries if "LIMIT 51" in q["sql"])
+        self.assertNotIn("OFFSET", sql)
+
+    def test_invalid_row_key_is_rejected(self) -> None:
+        """Test that a malformed cursor gets a 400."""
+        response = self.client.get(
+            reverse("initiative_tracker:tracker_rows", args=[self.encounter.pk]),
+            {"after": "1_2"},
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_spectators_see_every_row(self) -> None:
+        """Test that the read-only view is not windowed."""
+        response = self.client.get(
+            reverse("initiative_tracker:watch", args=[self.encounter.pk])
+        )
+
+        self.assertContains(response, f"Orc {len(self.order) - 1}")
+
+
+class AsyncTrackerTest(TestCase):
+    """Test cases for the asynchronous tracker view and model methods."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.encounter = Encounter.objects.create(name="Test Encounter")
+        self.chars = [
+            Character.objects.create(
+                encounter=self.encounter,
+                name=name,
+                initiative=10,
+                position=(index + 1) * RANK_GAP,
+            )
+            for index, name in enumerate(["A", "B", "C"])
+        ]
+
+    async def _order(self) -> list[str]:
+        """Return the encounter's character names in turn order."""
+        return [c.name async for c in self.encounter.turn_order()]
+
+    def test_view_is_async(self) -> None:
+        """Test that Django serves the tracker without the thread adapter."""
+        self.assertTrue(TrackerView.view_is_async)
+
+    async def test_async_client_round_trip(self) -> None:
+        """Test adding, advancing and reading through the ASGI handler."""
+        pk = self.encounter.pk
+        # A stored theme gives the client a session the page has to load
+        await self.async_client.post(reverse("core:toggle_theme"), {"theme": "dark"})
+
+        await self.async_client.post(
+            reverse("initiative_tracker:add_character", args=[pk]),
+            {"action": "add", "name": "Wizard", "initiative": 12, "position": 0},
+        )
+        await self.async_client.post(
+            reverse("initiative_tracker:next_turn", args=[pk]),
+            {"action": "next_turn"},
+        )
+        response = await self.async_client.get(
+            reverse("initiative_tracker:tracker", args=[pk])
+        )
+
+        self.assertContains(response, "Character added to initiative!")
+        self.assertContains(response, "Next up: A!")
+        self.assertContains(response, 'data-bs-theme="dark"')
+        self.assertEqual(await self._order(), ["Wizard", "A", "B", "C"])
+
+    async def test_aadvance_turn_wraps_into_next_round(self) -> None:
+        """Test that the async cursor update wraps like the sync one."""
+        for _ in range(3):
+            await self.encounter.aadvance_turn()
+
+        self.assertEqual(self.encounter.turn_index, 0)
+        self.assertEqual(self.encounter.round_number, 2)
+
+    async def test_amove_character_renumbers_without_gap(self) -> None:
+        """Test that the async move falls back to a renumbering."""
+        a, b, c = self.chars
+        b.position = RANK_GAP + 1
+        await b.asave(update_fields=["position"])
+
+        renumbered = await self.encounter.amove_character(c, after=a, before=b)
+
+        self.assertTrue(renumbered)
+        self.assertEqual(await self._order(), ["A", "C", "B"])
+
+    async def test_aset_order_keeps_current_turn(self) -> None:
+        """Test that the async full reorder keeps the acting character."""
+        a, b, c = self.chars
+        await self.encounter.aadvance_turn()  # B acts
+
+        self.assertTrue(await self.encounter.aset_order([c.pk, a.pk, b.pk]))
+
+        _rows, current = await self.encounter.atracker_rows()
+        assert current is not None
+        self.assertEqual(current["pk"], b.pk)
+
+
+class BenchmarkTest(TestCase):
+    """Test cases for the TrackerView benchmark suite."""
+
+    def test_every_case_runs_and_serializes(self) -> None:
+        """Test that each case is measured at each size and reported as JSON."""
+        results = run_benchmarks(sizes=[2, 5], repeat=1)
+
+        self.assertEqual(len(results), 2 * len(CASES))
+        report = json.loads(to_json(results))
+        self.assertIn("commit", report["environment"])
+        cached = [r for r in report["results"] if r["case"] == "get_htmx_cached"]
+        self.assertEqual([r["queries"] for r in cached], [0, 0])
+        self.assertTrue(all(r["peak_kib"] > 0 for r in report["results"]))
+
+    def test_compare_flags_more_queries_and_slower_cases(self) -> None:
+        """Test that regressions against a baseline report are listed."""
+        results = run_benchmarks(sizes=[2], repeat=1, cases=["next_turn"])
+        baseline = json.loads(to_json(results))
+        self.assertEqual(compare(results, baseline), [])
+
+        baseline["results"][0]["queries"] -= 1
+        baseline["results"][0]["wall_ms_median"] /= 10
+
+        regressions = compare(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("next_turn @ 2: "))
+
+
+class SerialLiveServerThread(LiveServerThread):
+    """
+    Live server answering one request at a time.
+
+    Its threads would share the in-memory test database's one connection,
+    which SQLite can't run two transactions on at once.
+    """
+
+    def _create_server(self, connections_override: Any = None) -> WSGIServer:
+        """Start a server without a thread per request."""
+        return WSGIServer(
+            (self.host, self.port), QuietWSGIRequestHandler, allow_reuse_address=False
+        )
+
+
+class LoadTestTest(LiveServerTestCase):
+    """Test cases for the concurrent soak harness."""
+
+    server_thread_class = SerialLiveServerThread
+
+    def test_virtual_tables_play_their_own_encounters(self) -> None:
+        """Test that each table opens an encounter and replays the mix."""
+        samples = run_load(
+            self.live_server_url,
+            tables=2,
+            actions=6,
+            seed_characters=2,
+            think_time=0,
+            seed=1,
+        )
+
+        self.assertEqual(Encounter.objects.count(), 2)
+        self.assertTrue(all(200 <= s.status < 400 for s in samples))
+        stats = summarize(samples, elapsed=1.0)
+        self.assertEqual(stats[-1].action, "all")
+        self.assertEqual(stats[-1].requests, len(samples))
+        self.assertEqual(stats[-1].errors, 0)
+
+    def test_percentile_and_mix_parsing(self) -> None:
+        """Test nearest-rank percentiles and validation of action mixes."""
+        latencies = [float(n) for n in range(1, 101)]
+        self.assertEqual(percentile(latencies, 0.5), 50.0)
+        self.assertEqual(percentile(latencies, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+        self.assertEqual(
+            mix_from_string("next_turn=3,add=1"), {"next_turn": 3, "add": 1}
+        )
+        with self.assertRaises(ValueError):
+            mix_from_string("fireball=1")
+        with self.assertRaises(ValueError):
+            mix_from_string("add=0")
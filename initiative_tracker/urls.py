@@ -9,16 +9,77 @@ from . import views
 app_name = "initiative_tracker"
 
 urlpatterns = [
-    # Main tracker view - displays all characters in initiative order
-    path("", views.TrackerView.as_view(), name="tracker"),
+    # List encounters and start new ones
+    path("", views.EncounterListView.as_view(), name="encounter_list"),
+    # Main tracker view - displays the encounter's characters in initiative order
+    path("<int:encounter_pk>/", views.TrackerView.as_view(), name="tracker"),
+    # Chunks of tracker rows before or after a row, loaded while scrolling
+    path("<int:encounter_pk>/rows/", views.TrackerView.as_view(), name="tracker_rows"),
+    # Read-only tracker for players, updated live
+    path("<int:encounter_pk>/watch/", views.TrackerView.as_view(), name="watch"),
+    # Server-Sent Events stream of tracker updates
+    path(
+        "<int:encounter_pk>/stream/",
+        views.TrackerStreamView.as_view(),
+        name="tracker_stream",
+    ),
     # Add new character to the initiative tracker
-    path("add/", views.TrackerView.as_view(), name="add_character"),
+    path("<int:encounter_pk>/add/", views.TrackerView.as_view(), name="add_character"),
+    # Add many characters at once from a pasted list, CSV or JSON
+    path(
+        "<int:encounter_pk>/bulk-add/",
+        views.TrackerView.as_view(),
+        name="bulk_add_characters",
+    ),
     # Cancel adding character
-    path("add/cancel/", views.TrackerView.as_view(), name="cancel_add_character"),
+    path(
+        "<int:encounter_pk>/add/cancel/",
+        views.TrackerView.as_view(),
+        name="cancel_add_character",
+    ),
     # Delete character from the initiative tracker
-    path("delete/<int:pk>/", views.TrackerView.as_view(), name="delete_character"),
+    path(
+        "<int:encounter_pk>/delete/<int:pk>/",
+        views.TrackerView.as_view(),
+        name="delete_character",
+    ),
     # Advance to the next character's turn
-    path("next-turn/", views.TrackerView.as_view(), name="next_turn"),
+    path(
+        "<int:encounter_pk>/next-turn/", views.TrackerView.as_view(), name="next_turn"
+    ),
+    # Roll initiative for every character of the encounter
+    path(
+        "<int:encounter_pk>/roll-initiative/",
+        views.TrackerView.as_view(),
+        name="roll_initiative",
+    ),
+    # Undo, redo or rewind actions through the combat log
+    path("<int:encounter_pk>/history/", views.TrackerView.as_view(), name="history"),
+    # Streaming CSV / JSON Lines exports, of one encounter or (staff) all of them
+    path(
+        "<int:encounter_pk>/export/<slug:kind>.<slug:fmt>",
+        views.ExportView.as_view(),
+        name="encounter_export",
+    ),
+    path("export/<slug:kind>.<slug:fmt>", views.ExportView.as_view(), name="export"),
+    # Search the stat-block library and add copies of a creature
+    path("<int:encounter_pk>/library/", views.LibraryView.as_view(), name="library"),
+    path(
+        "<int:encounter_pk>/library/copies/",
+        views.TrackerView.as_view(),
+        name="add_copies",
+    ),
+    # Monte Carlo estimate of the turn order, and its progress stream
+    path(
+        "<int:encounter_pk>/simulate/",
+        views.SimulationView.as_view(),
+        name="simulate",
+    ),
+    path(
+        "<int:encounter_pk>/simulate/stream/",
+        views.SimulationStreamView.as_view(),
+        name="simulation_stream",
+    ),
     # Reorder character position
-    path("reorder/", views.TrackerView.as_view(), name="reorder"),
+    path("<int:encounter_pk>/reorder/", views.TrackerView.as_view(), name="reorder"),
 ]
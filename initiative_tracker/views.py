@@ -2,17 +2,119 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict
+import asyncio
+import functools
+import hashlib
+from typing import Any, AsyncIterator, Callable, Dict, List, Sequence, TypeVar
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
-from django.db.models import Max
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
-from django.shortcuts import get_object_or_404, redirect, render
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseBase,
+    HttpResponseNotAllowed,
+    StreamingHttpResponse,
+)
+from django.middleware.csrf import get_token
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import translation
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
 from django.utils.translation import gettext as _
+from django.utils.translation import ngettext
 from django.views.generic import View
+from django_htmx.http import reswap
 
-from .forms import CharacterForm
-from .models import Character
+from core.context_processors import get_theme
+
+from .broker import Message, get_broker
+from .export import (
+    EXPORT_FORMATS,
+    EXPORTS,
+    aexport_lines,
+    export_filename,
+    export_lines,
+)
+from .forms import (
+    BulkCharacterForm,
+    CharacterForm,
+    EncounterForm,
+    SimulationForm,
+    StatBlockCopiesForm,
+)
+from .fragments import (
+    acached_tracker,
+    arender_tracker,
+    atracker_version,
+    with_csrf_token,
+)
+from .history import (
+    acheckpoint,
+    arestore,
+    arewind_point,
+    history_row,
+    record,
+)
+from .library import asearch_stat_blocks, stat_block_characters
+from .live import atracker_changed, format_event, render_live_tracker, tracker_channel
+from .models import (
+    POSITION_LIMIT,
+    TRACKER_FIELDS,
+    Character,
+    Encounter,
+    RollMode,
+    RowKey,
+    StatBlock,
+)
+from .simulation import SimulationResult, combatants_of, simulate
+
+T = TypeVar("T")
+
+
+class EncounterListView(View):
+    """
+    Entry point of the initiative tracker.
+
+    Lists the running encounters and lets a GM start a new one. Every
+    encounter gets its own tracker, so tables sharing a deployment never see
+    each other's combatants.
+    """
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        """Display the encounter list and the new encounter form."""
+        return self._render(request, EncounterForm())
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        """Create a new encounter and open its tracker."""
+        form = EncounterForm(request.POST)
+        if form.is_valid():
+            encounter = form.save()
+            messages.success(request, _("Encounter created!"))
+            return redirect(encounter)
+        return self._render(request, form)
+
+    def _render(self, request: HttpRequest, form: EncounterForm) -> HttpResponse:
+        """Render the encounter list page."""
+        encounters = Encounter.objects.annotate(character_count=Count("characters"))
+        context = {
+            "encounters": encounters,
+            "form": form,
+            "page_title": "Initiative Tracker",
+        }
+        return render(request, "initiative_tracker/encounter_list.html", context)
 
 
 class TrackerView(View):
@@ -21,130 +123,1003 @@ class TrackerView(View):
 
     Handles displaying the tracker, adding characters, deleting characters,
     advancing turns, and reordering positions. Supports both regular HTTP
-    requests and HTMX partial updates.
+    requests and HTMX partial updates. Every operation is scoped to the
+    encounter given in the URL.
+
+    The handlers are asynchronous and use the async ORM, so under ASGI idle or
+    slow clients wait on the event loop instead of occupying worker threads.
     """
 
-    def get(self, request: HttpRequest, pk: int | None = None) -> HttpResponse:
+    # POST actions dispatched on the ``action`` field alone
+    POST_ACTIONS = {
+        "next_turn",
+        "reorder_increase",
+        "reorder_decrease",
+        "move",
+        "set_order",
+        "roll_initiative",
+        "add_copies",
+        "undo",
+        "redo",
+        "rewind",
+    }
+
+    # Routes that answer GET; the others only take POST (or DELETE)
+    GET_ROUTES = {
+        "tracker",
+        "tracker_rows",
+        "watch",
+        "add_character",
+        "bulk_add_characters",
+        "cancel_add_character",
+    }
+
+    # Actions recorded in the encounter's combat log
+    RECORDED_ACTIONS = {
+        "add",
+        "bulk_add",
+        "delete",
+        "next_turn",
+        "reorder_increase",
+        "reorder_decrease",
+        "move",
+        "set_order",
+        "roll_initiative",
+        "add_copies",
+    }
+
+    async def get(
+        self, request: HttpRequest, encounter_pk: int, pk: int | None = None
+    ) -> HttpResponse:
         """Display tracker list or add character form."""
+        url_name = request.resolver_match.url_name  # type: ignore[union-attr]
+        # The other routes only take actions
+        if url_name not in self.GET_ROUTES:
+            allowed = ["POST", "DELETE"] if url_name == "delete_character" else ["POST"]
+            return HttpResponseNotAllowed(allowed)
+
+        await self._load_session(request)
+
+        # Display tracker, from the render cache until the next mutation
+        if url_name == "tracker":
+            return await self._show_tracker(request, encounter_pk)
+
+        encounter = await self._get_encounter(encounter_pk)
+
+        # Cancel add form
+        if url_name == "cancel_add_character":
+            return HttpResponse("")
+
+        # Show bulk add form
+        if url_name == "bulk_add_characters":
+            bulk_form = BulkCharacterForm()
+            context = {"form": bulk_form, "encounter": encounter}
+            if request.htmx:  # type: ignore[attr-defined]
+                return render(
+                    request, "initiative_tracker/_bulk_add_form.html", context
+                )
+            return render(request, "initiative_tracker/bulk_add.html", context)
+
         # Show add character form
-        if "add" in request.path:
-            form = CharacterForm(initial=self._get_initial_position())
+        if url_name == "add_character":
+            form = CharacterForm(initial=await self._get_initial_position(encounter))
+            context = {"form": form, "encounter": encounter}
             if request.htmx:  # type: ignore[attr-defined]
                 return render(
-                    request, "initiative_tracker/_add_character_form.html", {"form": form}
+                    request, "initiative_tracker/_add_character_form.html", context
                 )
-            return render(request, "initiative_tracker/add_character.html", {"form": form})
+            return render(request, "initiative_tracker/add_character.html", context)
 
-        # Cancel add form
-        if "cancel" in request.path:
-            return HttpResponse("")
+        # Next chunk of rows, loaded as the tracker scrolls
+        if url_name == "tracker_rows":
+            return await self._rows_chunk(request, encounter)
 
-        # Display tracker
-        context = self._build_context(request)
-        if request.htmx:  # type: ignore[attr-defined]
-            return render(request, "initiative_tracker/tracker_partial.html", context)
-        return render(request, "initiative_tracker/tracker.html", context)
+        # Read-only view for players (``watch``), kept current by the live stream
+        characters, current_turn = await encounter.atracker_rows()
+        context = {
+            "encounter": encounter,
+            "characters": characters,
+            "current_turn": current_turn,
+            "page_title": "Initiative Tracker",
+        }
+        return render(request, "initiative_tracker/watch.html", context)
 
-    def post(self, request: HttpRequest, pk: int | None = None) -> HttpResponse:
+    async def post(
+        self, request: HttpRequest, encounter_pk: int, pk: int | None = None
+    ) -> HttpResponse:
         """Handle different actions based on POST parameters or path."""
-        action = request.POST.get("action", "")
+        await self._load_session(request)
+        encounter = await self._get_encounter(encounter_pk)
+        action = self.request_action(request)
+        if action in self.RECORDED_ACTIONS:
+            await acheckpoint(encounter)
 
         # Delete character (from hx-post which becomes POST)
-        if pk is not None and "delete" in request.path:
-            return self._delete_character(request, pk)
+        if action == "delete" and pk is not None:
+            return await self._delete_character(request, encounter, pk)
+
+        # Bulk add characters
+        if action == "bulk_add":
+            return await self._bulk_add_characters(request, encounter)
 
         # Add character
-        if action == "add" or "add" in request.path:
-            return self._add_character(request)
+        if action == "add":
+            return await self._add_character(request, encounter)
 
         # Next turn
         if action == "next_turn":
-            return self._next_turn(request)
+            return await self._next_turn(request, encounter)
 
         # Reorder (increase position)
         if action == "reorder_increase":
-            return self._reorder(request, increase=True)
+            return await self._reorder(request, encounter, increase=True)
 
         # Reorder (decrease position)
         if action == "reorder_decrease":
-            return self._reorder(request, increase=False)
+            return await self._reorder(request, encounter, increase=False)
+
+        # Move a character between two neighbours (drag-and-drop)
+        if action == "move":
+            return await self._move(request, encounter)
+
+        # Apply a complete new turn order
+        if action == "set_order":
+            return await self._set_order(request, encounter)
+
+        # Roll initiative for every character at once
+        if action == "roll_initiative":
+            return await self._roll_initiative(request, encounter)
 
-        return redirect("initiative_tracker:tracker")
+        # Add copies of a stat block from the library
+        if action == "add_copies":
+            return await self._add_copies(request, encounter)
 
-    def delete(self, request: HttpRequest, pk: int) -> HttpResponse:
+        # Step back or forward through the combat log
+        if action in ("undo", "redo", "rewind"):
+            return await self._travel(request, encounter, action)
+
+        return redirect(encounter)
+
+    @classmethod
+    def request_action(cls, request: HttpRequest) -> str:
+        """
+        Name the action ``request`` performs, e.g. ``next_turn``.
+
+        POSTs are named after the handler they are dispatched to (empty when
+        none matches) and other requests after their route. The metrics
+        middleware labels requests with it.
+        """
+        match = request.resolver_match
+        url_name = match.url_name if match else ""
+        if request.method == "DELETE":
+            return "delete"
+        if request.method != "POST":
+            return url_name or ""
+
+        action = request.POST.get("action", "")
+        if url_name == "delete_character":
+            return "delete"
+        if action == "bulk_add" or "bulk-add" in request.path:
+            return "bulk_add"
+        if action == "add" or "add" in request.path:
+            return "add"
+        if action in cls.POST_ACTIONS:
+            return action
+        return ""
+
+    async def delete(
+        self, request: HttpRequest, encounter_pk: int, pk: int
+    ) -> HttpResponse:
         """Handle DELETE requests for character removal."""
-        return self._delete_character(request, pk)
+        await self._load_session(request)
+        encounter = await self._get_encounter(encounter_pk)
+        await acheckpoint(encounter)
+        return await self._delete_character(request, encounter, pk)
+
+    async def _show_tracker(
+        self, request: HttpRequest, encounter_pk: int
+    ) -> HttpResponse:
+        """
+        Display the tracker, rendering its fragment only after a mutation.
+
+        Between mutations HTMX refreshes are answered straight from the cache,
+        without touching the database or the template engine, and clients
+        holding the current version get a bodiless 304.
+        """
+        version = await atracker_version(encounter_pk)
+        etag = self._tracker_etag(request, version)
+        last_modified = version // 10**9
+        if etag is not None:
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if not_modified is not None:
+                return self._add_validators(not_modified, etag, last_modified)
 
-    def _add_character(self, request: HttpRequest) -> HttpResponse:
+        encounter: Encounter | None = None
+        key, html = await acached_tracker(encounter_pk, version)
+        if html is None:
+            encounter = await self._get_encounter(encounter_pk)
+            context = await self._build_context(request, encounter)
+            html = await arender_tracker(key, context)
+        tracker_html = with_csrf_token(request, html)
+
+        if request.htmx:  # type: ignore[attr-defined]
+            response = HttpResponse(tracker_html)
+        else:
+            context = {
+                "encounter": encounter or await self._get_encounter(encounter_pk),
+                "tracker_html": tracker_html,
+                "page_title": "Initiative Tracker",
+            }
+            response = render(request, "initiative_tracker/tracker.html", context)
+        return self._add_validators(response, etag, last_modified)
+
+    def _tracker_etag(self, request: HttpRequest, version: int) -> str | None:
+        """
+        Return the strong ETag of the tracker response for ``request``.
+
+        Besides the render version it covers everything else that shapes the
+        bytes: language, theme, partial or full page, and the CSRF secret the
+        embedded tokens are derived from. Full pages showing pending messages
+        are one-offs and get no ETag.
+        """
+        htmx = request.htmx  # type: ignore[attr-defined]
+        if not htmx and len(messages.get_messages(request)):
+            return None
+        get_token(request)  # Make sure the CSRF secret exists
+        parts = (
+            str(version),
+            translation.get_language(),
+            get_theme(request),
+            "partial" if htmx else "page",
+            request.META["CSRF_COOKIE"],
+        )
+        return quote_etag(hashlib.sha256("|".join(parts).encode()).hexdigest()[:32])
+
+    def _add_validators(
+        self, response: HttpResponse, etag: str | None, last_modified: int
+    ) -> HttpResponse:
+        """Make clients revalidate the tracker on every load."""
+        if etag is not None:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["HX-Request"])
+        return response
+
+    async def _add_character(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
         """Create a new character."""
         form = CharacterForm(request.POST)
         if form.is_valid():
-            form.save()
+            previous_turn = await self._turn_before_change(request, encounter)
+            form.instance.encounter = encounter
+
+            def add() -> List[Dict[str, Any]]:
+                encounter.make_room([form.instance])
+                form.instance.save()
+                compacted = self._compact_if_crowded(encounter, [form.instance])
+                record(encounter, "add", [history_row(form.instance), *compacted])
+                return compacted
+
+            compacted = await self._logged(add)
+            if compacted:
+                previous_turn = None
+            await atracker_changed(encounter)
             messages.success(request, _("Character added to initiative!"))
             if request.htmx:  # type: ignore[attr-defined]
-                context = self._build_context(request)
-                return render(request, "initiative_tracker/add_character_success.html", context)
-            return redirect("initiative_tracker:tracker")
+                return await self._update_rows(
+                    request,
+                    encounter,
+                    previous_turn,
+                    inserted=[form.instance],
+                    template="initiative_tracker/add_character_success.html",
+                )
+            return redirect(encounter)
 
+        context = {"form": form, "encounter": encounter}
         if request.htmx:  # type: ignore[attr-defined]
-            return render(request, "initiative_tracker/_add_character_form.html", {"form": form})
-        return render(request, "initiative_tracker/add_character.html", {"form": form})
+            return render(
+                request, "initiative_tracker/_add_character_form.html", context
+            )
+        return render(request, "initiative_tracker/add_character.html", context)
 
-    def _delete_character(self, request: HttpRequest, pk: int) -> HttpResponse:
+    async def _bulk_add_characters(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
+        """Create many characters with a single INSERT."""
+        start = (await self._get_initial_position(encounter))["position"]
+        form = BulkCharacterForm(request.POST, start_position=start)
+        if form.is_valid():
+            characters = form.characters
+            for character in characters:
+                character.encounter = encounter
+            await self._logged(self._insert, encounter, "bulk_add", characters)
+            await atracker_changed(encounter)
+            messages.success(
+                request,
+                ngettext(
+                    "%(count)d character added to initiative!",
+                    "%(count)d characters added to initiative!",
+                    len(characters),
+                )
+                % {"count": len(characters)},
+            )
+            if request.htmx:  # type: ignore[attr-defined]
+                context = await self._build_context(request, encounter)
+                return render(
+                    request, "initiative_tracker/add_character_success.html", context
+                )
+            return redirect(encounter)
+
+        context = {"form": form, "encounter": encounter}
+        if request.htmx:  # type: ignore[attr-defined]
+            return render(request, "initiative_tracker/_bulk_add_form.html", context)
+        return render(request, "initiative_tracker/bulk_add.html", context)
+
+    async def _add_copies(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
+        """Add copies of a library stat block, each rolling its own initiative."""
+        form = StatBlockCopiesForm(request.POST)
+        if not form.is_valid():
+            return HttpResponseBadRequest(_("Invalid number of copies."))
+        stat_block = await aget_object_or_404(
+            StatBlock, pk=form.cleaned_data["stat_block"]
+        )
+        start = (await self._get_initial_position(encounter))["position"]
+        characters = stat_block_characters(
+            stat_block, encounter, form.cleaned_data["copies"], start
+        )
+        await self._logged(self._insert, encounter, "add_copies", characters)
+        await atracker_changed(encounter)
+        messages.success(
+            request,
+            ngettext(
+                "%(count)d character added to initiative!",
+                "%(count)d characters added to initiative!",
+                len(characters),
+            )
+            % {"count": len(characters)},
+        )
+        if request.htmx:  # type: ignore[attr-defined]
+            context = await self._build_context(request, encounter)
+            return render(
+                request, "initiative_tracker/add_character_success.html", context
+            )
+        return redirect(encounter)
+
+    async def _delete_character(
+        self, request: HttpRequest, encounter: Encounter, pk: int
+    ) -> HttpResponse:
         """Delete a character from the tracker."""
-        character = get_object_or_404(Character, pk=pk)
+        character = await aget_object_or_404(Character, pk=pk, encounter=encounter)
+        previous_turn = await self._turn_before_change(request, encounter)
         messages.success(request, _("Character removed from initiative."))
-        character.delete()
 
-        # Always redirect to show the character was deleted
-        return redirect("initiative_tracker:tracker")
+        def delete() -> None:
+            encounter.close_gap(character)
+            character.delete()
+            record(encounter, "delete", removed=[pk])
+
+        await self._logged(delete)
+        await atracker_changed(encounter)
+
+        if request.htmx:  # type: ignore[attr-defined]
+            return await self._update_rows(
+                request, encounter, previous_turn, removed=[pk]
+            )
+        return redirect(encounter)
+
+    async def _next_turn(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
+        """Advance the turn cursor, unless the client's turn is out of date."""
+        previous_turn = await self._turn_before_change(request, encounter)
+        expected_version = self._post_int(request, "turn_version")
 
-    def _next_turn(self, request: HttpRequest) -> HttpResponse:
-        """Advance to the next character's turn."""
-        chars = Character.objects.all().order_by("position", "-initiative")
-        current_pk = request.POST.get("current_pk")
+        def advance() -> bool:
+            if not encounter.advance_turn(expected_version):
+                return False
+            record(encounter, "next_turn")
+            return True
 
-        if current_pk and chars.count() > 1:
-            current_char = get_object_or_404(Character, pk=current_pk)
-            current_char.position = max(c.position for c in chars) + 1
-            current_char.save()
-            next_char = chars.exclude(pk=current_pk).first()
-            if next_char:
-                messages.info(request, _("Next up: %(name)s!") % {"name": next_char.name})
+        if not await self._logged(advance):
+            # Another tab already took this turn: show where the fight is now
+            messages.warning(request, _("The turn already moved on."))
+            return await self._whole_tracker(request, encounter)
+        await atracker_changed(encounter)
 
+        current_turn = await self._get_current_turn(encounter)
+        if current_turn:
+            messages.info(
+                request, _("Next up: %(name)s!") % {"name": current_turn.name}
+            )
         if request.htmx:  # type: ignore[attr-defined]
-            context = self._build_context(request)
-            return render(request, "initiative_tracker/tracker_partial.html", context)
-        return redirect("initiative_tracker:tracker")
+            return await self._update_rows(
+                request, encounter, previous_turn, current_turn=current_turn
+            )
+        return redirect(encounter)
+
+    async def _reorder(
+        self, request: HttpRequest, encounter: Encounter, increase: bool = True
+    ) -> HttpResponse:
+        """Nudge a character one place later or earlier in turn order."""
+        char_pk = self._post_int(request, "pk")
+        if char_pk is None:
+            raise Http404
+        char = (
+            await encounter.characters.only(*TRACKER_FIELDS).filter(pk=char_pk).afirst()
+        )
+        if char is None:
+            raise Http404
+        previous_turn = await self._turn_before_change(request, encounter)
+        action = self.request_action(request)
+
+        def nudge() -> List[Dict[str, Any]]:
+            if encounter.nudge_character(char, later=increase):
+                compacted = self._positions(encounter)
+            else:
+                compacted = self._compact_if_crowded(encounter, [char])
+            record(encounter, action, [history_row(char, "position"), *compacted])
+            return compacted
+
+        try:
+            compacted = await self._logged(nudge)
+        except Character.DoesNotExist:
+            # Deleted while the nudge was retried
+            raise Http404
+        if compacted:
+            previous_turn = None
+        await atracker_changed(encounter)
+        messages.info(request, _("Position updated!"))
+
+        if request.htmx:  # type: ignore[attr-defined]
+            # The row may have passed its neighbours: take it out and re-insert
+            return await self._update_rows(
+                request, encounter, previous_turn, inserted=[char], removed=[char.pk]
+            )
+        return redirect(encounter)
+
+    async def _move(self, request: HttpRequest, encounter: Encounter) -> HttpResponse:
+        """Drop a character between the given neighbours in turn order."""
+        pk, after_pk, before_pk = (
+            self._post_int(request, name) for name in ("pk", "after_pk", "before_pk")
+        )
+        characters = await encounter.characters.ain_bulk(
+            [value for value in (pk, after_pk, before_pk) if value is not None]
+        )
+        if pk not in characters:
+            raise Http404
+        after = characters.get(after_pk)
+        before = characters.get(before_pk)
+        # A row dropped at the edge of the loaded rows may have neighbours the
+        # browser has not loaded yet: look up the real one
+        if after is None and before is not None:
+            after = await self._neighbour(
+                encounter, await encounter.apredecessor_pk(before, exclude=pk)
+            )
+        elif before is None and after is not None:
+            before = await self._neighbour(
+                encounter, await encounter.asuccessor_pk(after, exclude=pk)
+            )
+        previous_turn = await self._turn_before_change(request, encounter)
 
-    def _reorder(self, request: HttpRequest, increase: bool = True) -> HttpResponse:
-        """Change a character's position in turn order."""
-        char_pk = request.POST.get("pk")
-        char = get_object_or_404(Character, pk=char_pk)
+        def move() -> bool:
+            renumbered = encounter.move_character(
+                characters[pk], after=after, before=before
+            )
+            if renumbered:
+                record(encounter, "move", self._positions(encounter))
+            else:
+                record(encounter, "move", [history_row(characters[pk], "position")])
+            return renumbered
 
-        # Get current position and adjust
-        if increase:
-            char.position += 1
+        try:
+            renumbered = await self._logged(move)
+        except Character.DoesNotExist:
+            # A row was deleted while the move was retried
+            raise Http404
+        await atracker_changed(encounter)
+        if renumbered or not request.htmx:  # type: ignore[attr-defined]
+            return await self._reordered(request, encounter)
+
+        # The browser already shows the row in its new place
+        messages.info(request, _("Position updated!"))
+        return await self._update_rows(
+            request, encounter, previous_turn, changed=[characters[pk]]
+        )
+
+    async def _neighbour(
+        self, encounter: Encounter, pk: int | None
+    ) -> Character | None:
+        """Return the character with id ``pk``, if any, for a move."""
+        if pk is None:
+            return None
+        return await encounter.characters.only(
+            "pk", "encounter_id", "position", "initiative"
+        ).aget(pk=pk)
+
+    async def _set_order(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
+        """Persist a full turn order submitted as a list of character ids."""
+        order = request.POST.getlist("order")
+        if not all(pk.isdigit() for pk in order):
+            return HttpResponseBadRequest(_("Invalid turn order."))
+
+        def set_order() -> bool:
+            if not encounter.set_order([int(pk) for pk in order]):
+                return False
+            record(encounter, "set_order", self._positions(encounter))
+            return True
+
+        if not await self._logged(set_order):
+            return HttpResponseBadRequest(_("Invalid turn order."))
+        await atracker_changed(encounter)
+        return await self._reordered(request, encounter)
+
+    async def _roll_initiative(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
+        """Roll everyone's initiative in one batch and restart the combat."""
+        seed = self._post_int(request, "seed")
+
+        def roll() -> int:
+            count = encounter.roll_initiative(seed)
+            record(
+                encounter, "roll_initiative", self._positions(encounter, "initiative")
+            )
+            return count
+
+        count = await self._logged(roll)
+        await atracker_changed(encounter)
+        messages.success(
+            request,
+            ngettext(
+                "Initiative rolled for %(count)d character!",
+                "Initiative rolled for %(count)d characters!",
+                count,
+            )
+            % {"count": count},
+        )
+        return await self._whole_tracker(request, encounter)
+
+    async def _travel(
+        self, request: HttpRequest, encounter: Encounter, action: str
+    ) -> HttpResponse:
+        """Undo, redo or rewind to a round by restoring a point of the log."""
+        if action == "undo":
+            target = encounter.history_head - 1 if encounter.can_undo else None
+        elif action == "redo":
+            target = encounter.history_head + 1 if encounter.can_redo else None
         else:
-            char.position = max(0, char.position - 1)  # Don't go below 0
+            round_number = self._post_int(request, "round")
+            target = (
+                await arewind_point(encounter, round_number)
+                if round_number is not None
+                else None
+            )
+        if target is None or not await arestore(encounter, target):
+            messages.warning(request, _("There is nothing to restore."))
+            return await self._whole_tracker(request, encounter)
+        await atracker_changed(encounter)
+        messages.success(
+            request,
+            {
+                "undo": _("Last action undone."),
+                "redo": _("Action redone."),
+                "rewind": _("Rewound to round %(round)d.")
+                % {"round": encounter.round_number},
+            }[action],
+        )
+        return await self._whole_tracker(request, encounter)
+
+    async def _logged(self, change: Callable[..., T], *args: Any) -> T:
+        """
+        Run the synchronous ``change(*args)`` in one transaction.
 
-        char.save()
+        Every mutation goes through here together with its ``record()``, so
+        the change and its combat log event are committed or rolled back as
+        one, like the admin's ``compact()`` and ``reroll()``.
+        """
+        return await sync_to_async(transaction.atomic(change))(*args)
+
+    def _insert(
+        self, encounter: Encounter, action: str, characters: List[Character]
+    ) -> None:
+        """Add ``characters`` with one INSERT and log them as ``action``."""
+        encounter.make_room(characters)
+        Character.objects.bulk_create(characters)
+        compacted = self._compact_if_crowded(encounter, characters)
+        record(encounter, action, [*map(history_row, characters), *compacted])
+
+    def _positions(self, encounter: Encounter, *fields: str) -> List[Dict[str, Any]]:
+        """Return every character's position (and ``fields``) for the log."""
+        return list(encounter.characters.order_by().values("pk", "position", *fields))
+
+    def _compact_if_crowded(
+        self, encounter: Encounter, characters: Sequence[Character]
+    ) -> List[Dict[str, Any]]:
+        """
+        Compact the encounter once ``characters`` took a position past the limit.
+
+        Returns every character's new position, to be logged with the action
+        that triggered the compaction so undo reverts both at once; nothing
+        when no compaction was needed.
+        """
+        if max(c.position for c in characters) <= POSITION_LIMIT:
+            return []
+        encounter.compact_positions()
+        return self._positions(encounter)
+
+    async def _reordered(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
+        """Respond after the turn order changed."""
         messages.info(request, _("Position updated!"))
+        return await self._whole_tracker(request, encounter)
+
+    async def _whole_tracker(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
+        """Re-render the whole tracker for HTMX, or redirect to it."""
+        if request.htmx:  # type: ignore[attr-defined]
+            context = await self._build_context(request, encounter)
+            return render(request, "initiative_tracker/tracker_partial.html", context)
+        return redirect(encounter)
+
+    async def _turn_before_change(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> Character | None:
+        """Return the acting character if the page gets patched row by row."""
+        if request.htmx:  # type: ignore[attr-defined]
+            return await self._get_current_turn(encounter)
+        return None
 
-        # Always redirect to show the updated order
-        return redirect("initiative_tracker:tracker")
+    async def _update_rows(
+        self,
+        request: HttpRequest,
+        encounter: Encounter,
+        previous_turn: Character | None,
+        current_turn: Character | None = None,
+        changed: Sequence[Character] = (),
+        inserted: Sequence[Character] = (),
+        removed: Sequence[int] = (),
+        template: str | None = None,
+    ) -> HttpResponse:
+        """
+        Patch only the rows a mutation touched into the page.
 
-    def _build_context(self, request: HttpRequest) -> Dict[str, Any]:
-        """Build context for templates."""
-        characters = Character.objects.all().order_by("position", "-initiative")
+        The turn banner and the affected rows are swapped out-of-band by their
+        ids and the regular swap is cancelled, so the response does not grow
+        with the encounter. Rows gaining or losing the acting character's
+        highlight are included. The whole tracker is rendered instead when the
+        table appears or disappears.
+        """
+        if current_turn is None:
+            current_turn = await self._get_current_turn(encounter)
+        if previous_turn is None or current_turn is None:
+            context = await self._build_context(request, encounter)
+            return render(
+                request, template or "initiative_tracker/tracker_partial.html", context
+            )
+
+        skip = {c.pk for c in inserted} | set(removed)
+        rows: Dict[int, Character] = {}
+        for character in (previous_turn, current_turn, *changed):
+            if character.pk not in skip:
+                rows[character.pk] = character
+        if previous_turn.pk == current_turn.pk:
+            rows.pop(current_turn.pk, None)
+        rows.update({c.pk: c for c in changed if c.pk not in skip})
+
+        context = {
+            "encounter": encounter,
+            "current_turn": current_turn,
+            "changed": list(rows.values()),
+            "inserted": [(c, await encounter.asuccessor_pk(c)) for c in inserted],
+            "removed": removed,
+            "row_updates": True,
+        }
+        response = render(
+            request, template or "initiative_tracker/_tracker_updates.html", context
+        )
+        return reswap(response, "none")
+
+    async def _load_session(self, request: HttpRequest) -> None:
+        """
+        Load the session before anything reads it.
+
+        Messages and the theme come from the session while rendering, which
+        must not query the session store from the event loop.
+        """
+        await request.session.aitems()
+
+    def _post_int(self, request: HttpRequest, name: str) -> int | None:
+        """Return the number posted under ``name`` or ``None`` if missing or bogus."""
+        try:
+            return int(request.POST.get(name, ""))
+        except ValueError:
+            return None
+
+    async def _get_encounter(self, encounter_pk: int) -> Encounter:
+        """Return the encounter addressed by the URL or raise 404."""
+        return await aget_object_or_404(Encounter, pk=encounter_pk)
+
+    async def _get_current_turn(self, encounter: Encounter) -> Character | None:
+        """Return the character the turn cursor points at, if any."""
+        characters = encounter.turn_order()
+        return (
+            await characters[encounter.turn_index : encounter.turn_index + 1].afirst()
+            or await characters.afirst()
+        )
+
+    async def _build_context(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> Dict[str, Any]:
+        """
+        Build context for templates from a single SELECT of the rows.
+
+        Only a window of rows starting at the acting character is rendered;
+        the rows around it load in chunks as the page scrolls.
+        """
+        window = await encounter.atracker_window()
         return {
-            "characters": characters,
-            "current_turn": characters.first() if characters.exists() else None,
+            "encounter": encounter,
+            "characters": window.rows,
+            "current_turn": window.current,
+            "load_earlier": window.earlier,
+            "load_later": window.later,
+            "rows_end": not window.later,
             "page_title": "Initiative Tracker",
             "is_htmx": getattr(request, "htmx", False),
         }
 
-    def _get_initial_position(self) -> Dict[str, Any]:
+    async def _rows_chunk(
+        self, request: HttpRequest, encounter: Encounter
+    ) -> HttpResponse:
+        """
+        Render the rows right after (``?after=``) or before (``?before=``) a row.
+
+        The row is named by its place in turn order, so a chunk is found by
+        seeking the index and stays correct while rows are added or removed
+        elsewhere. The chunk ends with the sentinel loading the next one.
+        """
+        later = "after" in request.GET
+        key = _row_key(request.GET.get("after" if later else "before", ""))
+        if key is None:
+            return HttpResponseBadRequest(_("Invalid row."))
+        characters, more = await encounter.atracker_chunk(key, later=later)
+        context = {
+            "encounter": encounter,
+            "characters": characters,
+            "current_turn": await self._get_current_turn(encounter),
+            "load_earlier": more and not later,
+            "load_later": more and later,
+            "rows_end": later and not more,
+        }
+        return render(request, "initiative_tracker/_tracker_rows.html", context)
+
+    async def _get_initial_position(self, encounter: Encounter) -> Dict[str, Any]:
         """Calculate the next available position."""
-        max_position = Character.objects.aggregate(max_pos=Max("position"))["max_pos"]
+        aggregate = await encounter.characters.aaggregate(max_pos=Max("position"))
+        max_position = aggregate["max_pos"]
         return {"position": (max_position or 0) + 1}
+
+
+class TrackerStreamView(View):
+    """
+    Server-Sent Events stream of an encounter's tracker.
+
+    Every mutation is rendered once and fanned out through the configured
+    broker, so connected viewers cost no extra renders or queries. Under ASGI
+    the connection stays open; under WSGI, where an open stream would tie up a
+    worker, the current state is sent once and the browser reconnects after
+    ``retry`` milliseconds.
+    """
+
+    keepalive = 15.0
+    retry = 5000
+
+    async def get(
+        self, request: HttpRequest, encounter_pk: int
+    ) -> StreamingHttpResponse:
+        """Open the event stream for the encounter's tracker."""
+        encounter = await aget_object_or_404(Encounter, pk=encounter_pk)
+        channel = tracker_channel(encounter.pk, translation.get_language())
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(
+                self._events(channel), content_type="text/event-stream"
+            )
+        else:
+            html = await sync_to_async(render_live_tracker)(encounter)
+            response = StreamingHttpResponse(
+                [f"retry: {self.retry}\n\n", format_event(Message("tracker", html))],
+                content_type="text/event-stream",
+            )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def _events(self, channel: str) -> AsyncIterator[str]:
+        """Relay broker messages as Server-Sent Events."""
+        yield f"retry: {self.retry}\n\n"
+        async for message in get_broker().subscribe(channel, keepalive=self.keepalive):
+            if message is None:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event(message)
+
+
+class LibraryView(View):
+    """
+    Panel searching the stat-block library as the GM types.
+
+    The search box re-requests only the results on every keystroke; each
+    result offers adding copies of the creature to the encounter.
+    """
+
+    async def get(self, request: HttpRequest, encounter_pk: int) -> HttpResponse:
+        """Display the library panel, or just the results of a search."""
+        encounter = await aget_object_or_404(Encounter, pk=encounter_pk)
+        query = request.GET.get("q", "")
+        context = {
+            "encounter": encounter,
+            "query": query,
+            "stat_blocks": await asearch_stat_blocks(query),
+            "max_copies": BulkCharacterForm.MAX_ROWS,
+        }
+        htmx = request.htmx  # type: ignore[attr-defined]
+        if htmx and htmx.target == "library-results":
+            return render(request, "initiative_tracker/_library_results.html", context)
+        if htmx:
+            return render(request, "initiative_tracker/_library_panel.html", context)
+        return render(request, "initiative_tracker/library.html", context)
+
+
+class SimulationView(View):
+    """
+    Panel estimating the encounter's turn order by Monte Carlo simulation.
+
+    Submitting the panel's form renders a progress bar subscribed to
+    ``SimulationStreamView``, which runs the trials and pushes the result.
+    """
+
+    async def get(self, request: HttpRequest, encounter_pk: int) -> HttpResponse:
+        """Display the simulation form, or start a submitted simulation."""
+        encounter = await aget_object_or_404(Encounter, pk=encounter_pk)
+        characters = await _simulated_characters(encounter)
+        data = request.GET if "trials" in request.GET else None
+        form = SimulationForm(data, characters=characters)
+        context: Dict[str, Any] = {"encounter": encounter, "form": form}
+        if data is not None and form.is_valid():
+            stream_url = reverse(
+                "initiative_tracker:simulation_stream", args=[encounter.pk]
+            )
+            context["stream_url"] = f"{stream_url}?{request.GET.urlencode()}"
+        if request.htmx:  # type: ignore[attr-defined]
+            return render(request, "initiative_tracker/_simulation_panel.html", context)
+        return render(request, "initiative_tracker/simulate.html", context)
+
+
+class SimulationStreamView(View):
+    """
+    Server-Sent Events stream running one simulation.
+
+    Under ASGI the trials run in a worker thread (and process pool) while
+    ``progress`` events report the share of finished trials; the ``result``
+    event carries the rendered outcome. Under WSGI only the result is sent.
+    """
+
+    async def get(self, request: HttpRequest, encounter_pk: int) -> HttpResponseBase:
+        """Run the simulation described by the query string."""
+        encounter = await aget_object_or_404(Encounter, pk=encounter_pk)
+        characters = await _simulated_characters(encounter)
+        form = SimulationForm(request.GET, characters=characters)
+        if not form.is_valid():
+            return HttpResponseBadRequest(_("Invalid simulation."))
+        run = functools.partial(
+            simulate,
+            combatants_of(characters),
+            form.cleaned_data["trials"],
+            seed=form.cleaned_data["seed"],
+            pair=form.pair,
+        )
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(
+                self._events(run, form.cleaned_data["trials"]),
+                content_type="text/event-stream",
+            )
+        else:
+            result = await sync_to_async(run)()
+            response = StreamingHttpResponse(
+                [self._result_event(result)], content_type="text/event-stream"
+            )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def _events(
+        self, run: functools.partial[SimulationResult], trials: int
+    ) -> AsyncIterator[str]:
+        """Relay the simulation's progress, then its result."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[int | None] = asyncio.Queue()
+
+        def progress(done: int) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        future = loop.run_in_executor(None, functools.partial(run, progress=progress))
+        future.add_done_callback(lambda _future: queue.put_nowait(None))
+        while (done := await queue.get()) is not None:
+            yield format_event(Message("progress", str(done * 100 // trials)))
+        yield self._result_event(await future)
+
+    def _result_event(self, result: SimulationResult) -> str:
+        """Render the outcome of a simulation as a ``result`` event."""
+        rows = [
+            {
+                "stats": stats,
+                "mode": RollMode(stats.combatant.mode).label,
+                "first": stats.first * 100,
+            }
+            for stats in result.stats
+        ]
+        ahead = result.ahead * 100 if result.ahead is not None else None
+        html = render_to_string(
+            "initiative_tracker/_simulation_result.html",
+            {"result": result, "rows": rows, "ahead": ahead},
+        )
+        return format_event(Message("result", html))
+
+
+class ExportView(View):
+    """
+    Download encounters, characters or combat logs as CSV or JSON Lines.
+
+    The rows are streamed from a database cursor as they are read, so large
+    exports start at once and run in constant memory. Under ASGI the chunks
+    come from an async iterator; a synchronous one would be buffered whole.
+    Exports of a single encounter are open to whoever can see its tracker,
+    exports of every encounter to staff only.
+    """
+
+    async def get(
+        self, request: HttpRequest, kind: str, fmt: str, encounter_pk: int | None = None
+    ) -> StreamingHttpResponse:
+        """Stream the ``kind`` export in format ``fmt``."""
+        if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+            raise Http404
+        if encounter_pk is not None:
+            await aget_object_or_404(Encounter, pk=encounter_pk)
+        elif not (await request.auser()).is_staff:
+            raise PermissionDenied
+        if isinstance(request, ASGIRequest):
+            content: Any = aexport_lines(kind, fmt, encounter_pk)
+        else:
+            content = export_lines(kind, fmt, encounter_pk)
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[fmt])
+        filename = export_filename(kind, fmt, encounter_pk)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+async def _simulated_characters(encounter: Encounter) -> List[Character]:
+    """Return the encounter's characters in the order the simulator ranks ties."""
+    characters = encounter.characters.order_by("pk").only(
+        "pk", "encounter_id", "name", "initiative_modifier", "roll_mode"
+    )
+    return [c async for c in characters]
+
+
+def _row_key(value: str) -> RowKey | None:
+    """Parse a row's place in turn order, written ``position_initiative_pk``."""
+    try:
+        position, initiative, pk = map(int, value.split("_"))
+    except ValueError:
+        return None
+    return position, initiative, pk
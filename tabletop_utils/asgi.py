@@ -1,4 +1,11 @@
-"""ASGI config for tabletop_utils project."""
+"""
+ASGI config for tabletop_utils project.
+
+Serve the project through this entry point (e.g. ``uvicorn
+tabletop_utils.asgi:application``) to keep the tracker's live update streams
+open without tying up a worker thread per viewer. The tracker views are
+asynchronous as well and run on the event loop without a thread adapter.
+"""
 
 from __future__ import annotations
 
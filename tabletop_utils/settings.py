@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 from django.utils.translation import gettext_lazy as _
@@ -21,6 +22,9 @@ DEBUG = True
 
 ALLOWED_HOSTS: list[str] = []
 
+# Clients allowed to scrape the /metrics/ endpoint
+INTERNAL_IPS = ["127.0.0.1", "::1"]
+
 
 # Application definition
 
@@ -39,12 +43,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total covers the whole stack (see /metrics/)
+    "core.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_htmx.middleware.HtmxMiddleware",
@@ -54,7 +61,8 @@ ROOT_URLCONF = "tabletop_utils.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django templates, with their rendering time reported per request
+        "BACKEND": "core.metrics.TimedDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -81,6 +89,46 @@ DATABASES = {
     }
 }
 
+# Opt-in SQLite profile for production, enabled with
+# DJANGO_SQLITE_PROFILE=production. WAL lets readers carry on while a write is
+# in progress; IMMEDIATE transactions take the write lock up front instead of
+# failing to upgrade a read lock ("database is locked"); the timeout queues
+# concurrent writers. The pragmas are applied on every new connection, which
+# persistent connections keep to a minimum. Under ASGI, where every request
+# runs in its own thread, set DJANGO_CONN_MAX_AGE=0.
+SQLITE_PRODUCTION_OPTIONS = {
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA mmap_size=134217728;"
+        "PRAGMA cache_size=-32000;"
+        "PRAGMA temp_store=MEMORY;"
+    ),
+    "transaction_mode": "IMMEDIATE",
+    "timeout": 5,
+}
+
+if os.environ.get("DJANGO_SQLITE_PROFILE") == "production":
+    DATABASES["default"].update(
+        {
+            "OPTIONS": SQLITE_PRODUCTION_OPTIONS,
+            "CONN_MAX_AGE": int(os.environ.get("DJANGO_CONN_MAX_AGE", "600")),
+            "CONN_HEALTH_CHECKS": True,
+        }
+    )
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/ref/settings/#caches
+# Holds the rendered tracker fragments and their version counters. Several
+# server processes must share one cache (e.g. Redis or Memcached), otherwise a
+# process would not see the version bumps made by the others.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,6 +176,17 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# On-demand profiling: a request with an X-Profile header or a ?profile query
+# parameter runs under cProfile when made by a staff user, or by anyone when
+# DJANGO_PROFILING=1 (staging only). Captures are listed at /<lang>/profiles/.
+PROFILING_ENABLED = os.environ.get("DJANGO_PROFILING") == "1"
+PROFILE_DIR = Path(os.environ.get("DJANGO_PROFILE_DIR", BASE_DIR / "profiles"))
+
+# Live tracker updates: broker fanning out one render per mutation to every
+# viewer. The in-process default serves a single ASGI worker; point this at a
+# shared implementation of initiative_tracker.broker.Broker to run several.
+TRACKER_BROKER = "initiative_tracker.broker.InProcessBroker"
+
 # Locale settings:
 LANGUAGES = [
     ("es", _("Spanish")),
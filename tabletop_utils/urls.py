@@ -6,8 +6,12 @@ from django.conf.urls.i18n import i18n_patterns
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import MetricsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    # Prometheus scrape target, outside the language prefixes
+    path("metrics/", MetricsView.as_view(), name="metrics"),
     # i18n patterns for apps
 ] + i18n_patterns(
     path("", include("core.urls")),